@@ -1,6 +1,7 @@
 """
 Configuración de la aplicación de autenticación.
-Este módulo define la configuración básica de la aplicación 'authentication'.
+Este módulo define la configuración básica de la aplicación 'authentication'
+y sustituye la autenticación JWT por defecto por su variante con caché.
 """
 
 from django.apps import AppConfig
@@ -15,3 +16,33 @@ class AuthenticationConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        """
+        Usa CachedJWTAuthentication en lugar de JWTAuthentication.
+        
+        Reemplaza la clase de simplejwt en las clases de autenticación por
+        defecto de las vistas de DRF, de modo que las lecturas autenticadas
+        reutilizan el usuario en caché sin depender de la configuración del
+        despliegue. Las vistas que definen sus propias clases no cambian.
+        Para volver a consultar el usuario en cada petición basta con
+        AUTH_USER_CACHE_TTL = 0.
+        
+        También invalida la caché de un usuario cada vez que se guarda o
+        se elimina.
+        """
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.settings import api_settings
+        from rest_framework.views import APIView
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from .authentication import CachedJWTAuthentication
+        from .cache import invalidar_usuario
+
+        APIView.authentication_classes = [
+            CachedJWTAuthentication if cls is JWTAuthentication else cls
+            for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ]
+
+        user_model = self.get_model('CustomUser')
+        post_save.connect(invalidar_usuario, sender=user_model, dispatch_uid='usuario_cache_save')
+        post_delete.connect(invalidar_usuario, sender=user_model, dispatch_uid='usuario_cache_delete')
@@ -0,0 +1,124 @@
+"""
+Clases de autenticación para la API.
+
+Define variantes de la autenticación JWT de simplejwt:
+- CachedJWTAuthentication: reutiliza el usuario cargado durante un tiempo
+  corto en lugar de consultarlo en cada petición. AuthenticationConfig la
+  instala en lugar de JWTAuthentication en las clases por defecto de DRF.
+- TicketAuthentication: autentica con un ticket de corta duración en
+  ?ticket=, para las vistas que el navegador abre desde la URL sin poder
+  enviar la cabecera Authorization (EventSource, ventanas de impresión).
+"""
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .cache import usuario_cache
+from .tokens import leer_ticket
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Autenticación JWT con caché en memoria del usuario autenticado.
+
+    El usuario se carga de la base de datos la primera vez y se reutiliza
+    desde usuario_cache hasta que expira o se invalida al modificarlo.
+    Los tokens que declaran al usuario como inactivo se rechazan sin
+    consultar la base de datos.
+    """
+
+    def get_user(self, validated_token):
+        """
+        Obtiene el usuario del token, desde la caché si está disponible.
+
+        Args:
+            validated_token: Token de acceso validado.
+
+        Returns:
+            CustomUser: Usuario autenticado.
+
+        Raises:
+            InvalidToken: Si el token no identifica a un usuario.
+            AuthenticationFailed: Si el usuario no existe, está inactivo o
+                cambió su contraseña.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if validated_token.get('activo') is False:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        user = usuario_cache.obtener(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            usuario_cache.guardar(user_id, user)
+        else:
+            # Comprobaciones de simplejwt que no requieren consultas
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        if not user.activo:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class TicketAuthentication(BaseAuthentication):
+    """
+    Autenticación con un ticket firmado en el parámetro ?ticket=.
+
+    El ticket se obtiene con el token de acceso en la cabecera y solo vale
+    durante AUTH_TICKET_TTL segundos y para el recurso indicado en el
+    atributo ticket_alcance de la vista, de modo que lo que queda en los
+    registros de acceso no sirve para llamar al resto de la API.
+    """
+
+    def authenticate(self, request):
+        """
+        Autentica la petición con el ticket de la URL.
+
+        Args:
+            request: Petición HTTP.
+
+        Returns:
+            tuple | None: (usuario, None) o None si no hay ticket.
+
+        Raises:
+            AuthenticationFailed: Si el ticket no es válido o el usuario no
+                existe o está inactivo.
+        """
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+
+        alcance = getattr(request.parser_context.get('view'), 'ticket_alcance', None)
+        user_id = leer_ticket(ticket, alcance) if alcance else None
+        if user_id is None:
+            raise AuthenticationFailed(_("Invalid or expired ticket"), code="ticket_invalid")
+
+        user = usuario_cache.obtener(user_id)
+        if user is None:
+            try:
+                user = get_user_model().objects.get(pk=user_id)
+            except get_user_model().DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            usuario_cache.guardar(user_id, user)
+        if not user.is_active or not user.activo:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user, None
+
+    def authenticate_header(self, request):
+        """Esquema devuelto en WWW-Authenticate para responder 401."""
+        return 'Ticket'
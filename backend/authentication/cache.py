@@ -0,0 +1,117 @@
+"""
+Caché de usuarios autenticados por JWT.
+
+Cada petición autenticada con JWT cargaba el usuario desde la base de datos.
+Este módulo mantiene en memoria del proceso los usuarios ya cargados durante
+un tiempo de vida corto. Cada vez que se guarda o elimina un usuario se
+invalida su entrada en el proceso; en despliegues con varios procesos, los demás
+procesos ven el cambio como máximo al expirar la entrada.
+
+Configuración opcional en settings:
+    AUTH_USER_CACHE_TTL (float): Segundos que un usuario permanece en caché.
+        Con 0 se desactiva la caché. Por defecto 60.
+    AUTH_USER_CACHE_MAX_ENTRIES (int): Máximo de usuarios en caché.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+class UsuarioCache:
+    """
+    Caché LRU con expiración de los usuarios autenticados del proceso.
+
+    Atributos:
+        max_entries (int): Número máximo de usuarios en memoria.
+    """
+
+    def __init__(self, max_entries=None):
+        """
+        Inicializa la caché vacía.
+
+        Args:
+            max_entries (int, opcional): Límite de entradas. Por defecto se
+                toma de AUTH_USER_CACHE_MAX_ENTRIES o 1024.
+        """
+        self.max_entries = max_entries or getattr(settings, 'AUTH_USER_CACHE_MAX_ENTRIES', 1024)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def ttl():
+        """Tiempo de vida de las entradas en segundos."""
+        return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+    def obtener(self, user_id):
+        """
+        Devuelve una copia del usuario guardado si no ha expirado.
+
+        Se devuelve una copia para que los cambios que una petición haga
+        sobre request.user no afecten a las demás.
+
+        Args:
+            user_id: Identificador del usuario.
+
+        Returns:
+            CustomUser | None: Usuario o None si no está o ha expirado.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expira, user = entry
+            if expira <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return copy.copy(user)
+
+    def guardar(self, user_id, user):
+        """
+        Guarda un usuario descartando los menos usados.
+
+        Args:
+            user_id: Identificador del usuario.
+            user (CustomUser): Usuario cargado de la base de datos.
+        """
+        ttl = self.ttl()
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidar(self, user_id):
+        """
+        Elimina un usuario de la caché tras modificarlo.
+
+        Args:
+            user_id: Identificador del usuario modificado o eliminado.
+        """
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def limpiar(self):
+        """Vacía la caché del proceso."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instancia compartida por la autenticación y las vistas de usuarios
+usuario_cache = UsuarioCache()
+
+
+def invalidar_usuario(sender, instance, **kwargs):
+    """
+    Receptor de post_save y post_delete de CustomUser.
+
+    Args:
+        sender: Modelo que emitió la señal.
+        instance (CustomUser): Usuario guardado o eliminado.
+    """
+    usuario_cache.invalidar(instance.pk)
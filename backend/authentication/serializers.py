@@ -4,8 +4,10 @@ Define la conversión de modelos de usuario a JSON y viceversa, además de la va
 """
 
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
 from .models import CustomUser
+from .tokens import UsuarioRefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -123,4 +125,12 @@ class LoginSerializer(serializers.Serializer):
         else:
             raise serializers.ValidationError("Se requieren nombre de usuario y contraseña.")
         
-        return data
\ No newline at end of file
+        return data
+
+class UsuarioTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Serializador para obtener el par de tokens JWT.
+    Emite tokens con los claims role, name y activo del usuario.
+    """
+
+    token_class = UsuarioRefreshToken
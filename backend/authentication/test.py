@@ -0,0 +1,244 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from authentication.models import CustomUser
+from authentication.cache import usuario_cache
+from authentication.throttling import login_failure_log, login_rate_limiter
+from logs.models import LogEntry
+import authentication.serializers as auth_serializers
+
+@pytest.fixture(autouse=True)
+def limpiar_caches():
+    usuario_cache.limpiar()
+    login_rate_limiter.limpiar()
+    login_failure_log.limpiar()
+    yield
+    usuario_cache.limpiar()
+    login_rate_limiter.limpiar()
+    login_failure_log.limpiar()
+
+@pytest.fixture
+def admin_user(db):
+    return CustomUser.objects.create_user(
+        username='admin',
+        email='admin@example.com',
+        password='adminpass',
+        name='Admin User',
+        cedula='1',
+        role='admin',
+        is_staff=True
+    )
+
+@pytest.fixture
+def test_user(db):
+    return CustomUser.objects.create_user(
+        username='testuser',
+        email='testuser@example.com',
+        password='testpass',
+        name='Test User',
+        cedula='1234567890',
+        role='auxiliar'
+    )
+
+def login(username, password):
+    response = APIClient().post(reverse('login'), {
+        'username': username,
+        'password': password
+    }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data['access']
+
+def client_for(access):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + access)
+    return client
+
+def consultas_de_usuario(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'authentication_customuser' in query['sql']
+    ]
+
+
+class TestJWTClaims:
+    @pytest.mark.django_db
+    def test_access_token_includes_user_claims(self, test_user):
+        token = AccessToken(login('testuser', 'testpass'))
+        assert token['role'] == 'auxiliar'
+        assert token['name'] == 'Test User'
+        assert token['activo'] is True
+
+    @pytest.mark.django_db
+    def test_token_obtain_pair_includes_user_claims(self, test_user):
+        response = APIClient().post(reverse('token_obtain_pair'), {
+            'username': 'testuser',
+            'password': 'testpass'
+        }, format='json')
+        assert AccessToken(response.data['access'])['role'] == 'auxiliar'
+
+
+class TestCachedJWTAuthentication:
+    @pytest.mark.django_db
+    def test_authenticated_reads_reuse_cached_user(self, test_user):
+        client = client_for(login('testuser', 'testpass'))
+        url = reverse('menu-list')
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert consultas_de_usuario(context) == []
+
+    @pytest.mark.django_db
+    def test_deactivating_user_invalidates_cache(self, admin_user, test_user):
+        client = client_for(login('testuser', 'testpass'))
+        url = reverse('menu-list')
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        admin = client_for(login('admin', 'adminpass'))
+        response = admin.patch(reverse('user-detail', args=[test_user.id]), {'activo': False}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_cache_can_be_disabled(self, settings, test_user):
+        settings.AUTH_USER_CACHE_TTL = 0
+        client = client_for(login('testuser', 'testpass'))
+        client.get(reverse('menu-list'))
+
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse('menu-list'))
+        assert len(consultas_de_usuario(context)) == 1
+
+
+
+class TestUserList:
+    @pytest.mark.django_db
+    def test_reads_are_not_audited(self, settings, admin_user, test_user):
+        settings.AUDIT_LOG_ASYNC = False
+        client = client_for(login('admin', 'adminpass'))
+        response = client.get(reverse('user-list'))
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 2
+        assert not LogEntry.objects.filter(action='LIST').exists()
+
+@pytest.fixture
+def contar_hashes(monkeypatch):
+    llamadas = []
+    original = auth_serializers.authenticate
+
+    def authenticate(**kwargs):
+        llamadas.append(kwargs['username'])
+        return original(**kwargs)
+
+    monkeypatch.setattr(auth_serializers, 'authenticate', authenticate)
+    return llamadas
+
+def intentar(username, password, ip='127.0.0.1'):
+    return APIClient(REMOTE_ADDR=ip).post(reverse('login'), {
+        'username': username,
+        'password': password
+    }, format='json')
+
+
+class TestLoginRateLimit:
+    @pytest.mark.django_db
+    def test_login_verifies_password_once(self, test_user, contar_hashes):
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_200_OK
+        assert contar_hashes == ['testuser']
+
+    @pytest.mark.django_db
+    def test_blocks_before_authenticating(self, settings, test_user, contar_hashes):
+        settings.LOGIN_RATE_LIMIT_USER = (2, 300)
+        for _ in range(2):
+            assert intentar('testuser', 'incorrecta').status_code == status.HTTP_400_BAD_REQUEST
+
+        response = intentar('testuser', 'testpass')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response['Retry-After']) > 0
+        assert len(contar_hashes) == 2
+
+        # Otros usuarios desde la misma IP no se bloquean
+        assert intentar('otro', 'incorrecta').status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_other_ip_cannot_lock_out_user(self, settings, test_user):
+        settings.LOGIN_RATE_LIMIT_USER = (2, 300)
+        for _ in range(3):
+            intentar('testuser', 'incorrecta', ip='10.0.0.9')
+        assert intentar('testuser', 'testpass', ip='10.0.0.9').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_global_user_bucket_blocks_distributed_attempts(self, settings, test_user):
+        settings.LOGIN_RATE_LIMIT_USER_GLOBAL = (4, 300)
+        for n in range(4):
+            intentar('testuser', 'incorrecta', ip=f'10.0.0.{n}')
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    @pytest.mark.django_db
+    def test_ip_bucket_blocks_any_username(self, settings, test_user):
+        settings.LOGIN_RATE_LIMIT_IP = (3, 60)
+        for username in ('a', 'b', 'c'):
+            intentar(username, 'incorrecta')
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    @pytest.mark.django_db
+    def test_token_endpoint_shares_limit(self, settings, test_user):
+        settings.LOGIN_RATE_LIMIT_USER = (2, 300)
+        client = APIClient(REMOTE_ADDR='127.0.0.1')
+        for _ in range(2):
+            response = client.post(reverse('token_obtain_pair'), {
+                'username': 'testuser', 'password': 'incorrecta'
+            }, format='json')
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = client.post(reverse('token_obtain_pair'), {
+            'username': 'testuser', 'password': 'testpass'
+        }, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    @pytest.mark.django_db
+    def test_successful_login_resets_user_bucket(self, settings, test_user):
+        settings.LOGIN_RATE_LIMIT_USER = (2, 300)
+        intentar('testuser', 'incorrecta')
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_200_OK
+        intentar('testuser', 'incorrecta')
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_failures_are_aggregated_per_window(self, settings, test_user):
+        settings.AUDIT_LOG_ASYNC = False
+        settings.LOGIN_RATE_LIMIT_USER = (3, 300)
+        for _ in range(5):
+            intentar('testuser', 'incorrecta')
+        fallos = LogEntry.objects.filter(action='LOGIN_FAILED')
+        assert fallos.count() == 1
+
+        settings.LOGIN_RATE_LIMIT_USER = (5, 300)
+        login_rate_limiter.limpiar()
+        assert intentar('testuser', 'testpass').status_code == status.HTTP_200_OK
+        resumen = fallos.order_by('-id').first()
+        assert fallos.count() == 2
+        assert (resumen.details['intentos'], resumen.details['bloqueados']) == (3, 2)
+
+    @pytest.mark.django_db
+    def test_expired_windows_are_flushed_by_any_attempt(self, settings, test_user):
+        settings.AUDIT_LOG_ASYNC = False
+        for _ in range(3):
+            intentar('testuser', 'incorrecta')
+        fallos = LogEntry.objects.filter(action='LOGIN_FAILED')
+        assert fallos.count() == 1
+
+        # El resumen se escribe aunque testuser no vuelva a intentarlo
+        settings.LOGIN_FAILED_LOG_WINDOW = 0
+        intentar('otro', 'incorrecta', ip='10.0.0.9')
+        resumen = fallos.filter(details__intentos__isnull=False).get()
+        assert resumen.details['username'] == 'testuser'
+        assert resumen.details['intentos'] == 3
@@ -0,0 +1,394 @@
+"""
+Limitación de intentos de inicio de sesión.
+
+Cada intento de login calcula el hash completo de la contraseña y cada
+fallo se registraba en el log de actividades, de modo que un cliente
+que reintenta sin control podía saturar la CPU y la tabla de logs. Este
+módulo define:
+- Un limitador de cubeta de tokens de intentos fallidos, que se consulta
+  antes de autenticar y responde 429 sin calcular ningún hash. Limita por
+  usuario e IP, por IP y, con un límite más holgado, por usuario desde
+  cualquier IP, de modo que desde otra máquina no se puede bloquear la
+  cuenta de un usuario con unos pocos intentos.
+- La agregación de los fallos de login: el primer fallo de cada ventana se
+  registra al momento y los siguientes se resumen en un único registro
+  LOGIN_FAILED al cerrarse la ventana. Las ventanas vencidas se cierran en
+  cada intento de login, aunque no vuelva a fallar el mismo usuario.
+
+El estado de las cubetas se guarda en memoria del proceso o, si se
+configura, en una caché de Django compartida entre procesos. La caché
+compartida no actualiza las cubetas de forma atómica: con intentos
+simultáneos desde varios procesos el límite es aproximado.
+
+Configuración opcional en settings:
+    LOGIN_RATE_LIMIT_CACHE_ALIAS (str): Alias de la caché de Django
+        compartida para las cubetas. Si no se define, se usa memoria local.
+    LOGIN_RATE_LIMIT_USER (tuple): (capacidad, segundos para recargar la
+        cubeta completa) por nombre de usuario e IP. Por defecto (5, 300).
+    LOGIN_RATE_LIMIT_IP (tuple): Igual, por dirección IP. Por defecto
+        (20, 60), mayor porque varios puestos pueden compartir IP.
+    LOGIN_RATE_LIMIT_USER_GLOBAL (tuple): Igual, por nombre de usuario desde
+        cualquier IP. Por defecto (50, 300).
+    LOGIN_FAILED_LOG_WINDOW (int): Segundos de cada ventana de agregación
+        de fallos. Por defecto 300.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import caches
+from logs.services import log_action
+
+# Máximo de claves en memoria local; se descartan las menos usadas
+MAX_CLAVES = 10000
+
+
+class MemoriaBackend:
+    """
+    Almacén en memoria del proceso para el estado de las cubetas.
+    """
+
+    def __init__(self, max_entries=MAX_CLAVES):
+        """
+        Inicializa el almacén vacío.
+
+        Args:
+            max_entries (int): Número máximo de claves guardadas.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def actualizar(self, clave, funcion, timeout):
+        """
+        Aplica una función al estado de una clave de forma atómica.
+
+        Args:
+            clave (str): Clave de la cubeta.
+            funcion (callable): Recibe el estado actual (o None) y devuelve
+                (nuevo_estado, resultado).
+            timeout (float): No se usa; las claves se descartan por LRU.
+
+        Returns:
+            Resultado devuelto por la función.
+        """
+        with self._lock:
+            estado, resultado = funcion(self._entries.get(clave))
+            self._entries[clave] = estado
+            self._entries.move_to_end(clave)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return resultado
+
+    def eliminar(self, clave):
+        """Elimina el estado de una clave."""
+        with self._lock:
+            self._entries.pop(clave, None)
+
+    def limpiar(self):
+        """Elimina el estado de todas las claves."""
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheBackend:
+    """
+    Almacén en una caché de Django, compartido entre procesos.
+
+    Atributos:
+        alias (str): Alias de la caché en settings.CACHES.
+    """
+
+    def __init__(self, alias):
+        """
+        Inicializa el almacén.
+
+        Args:
+            alias (str): Alias de la caché de Django.
+        """
+        self.alias = alias
+
+    @staticmethod
+    def _clave(clave):
+        """Clave usada en la caché compartida."""
+        return f'login-throttle:{clave}'
+
+    def actualizar(self, clave, funcion, timeout):
+        """
+        Aplica una función al estado de una clave (lectura y escritura).
+
+        Args:
+            clave (str): Clave de la cubeta.
+            funcion (callable): Recibe el estado actual (o None) y devuelve
+                (nuevo_estado, resultado).
+            timeout (float): Segundos tras los que la cubeta estaría llena
+                y puede descartarse.
+
+        Returns:
+            Resultado devuelto por la función.
+        """
+        cache = caches[self.alias]
+        estado, resultado = funcion(cache.get(self._clave(clave)))
+        cache.set(self._clave(clave), estado, timeout)
+        return resultado
+
+    def eliminar(self, clave):
+        """Elimina el estado de una clave."""
+        caches[self.alias].delete(self._clave(clave))
+
+    def limpiar(self):
+        """La caché compartida no se vacía desde un proceso."""
+
+
+class LoginRateLimiter:
+    """
+    Limitador de cubeta de tokens para los intentos de login.
+
+    Cada cubeta tiene una capacidad de intentos fallidos que se recarga de
+    forma continua. Cada fallo consume un token de las cubetas del usuario
+    en esa IP, de la IP y del usuario en general; mientras alguna esté
+    vacía los intentos se rechazan sin verificar la contraseña.
+    """
+
+    def __init__(self):
+        """Inicializa el limitador con el almacén local."""
+        self._memoria = MemoriaBackend()
+
+    def backend(self):
+        """
+        Obtiene el almacén configurado.
+
+        Returns:
+            MemoriaBackend | CacheBackend: Almacén de las cubetas.
+        """
+        alias = getattr(settings, 'LOGIN_RATE_LIMIT_CACHE_ALIAS', None)
+        return CacheBackend(alias) if alias else self._memoria
+
+    @staticmethod
+    def claves(username, ip):
+        """
+        Obtiene las cubetas que limitan un intento.
+
+        Returns:
+            list: Pares (clave, (capacidad, segundos de recarga)).
+        """
+        claves = []
+        if username:
+            usuario = username.lower()
+            claves.append((f'user:{usuario}:{ip}', getattr(settings, 'LOGIN_RATE_LIMIT_USER', (5, 300))))
+            claves.append((f'user:{usuario}', getattr(settings, 'LOGIN_RATE_LIMIT_USER_GLOBAL', (50, 300))))
+        if ip:
+            claves.append((f'ip:{ip}', getattr(settings, 'LOGIN_RATE_LIMIT_IP', (20, 60))))
+        return claves
+
+    def _actualizar(self, username, ip, consumir):
+        """
+        Recarga las cubetas de un intento y, opcionalmente, consume un token.
+
+        Args:
+            username (str): Nombre de usuario del intento.
+            ip (str): Dirección IP del cliente.
+            consumir (bool): Si se descuenta un token de cada cubeta.
+
+        Returns:
+            float: 0 si todas las cubetas tienen tokens o los segundos de
+                espera hasta disponer de uno.
+        """
+        espera = 0
+        for clave, (capacidad, recarga) in self.claves(username, ip):
+            por_segundo = capacidad / recarga
+
+            def recargar(estado):
+                ahora = time.time()
+                tokens, ultimo = estado or (capacidad, ahora)
+                tokens = min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+                if consumir:
+                    tokens = max(tokens - 1, 0)
+                return (tokens, ahora), max(1 - tokens, 0) / por_segundo
+
+            espera = max(espera, self.backend().actualizar(clave, recargar, recarga))
+        return espera
+
+    def espera(self, username, ip):
+        """
+        Comprueba, sin consumir, si un intento está permitido.
+
+        Se consulta antes de verificar la contraseña.
+
+        Args:
+            username (str): Nombre de usuario del intento.
+            ip (str): Dirección IP del cliente.
+
+        Returns:
+            float: 0 si el intento se permite o los segundos de espera.
+        """
+        return self._actualizar(username, ip, consumir=False)
+
+    def consumir(self, username, ip):
+        """
+        Descuenta un intento fallido de las cubetas del usuario y de la IP.
+
+        Args:
+            username (str): Nombre de usuario del intento.
+            ip (str): Dirección IP del cliente.
+        """
+        self._actualizar(username, ip, consumir=True)
+
+    def reiniciar(self, username, ip):
+        """
+        Rellena la cubeta del usuario en una IP tras un login correcto.
+
+        Args:
+            username (str): Nombre de usuario autenticado.
+            ip (str): Dirección IP del cliente.
+        """
+        self.backend().eliminar(f'user:{username.lower()}:{ip}')
+
+    def limpiar(self):
+        """Vacía el estado local de las cubetas."""
+        self._memoria.limpiar()
+
+
+class LoginFailureLog:
+    """
+    Agregador de los fallos de login por usuario e IP.
+
+    El estado de las ventanas se guarda en memoria del proceso; cada
+    proceso resume los fallos que recibe. Las ventanas se conservan en
+    orden de apertura, de modo que las vencidas se cierran recorriendo
+    solo el principio de la lista.
+    """
+
+    def __init__(self, max_entries=MAX_CLAVES):
+        """
+        Inicializa el agregador sin ventanas abiertas.
+
+        Args:
+            max_entries (int): Número máximo de ventanas abiertas.
+        """
+        self.max_entries = max_entries
+        self._ventanas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _resumir(clave, ventana):
+        """
+        Registra el resumen de una ventana si tuvo intentos sin registrar.
+
+        El resumen cuenta todos los intentos de la ventana, incluido el
+        primero, que ya se registró por separado.
+
+        Args:
+            clave (tuple): (username, ip) de la ventana.
+            ventana (dict): Estado de la ventana.
+        """
+        if ventana['fallos'] + ventana['bloqueados'] <= 1:
+            return
+        username, ip = clave
+        log_action(
+            user=None,
+            action='LOGIN_FAILED',
+            model_name='CustomUser',
+            details={
+                'username': username,
+                'ip_address': ip,
+                'reason': 'Resumen de intentos fallidos',
+                'intentos': ventana['fallos'],
+                'bloqueados': ventana['bloqueados'],
+                'desde': str(datetime.fromtimestamp(ventana['desde'], tz=dt_timezone.utc)),
+                'hasta': str(datetime.fromtimestamp(ventana['hasta'], tz=dt_timezone.utc)),
+            }
+        )
+
+    def registrar(self, username, ip, reason, bloqueado=False):
+        """
+        Registra un intento fallido o bloqueado.
+
+        El primer intento de la ventana se registra al momento; los demás
+        se acumulan hasta que la ventana se cierra.
+
+        Args:
+            username (str): Nombre de usuario del intento.
+            ip (str): Dirección IP del cliente.
+            reason (str): Motivo del fallo.
+            bloqueado (bool): Si el intento fue rechazado por el limitador.
+        """
+        clave = (username, ip)
+        ahora = time.time()
+        cerradas = self._vencidas(ahora)
+        primero = False
+        with self._lock:
+            ventana = self._ventanas.get(clave)
+            if ventana is None:
+                primero = True
+                ventana = {'desde': ahora, 'fallos': 0, 'bloqueados': 0}
+                self._ventanas[clave] = ventana
+            ventana['bloqueados' if bloqueado else 'fallos'] += 1
+            ventana['hasta'] = ahora
+            while len(self._ventanas) > self.max_entries:
+                cerradas.append(self._ventanas.popitem(last=False))
+
+        for clave_cerrada, ventana_cerrada in cerradas:
+            self._resumir(clave_cerrada, ventana_cerrada)
+        if primero:
+            log_action(
+                user=None,
+                action='LOGIN_FAILED',
+                model_name='CustomUser',
+                details={'username': username, 'ip_address': ip, 'reason': reason}
+            )
+
+    def _vencidas(self, ahora):
+        """
+        Retira las ventanas cuya duración ya terminó.
+
+        Args:
+            ahora (float): Momento actual.
+
+        Returns:
+            list: Pares (clave, ventana) retirados, pendientes de resumir.
+        """
+        duracion = getattr(settings, 'LOGIN_FAILED_LOG_WINDOW', 300)
+        vencidas = []
+        with self._lock:
+            while self._ventanas:
+                clave, ventana = next(iter(self._ventanas.items()))
+                if ahora - ventana['desde'] < duracion:
+                    break
+                vencidas.append((clave, self._ventanas.pop(clave)))
+        return vencidas
+
+    def cerrar_vencidas(self):
+        """
+        Registra el resumen de todas las ventanas vencidas.
+
+        Se invoca en cada intento de login, de modo que el resumen de una
+        ventana se escribe aunque el mismo usuario no vuelva a intentarlo.
+        """
+        for clave, ventana in self._vencidas(time.time()):
+            self._resumir(clave, ventana)
+
+    def cerrar(self, username, ip):
+        """
+        Cierra la ventana de un usuario e IP registrando su resumen.
+
+        Args:
+            username (str): Nombre de usuario.
+            ip (str): Dirección IP del cliente.
+        """
+        with self._lock:
+            ventana = self._ventanas.pop((username, ip), None)
+        if ventana is not None:
+            self._resumir((username, ip), ventana)
+
+    def limpiar(self):
+        """Descarta las ventanas abiertas sin registrarlas."""
+        with self._lock:
+            self._ventanas.clear()
+
+
+# Instancias compartidas por las vistas de autenticación del proceso
+login_rate_limiter = LoginRateLimiter()
+login_failure_log = LoginFailureLog()
@@ -0,0 +1,82 @@
+"""
+Tokens de la aplicación.
+
+Los tokens JWT incluyen, además del ID del usuario, su rol, nombre y estado
+activo, de modo que el frontend y los servicios que solo necesitan esos
+datos no tengan que consultarlos. Los claims reflejan el usuario en el
+momento del inicio de sesión; la autorización en el servidor usa el
+usuario cargado por CachedJWTAuthentication.
+
+Para las conexiones que deben autenticarse en la URL (EventSource) se
+emiten además tickets firmados de corta duración y alcance limitado, de
+modo que el token de acceso no queda en los registros de acceso.
+
+Configuración opcional en settings:
+    AUTH_TICKET_TTL (int): Segundos de validez de los tickets. Por defecto 60.
+"""
+
+from django.conf import settings
+from django.core import signing
+from rest_framework_simplejwt.tokens import RefreshToken
+
+TICKET_SALT = 'authentication.tokens.ticket'
+
+
+class UsuarioRefreshToken(RefreshToken):
+    """
+    Token de refresco con los datos básicos del usuario como claims.
+
+    El token de acceso derivado copia los mismos claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Crea el token de refresco de un usuario.
+
+        Args:
+            user (CustomUser): Usuario autenticado.
+
+        Returns:
+            UsuarioRefreshToken: Token con los claims role, name y activo.
+        """
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['name'] = user.name
+        token['activo'] = user.activo
+        return token
+
+
+def crear_ticket(user, alcance):
+    """
+    Crea un ticket firmado para autenticar una conexión en la URL.
+
+    Args:
+        user (CustomUser): Usuario autenticado.
+        alcance (str): Recurso para el que vale el ticket.
+
+    Returns:
+        str: Ticket firmado con la fecha de emisión.
+    """
+    return signing.dumps({'user_id': user.pk, 'alcance': alcance}, salt=TICKET_SALT)
+
+
+def leer_ticket(ticket, alcance):
+    """
+    Valida un ticket y obtiene el usuario al que se emitió.
+
+    Args:
+        ticket (str): Ticket recibido.
+        alcance (str): Recurso que se quiere abrir.
+
+    Returns:
+        int | None: ID del usuario, o None si el ticket no es válido, ha
+            expirado o se emitió para otro recurso.
+    """
+    try:
+        datos = signing.loads(ticket, salt=TICKET_SALT, max_age=getattr(settings, 'AUTH_TICKET_TTL', 60))
+    except signing.BadSignature:
+        return None
+    if datos.get('alcance') != alcance:
+        return None
+    return datos.get('user_id')
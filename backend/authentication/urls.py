@@ -9,10 +9,10 @@ from .views import (
     LoginView,
     UserListView,
     UserDetailView,
+    CustomTokenObtainPairView,
     CustomTokenRefreshView,
     LogoutView
 )
-from rest_framework_simplejwt.views import TokenObtainPairView
 
 urlpatterns = [
     # Rutas de autenticación básica
@@ -35,7 +35,7 @@ urlpatterns = [
     
     # Gestión de tokens JWT
     path('token/', 
-         TokenObtainPairView.as_view(), 
+         CustomTokenObtainPairView.as_view(), 
          name='token_obtain_pair'),  # Obtener par de tokens
     
     path('token/refresh/', 
@@ -3,19 +3,22 @@ Vistas para la gestión de autenticación y usuarios.
 Proporciona endpoints para registro, login, gestión de usuarios y tokens.
 """
 
-from django.contrib.auth import authenticate
 from django.utils import timezone
 from django.db import transaction, models
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import AuthenticationFailed, Throttled, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
-from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .cache import usuario_cache
 from .models import CustomUser
-from .serializers import UserSerializer, LoginSerializer
-from logs.models import LogEntry
+from .serializers import UserSerializer, LoginSerializer, UsuarioTokenObtainPairSerializer
+from .throttling import login_failure_log, login_rate_limiter
+from .tokens import UsuarioRefreshToken
+from logs.services import log_action
 
 class RegisterView(generics.CreateAPIView):
     """
@@ -115,7 +118,7 @@ class RegisterView(generics.CreateAPIView):
             instance.is_superuser = True
             instance.save()
 
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -127,10 +130,36 @@ class RegisterView(generics.CreateAPIView):
             }
         )
 
+def comprobar_limite_login(request):
+    """
+    Aplica el límite de intentos de inicio de sesión a una solicitud.
+
+    Args:
+        request: Solicitud con el username en el cuerpo.
+
+    Returns:
+        tuple: Username e IP de la solicitud.
+
+    Raises:
+        Throttled: Si se superó el límite de intentos (429).
+    """
+    username = str(request.data.get('username') or '')
+    ip_address = request.META.get('REMOTE_ADDR')
+    login_failure_log.cerrar_vencidas()
+
+    espera = login_rate_limiter.espera(username, ip_address)
+    if espera:
+        login_failure_log.registrar(
+            username, ip_address, 'Too many login attempts', bloqueado=True
+        )
+        raise Throttled(wait=espera)
+    return username, ip_address
+
 class LoginView(generics.GenericAPIView):
     """
     Vista para el inicio de sesión de usuarios.
     Genera tokens JWT para la autenticación.
+    Limita los intentos por usuario e IP antes de verificar la contraseña.
     """
     permission_classes = (permissions.AllowAny,)
     serializer_class = LoginSerializer
@@ -139,20 +168,31 @@ class LoginView(generics.GenericAPIView):
         """
         Procesa la solicitud de inicio de sesión.
         
+        La contraseña se verifica una sola vez, en LoginSerializer. Los
+        fallos se registran agregados por ventana en login_failure_log.
+        
         Returns:
             Response con tokens JWT y datos del usuario si el login es exitoso
+            
+        Raises:
+            Throttled: Si se superó el límite de intentos (429).
         """
+        username, ip_address = comprobar_limite_login(request)
+
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = authenticate(
-            username=serializer.validated_data['username'],
-            password=serializer.validated_data['password']
-        )
+        if not serializer.is_valid():
+            if username:
+                login_rate_limiter.consumir(username, ip_address)
+                login_failure_log.registrar(username, ip_address, 'Invalid credentials')
+            raise ValidationError(serializer.errors)
+        user = serializer.validated_data['user']
 
-        if user and user.activo:
-            refresh = RefreshToken.for_user(user)
+        if user.activo:
+            refresh = UsuarioRefreshToken.for_user(user)
+            login_rate_limiter.reiniciar(username, ip_address)
+            login_failure_log.cerrar(username, ip_address)
             
-            LogEntry.objects.create(
+            log_action(
                 user=user,
                 action='LOGIN',
                 model_name='CustomUser',
@@ -172,14 +212,9 @@ class LoginView(generics.GenericAPIView):
                 }
             })
         else:
-            LogEntry.objects.create(
-                user=None,
-                action='LOGIN_FAILED',
-                model_name='CustomUser',
-                details={
-                    'username': serializer.validated_data['username'],
-                    'reason': 'Invalid credentials or user inactive'
-                }
+            login_rate_limiter.consumir(username, ip_address)
+            login_failure_log.registrar(
+                username, ip_address, 'Invalid credentials or user inactive'
             )
             return Response(
                 {"error": "Invalid credentials or user inactive"}, 
@@ -189,7 +224,8 @@ class LoginView(generics.GenericAPIView):
 class UserListView(generics.ListAPIView):
     """
     Vista para listar usuarios activos.
-    Solo accesible por administradores.
+    Solo accesible por administradores. Las lecturas no se registran en
+    el registro de actividades, que solo guarda las modificaciones.
     """
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
@@ -198,18 +234,6 @@ class UserListView(generics.ListAPIView):
         """Retorna solo usuarios activos"""
         return CustomUser.objects.filter(activo=True)
 
-    def list(self, request, *args, **kwargs):
-        """Lista usuarios y registra la acción"""
-        response = super().list(request, *args, **kwargs)
-        LogEntry.objects.create(
-            user=self.request.user,
-            action='LIST',
-            model_name='CustomUser',
-            object_id=None,
-            details={'count': len(response.data)}
-        )
-        return response
-
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para gestionar usuarios individuales.
@@ -250,9 +274,10 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
             )
 
     def perform_update(self, serializer):
-        """Actualiza el usuario y registra la acción"""
+        """Actualiza el usuario, invalida su caché de autenticación y registra la acción"""
         instance = serializer.save()
-        LogEntry.objects.create(
+        self._invalidar_cache(instance.id)
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -261,15 +286,59 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
         )
 
     def perform_destroy(self, instance):
-        """Elimina el usuario y registra la acción"""
-        LogEntry.objects.create(
+        """Elimina el usuario, invalida su caché de autenticación y registra la acción"""
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
             object_id=instance.id,
             details={}
         )
+        user_id = instance.id
         instance.delete()
+        self._invalidar_cache(user_id)
+
+    @staticmethod
+    def _invalidar_cache(user_id):
+        """
+        Elimina el usuario de la caché usada por CachedJWTAuthentication.
+        
+        Se invalida de inmediato y de nuevo al confirmar la transacción, para
+        descartar una copia obsoleta cargada por otra petición entretanto.
+        """
+        usuario_cache.invalidar(user_id)
+        transaction.on_commit(lambda: usuario_cache.invalidar(user_id))
+
+class CustomTokenObtainPairView(TokenObtainPairView):
+    """
+    Vista para obtener el par de tokens JWT con usuario y contraseña.
+    Aplica el mismo límite de intentos que LoginView.
+    """
+    serializer_class = UsuarioTokenObtainPairSerializer
+
+    def post(self, request, *args, **kwargs):
+        """
+        Emite el par de tokens si las credenciales son válidas.
+
+        Raises:
+            Throttled: Si se superó el límite de intentos (429).
+        """
+        username, ip_address = comprobar_limite_login(request)
+
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except (AuthenticationFailed, ValidationError):
+            if username:
+                login_rate_limiter.consumir(username, ip_address)
+                login_failure_log.registrar(username, ip_address, 'Invalid credentials')
+            raise
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        login_rate_limiter.reiniciar(username, ip_address)
+        login_failure_log.cerrar(username, ip_address)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 class CustomTokenRefreshView(TokenRefreshView):
     """
@@ -294,7 +363,7 @@ class CustomTokenRefreshView(TokenRefreshView):
                 user_id = token.payload.get('user_id')
                 
                 if user_id and not token.blacklisted():
-                    LogEntry.objects.create(
+                    log_action(
                         user_id=user_id,
                         action='TOKEN_REFRESH',
                         model_name='Token',
@@ -339,7 +408,7 @@ class LogoutView(APIView):
             user_id = token.payload.get('user_id')
             
             if user_id:
-                LogEntry.objects.create(
+                log_action(
                     user_id=user_id,
                     action='LOGOUT',
                     model_name='User',
@@ -0,0 +1,99 @@
+"""
+Peticiones GET condicionales para las vistas de la API.
+
+Define un mixin que calcula una versión barata de la colección o del
+objeto solicitado (fecha de modificación máxima y número de registros,
+incluidas sus relaciones serializadas) y responde 304 Not Modified a
+If-None-Match / If-Modified-Since sin serializar nada.
+"""
+
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Mixin para vistas genéricas que añade ETag y Last-Modified a las lecturas.
+
+    La versión se obtiene con una única consulta de agregación sobre el
+    queryset de la vista: Max(updated_at) y Count del modelo y de cada
+    relación indicada. Para las vistas de detalle se restringe al objeto
+    solicitado. La cadena de consulta forma parte del ETag, ya que filtros
+    y proyecciones cambian la respuesta. Los cambios en relaciones muchos a
+    muchos no alteran estos valores, así que el modelo debe actualizar su
+    updated_at al producirse (ver pacientes.models.tocar_pacientes).
+
+    Atributos:
+        conditional_relations (tuple): Relaciones incluidas en la respuesta
+            cuyo updated_at también determina la versión.
+    """
+    conditional_relations = ()
+
+    def get_conditional_queryset(self):
+        """
+        Obtiene el queryset cuya versión determina la respuesta.
+
+        Returns:
+            QuerySet: El objeto solicitado en las vistas de detalle o la
+                colección filtrada en los listados.
+        """
+        queryset = self.get_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(queryset)
+
+    def get_version(self):
+        """
+        Calcula el ETag y la fecha de última modificación de la respuesta.
+
+        Returns:
+            tuple: (etag, last_modified), donde last_modified es un datetime
+                o None si no hay registros.
+        """
+        aggregates = {
+            'total': Count('pk', distinct=True),
+            'updated_at': Max('updated_at'),
+        }
+        for index, relation in enumerate(self.conditional_relations):
+            aggregates[f'total_{index}'] = Count(relation, distinct=True)
+            aggregates[f'updated_at_{index}'] = Max(f'{relation}__updated_at')
+
+        version = self.get_conditional_queryset().order_by().aggregate(**aggregates)
+        last_modified = max(
+            (value for key, value in version.items() if key.startswith('updated_at') and value),
+            default=None
+        )
+        raw = json.dumps(
+            [sorted(version.items()), self.request.query_params.urlencode()],
+            cls=DjangoJSONEncoder
+        )
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest()), last_modified
+
+    def get(self, request, *args, **kwargs):
+        """
+        Responde 304 si el cliente ya tiene la versión actual.
+
+        Returns:
+            Response: 304 Not Modified o la respuesta completa con sus
+                cabeceras ETag y Last-Modified.
+        """
+        etag, last_modified = self.get_version()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Obliga al navegador a revalidar en cada sondeo en lugar de reutilizar la copia
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
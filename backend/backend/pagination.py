@@ -0,0 +1,48 @@
+"""
+Clases de paginación compartidas por las APIs del proyecto.
+
+Define la paginación por cursor (keyset) utilizada en los listados que
+crecen indefinidamente, como pedidos y registros de actividad.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Paginación por cursor con tamaño de página configurable por el cliente.
+
+    El cursor codifica la posición sobre el campo de ordenamiento, por lo
+    que cada página se obtiene con un rango indexado en lugar de un OFFSET
+    que se degrada a medida que crece la tabla.
+
+    Atributos:
+        page_size (int): Tamaño de página por defecto.
+        page_size_query_param (str): Parámetro para indicar el tamaño de página.
+        max_page_size (int): Tamaño máximo de página permitido.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class OptionalCursorPagination(KeysetCursorPagination):
+    """
+    Paginación por cursor que solo se aplica cuando el cliente la solicita.
+
+    Si la petición no incluye el parámetro de cursor ni el tamaño de
+    página, se devuelve la lista completa, de modo que los clientes
+    existentes siguen funcionando sin cambios.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Pagina el queryset solo si la petición incluye cursor o tamaño de página.
+
+        Returns:
+            list | None: Página de resultados, o None para devolver la lista completa.
+        """
+        if (self.cursor_query_param not in request.query_params
+                and self.page_size_query_param not in request.query_params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
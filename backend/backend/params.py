@@ -0,0 +1,67 @@
+"""
+Conversión de los parámetros de consulta de la API.
+
+Los filtros recibidos en la cadena de consulta se convierten antes de
+pasarlos al ORM, de modo que un valor mal formado responde 400 con el
+nombre del parámetro en lugar de producir un error en la base de datos:
+- parse_entero: IDs y otros enteros
+- parse_fecha: Fechas (YYYY-MM-DD) y fechas con hora (ISO 8601)
+"""
+
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_entero(param, valor):
+    """
+    Convierte un parámetro en entero.
+
+    Args:
+        param (str): Nombre del parámetro, para el mensaje de error.
+        valor (str): Valor recibido.
+
+    Returns:
+        int: Valor convertido.
+
+    Raises:
+        ValidationError: Si el valor no es un número entero.
+    """
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValidationError({param: 'Debe ser un número entero.'})
+
+
+def parse_fecha(param, valor, fin=False):
+    """
+    Convierte un parámetro de fecha en un instante con zona horaria.
+
+    Una fecha sin hora representa el inicio del día o, si es el final de
+    un rango, el inicio del día siguiente, que debe compararse con __lt.
+
+    Args:
+        param (str): Nombre del parámetro, para el mensaje de error.
+        valor (str): Valor recibido.
+        fin (bool): Si la fecha es el final del rango.
+
+    Returns:
+        tuple: Instante con zona horaria y si el valor era una fecha sin hora.
+
+    Raises:
+        ValidationError: Si el valor no es una fecha válida.
+    """
+    try:
+        dia = parse_date(valor)
+        if dia is not None:
+            instante = datetime.combine(dia + timedelta(days=1) if fin else dia, datetime.min.time())
+        else:
+            instante = parse_datetime(valor)
+    except ValueError:
+        instante = None
+    if instante is None:
+        raise ValidationError({param: 'Fecha no válida, use el formato YYYY-MM-DD o ISO 8601.'})
+    if timezone.is_naive(instante):
+        instante = timezone.make_aware(instante)
+    return instante, dia is not None
@@ -11,6 +11,7 @@ Define las rutas principales y su mapeo a las diferentes aplicaciones:
 - API de gestión de pedidos
 - API de gestión de camas
 - API de gestión de dietas
+- API de consulta del registro de actividades
 """
 
 from django.contrib import admin
@@ -46,4 +47,7 @@ urlpatterns = [
     
     path('api/dietas/', 
          include('dietas.urls')),  # Gestión de dietas
+    
+    path('api/logs/', 
+         include('logs.urls')),  # Consulta del registro de actividades
 ]
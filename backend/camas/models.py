@@ -1,14 +1,11 @@
 """
 Módulo de modelos para la gestión de camas.
 
-Define el modelo Cama y sus señales asociadas para mantener la integridad
-de las relaciones entre camas, habitaciones y pacientes.
+Define el modelo Cama, que mantiene la integridad de las relaciones
+entre camas, habitaciones y pacientes.
 """
 
-from django.db import models
-from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+from django.db import models, transaction
 from habitaciones.models import Habitacion
 
 class Cama(models.Model):
@@ -22,6 +19,7 @@ class Cama(models.Model):
         nombre (str): Identificador único de la cama dentro de una habitación.
         habitacion (Habitacion): Habitación a la que pertenece la cama.
         activo (bool): Estado de la cama (activa/inactiva).
+        updated_at (DateTime): Fecha y hora de la última modificación.
     """
     nombre = models.CharField(max_length=50)
     habitacion = models.ForeignKey(
@@ -30,6 +28,7 @@ class Cama(models.Model):
         on_delete=models.CASCADE
     )
     activo = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('nombre', 'habitacion')
@@ -37,32 +36,25 @@ class Cama(models.Model):
     def __str__(self):
         return f'{self.nombre} - {self.habitacion.nombre}'
 
-@receiver(post_save, sender=Cama)
-def desactivar_paciente(sender, instance, **kwargs):
-    """
-    Señal que desactiva automáticamente los pacientes asociados cuando se desactiva una cama.
-    
-    Args:
-        sender: Modelo que envía la señal (Cama).
-        instance: Instancia de Cama que fue guardada.
-        kwargs: Argumentos adicionales de la señal.
-    """
-    if not instance.activo:
-        from pacientes.models import Paciente
-        Paciente.objects.filter(cama=instance).update(activo=False)
+    def save(self, *args, **kwargs):
+        """
+        Guarda la cama verificando las reglas de negocio.
+        
+        Si la cama queda inactiva, desactiva los pacientes asociados
+        mediante el servicio de cascada.
+        
+        Los conteos de la cascada quedan en self.cascada, sin registrarlos,
+        para que la vista los incluya en su registro de actividad.
+        
+        Raises:
+            ValidationError: Si se intenta activar una cama con habitación inactiva.
+        """
+        from servicios.services import desactivar_en_cascada, validar_activacion
 
-@receiver(pre_save, sender=Cama)
-def validar_activacion_cama(sender, instance, **kwargs):
-    """
-    Señal que valida que una cama solo pueda activarse si su habitación está activa.
-    
-    Args:
-        sender: Modelo que envía la señal (Cama).
-        instance: Instancia de Cama que será guardada.
-        kwargs: Argumentos adicionales de la señal.
-    
-    Raises:
-        ValidationError: Si se intenta activar una cama con habitación inactiva.
-    """
-    if instance.activo and not instance.habitacion.activo:
-        raise ValidationError('No se puede activar una cama si la habitación no está activa.')
+        if self.activo:
+            validar_activacion('cama', self.habitacion_id)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.cascada = {}
+            if not self.activo:
+                self.cascada = desactivar_en_cascada('cama', [self.pk], registrar=False)
@@ -4,15 +4,17 @@ Vistas para la gestión de camas hospitalarias.
 Define las vistas basadas en clase para:
 - Listar y crear camas
 - Recuperar, actualizar y eliminar camas específicas
-Incluye registro de actividades mediante LogEntry.
+Incluye registro de actividades mediante log_action.
 """
 
 from rest_framework import generics
 from .models import Cama
 from .serializers import CamaSerializer
-from logs.models import LogEntry
+from logs.services import log_action
+from servicios.services import detalles_cascada
+from backend.conditional import ConditionalGetMixin
 
-class CamaListCreateView(generics.ListCreateAPIView):
+class CamaListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     Vista para listar todas las camas y crear nuevas.
     
@@ -30,7 +32,7 @@ class CamaListCreateView(generics.ListCreateAPIView):
             serializer: Serializador con los datos validados de la cama.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -42,7 +44,7 @@ class CamaListCreateView(generics.ListCreateAPIView):
             }
         )
 
-class CamaDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CamaDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para gestionar una cama específica.
     
@@ -61,7 +63,7 @@ class CamaDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer: Serializador con los datos validados de la cama.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -70,6 +72,7 @@ class CamaDetailView(generics.RetrieveUpdateDestroyAPIView):
                 'nombre': instance.nombre,
                 'habitacion_id': instance.habitacion.id,
                 'activo': instance.activo,
+                **detalles_cascada(instance),
             }
         )
 
@@ -80,7 +83,7 @@ class CamaDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             instance: Instancia de la cama a eliminar.
         """
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
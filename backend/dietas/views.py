@@ -12,7 +12,7 @@ from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from .models import Dieta, Alergia
 from .serializers import DietaSerializer, AlergiaSerializer
-from logs.models import LogEntry
+from logs.services import log_action
 from pacientes.models import Paciente
 
 class DietaListCreateView(generics.ListCreateAPIView):
@@ -28,7 +28,7 @@ class DietaListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         """Guarda la nueva dieta y registra la acción en el log."""
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -58,7 +58,7 @@ class DietaDetailView(generics.RetrieveUpdateDestroyAPIView):
             self._validar_pacientes_activos(serializer.instance)
         
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -74,7 +74,7 @@ class DietaDetailView(generics.RetrieveUpdateDestroyAPIView):
             ValidationError: Si se intenta eliminar una dieta asignada a pacientes activos.
         """
         self._validar_pacientes_activos(instance)
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
@@ -112,7 +112,7 @@ class AlergiaListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         """Guarda la nueva alergia y registra la acción en el log."""
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -142,7 +142,7 @@ class AlergiaDetailView(generics.RetrieveUpdateDestroyAPIView):
             self._validar_pacientes_activos(serializer.instance)
         
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -158,7 +158,7 @@ class AlergiaDetailView(generics.RetrieveUpdateDestroyAPIView):
             ValidationError: Si se intenta eliminar una alergia asignada a pacientes activos.
         """
         self._validar_pacientes_activos(instance)
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habitaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habitacion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
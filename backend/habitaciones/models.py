@@ -1,15 +1,12 @@
 """
 Módulo de modelos para la gestión de habitaciones hospitalarias.
 
-Define el modelo Habitación y sus señales asociadas para mantener la integridad
-de las relaciones entre servicios, habitaciones, camas y pacientes.
+Define el modelo Habitación, que mantiene la integridad de las relaciones
+entre servicios, habitaciones, camas y pacientes.
 """
 
-from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db import models, transaction
 from servicios.models import Servicio  
-from django.core.exceptions import ValidationError
 
 class Habitacion(models.Model):
     """
@@ -22,10 +19,12 @@ class Habitacion(models.Model):
         nombre (str): Identificador único de la habitación.
         servicio (Servicio): Servicio al que pertenece la habitación.
         activo (bool): Estado de la habitación (activa/inactiva).
+        updated_at (DateTime): Fecha y hora de la última modificación.
     """
     nombre = models.CharField(max_length=255, unique=True)
     servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE)
     activo = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre
@@ -34,29 +33,21 @@ class Habitacion(models.Model):
         """
         Guarda la habitación verificando las reglas de negocio.
         
+        Si la habitación queda inactiva, desactiva sus camas y los pacientes
+        asociados mediante el servicio de cascada.
+        
+        Los conteos de la cascada quedan en self.cascada, sin registrarlos,
+        para que la vista los incluya en su registro de actividad.
+        
         Raises:
             ValidationError: Si se intenta activar una habitación con servicio inactivo.
         """
-        if self.activo and not self.servicio.activo:
-            raise ValidationError('No se puede activar una habitación si el servicio no está activo.')
-        super().save(*args, **kwargs)
-
-@receiver(post_save, sender=Habitacion)
-def desactivar_camas_y_pacientes(sender, instance, **kwargs):
-    """
-    Señal que maneja la desactivación en cascada de camas y pacientes.
-    
-    Cuando una habitación se desactiva, todas sus camas y los pacientes
-    asociados también se desactivan automáticamente.
-    
-    Args:
-        sender: Modelo que envía la señal (Habitacion).
-        instance: Instancia de Habitacion que fue guardada.
-        kwargs: Argumentos adicionales de la señal.
-    """
-    if not instance.activo:
-        from camas.models import Cama  
-        from pacientes.models import Paciente  
+        from servicios.services import desactivar_en_cascada, validar_activacion
 
-        instance.camas.update(activo=False)
-        Paciente.objects.filter(cama__habitacion=instance).update(activo=False)
+        if self.activo:
+            validar_activacion('habitacion', self.servicio_id)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.cascada = {}
+            if not self.activo:
+                self.cascada = desactivar_en_cascada('habitacion', [self.pk], registrar=False)
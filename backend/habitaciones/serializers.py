@@ -73,8 +73,4 @@ class HabitacionSerializer(serializers.ModelSerializer):
             )
 
         instance.save()
-
-        if not instance.activo:
-            instance.camas.update(activo=False)
-
         return instance
@@ -4,15 +4,17 @@ Vistas para la gestión de habitaciones hospitalarias.
 Define las vistas basadas en clase para:
 - Listar y crear habitaciones
 - Recuperar, actualizar y eliminar habitaciones específicas
-Incluye registro de actividades mediante LogEntry.
+Incluye registro de actividades mediante log_action.
 """
 
 from rest_framework import generics
 from .models import Habitacion
 from .serializers import HabitacionSerializer
-from logs.models import LogEntry
+from logs.services import log_action
+from servicios.services import detalles_cascada
+from backend.conditional import ConditionalGetMixin
 
-class HabitacionListCreateView(generics.ListCreateAPIView):
+class HabitacionListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     Vista para listar todas las habitaciones y crear nuevas.
     
@@ -20,6 +22,7 @@ class HabitacionListCreateView(generics.ListCreateAPIView):
     POST: Crea una nueva habitación y registra la acción.
     """
     serializer_class = HabitacionSerializer
+    conditional_relations = ('servicio', 'camas')
 
     def get_queryset(self):
         """Retorna todas las habitaciones."""
@@ -33,7 +36,7 @@ class HabitacionListCreateView(generics.ListCreateAPIView):
             serializer: Serializador con los datos validados de la habitación.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -45,7 +48,7 @@ class HabitacionListCreateView(generics.ListCreateAPIView):
             }
         )
 
-class HabitacionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class HabitacionDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para gestionar una habitación específica.
     
@@ -55,6 +58,7 @@ class HabitacionDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Habitacion.objects.all()
     serializer_class = HabitacionSerializer
+    conditional_relations = ('servicio', 'camas')
 
     def perform_update(self, serializer):
         """
@@ -64,7 +68,7 @@ class HabitacionDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer: Serializador con los datos validados de la habitación.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -73,6 +77,7 @@ class HabitacionDetailView(generics.RetrieveUpdateDestroyAPIView):
                 'nombre': instance.nombre,
                 'servicio_id': instance.servicio.id,
                 'activo': instance.activo,
+                **detalles_cascada(instance),
             }
         )
 
@@ -83,7 +88,7 @@ class HabitacionDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             instance: Instancia de la habitación a eliminar.
         """
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
@@ -0,0 +1,136 @@
+"""
+Comando para archivar registros de actividad antiguos.
+
+Mueve los registros de LogEntry anteriores a una fecha de corte a
+archivos JSONL comprimidos, uno por mes (logs_AAAA_MM.jsonl.gz), y los
+elimina de la tabla para mantenerla pequeña.
+
+Uso:
+    python manage.py archivar_logs --meses 6
+    python manage.py archivar_logs --antes-de 2024-01-01 --destino /var/archivo
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from logs.models import LogEntry
+
+
+class Command(BaseCommand):
+    """
+    Archiva y elimina los registros de actividad anteriores a una fecha.
+
+    Recorre la tabla por lotes en orden (timestamp, id) usando el índice
+    correspondiente, de modo que el consumo de memoria no depende del
+    número de registros archivados. Cada lote se escribe en su archivo
+    mensual antes de eliminarse de la base de datos.
+    """
+    help = 'Archiva en archivos JSONL comprimidos los registros de actividad antiguos y los elimina de la tabla.'
+
+    def add_arguments(self, parser):
+        """Define los argumentos del comando."""
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=6,
+            help='Meses de registros que se conservan en la tabla (por defecto 6).'
+        )
+        parser.add_argument(
+            '--antes-de',
+            dest='antes_de',
+            help='Fecha de corte AAAA-MM-DD. Tiene prioridad sobre --meses.'
+        )
+        parser.add_argument(
+            '--destino',
+            default=getattr(settings, 'LOGS_ARCHIVE_DIR', 'log_archive'),
+            help='Directorio donde se escriben los archivos mensuales.'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Registros procesados por lote (por defecto 5000).'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informa cuántos registros se archivarían.'
+        )
+
+    def _fecha_corte(self, options):
+        """
+        Calcula la fecha de corte del archivado.
+
+        Raises:
+            CommandError: Si la fecha indicada no es válida.
+        """
+        if options['antes_de']:
+            try:
+                fecha = datetime.strptime(options['antes_de'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('La fecha de --antes-de debe tener el formato AAAA-MM-DD.')
+            return timezone.make_aware(fecha)
+        return timezone.now() - timedelta(days=30 * options['meses'])
+
+    def handle(self, *args, **options):
+        """Ejecuta el archivado."""
+        corte = self._fecha_corte(options)
+        pendientes = LogEntry.objects.filter(timestamp__lt=corte)
+
+        if options['dry_run']:
+            self.stdout.write(f'Se archivarían {pendientes.count()} registros anteriores a {corte.isoformat()}.')
+            return
+
+        os.makedirs(options['destino'], exist_ok=True)
+        total = 0
+        ultimo = None
+
+        while True:
+            lote_qs = pendientes.order_by('timestamp', 'id')
+            if ultimo is not None:
+                lote_qs = lote_qs.filter(
+                    Q(timestamp__gt=ultimo[0]) | Q(timestamp=ultimo[0], id__gt=ultimo[1])
+                )
+            lote = list(lote_qs.values(
+                'id', 'user_id', 'action', 'model_name', 'object_id', 'details', 'timestamp'
+            )[:options['lote']])
+            if not lote:
+                break
+
+            self._escribir(options['destino'], lote)
+            with transaction.atomic():
+                LogEntry.objects.filter(id__in=[registro['id'] for registro in lote]).delete()
+
+            total += len(lote)
+            ultimo = (lote[-1]['timestamp'], lote[-1]['id'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Se archivaron {total} registros anteriores a {corte.isoformat()} en {options["destino"]}.'
+        ))
+
+    def _escribir(self, destino, lote):
+        """
+        Añade un lote de registros a sus archivos mensuales.
+
+        Args:
+            destino (str): Directorio de los archivos.
+            lote (list): Registros como diccionarios.
+        """
+        por_mes = {}
+        for registro in lote:
+            mes = timezone.localtime(registro['timestamp']).strftime('%Y_%m')
+            por_mes.setdefault(mes, []).append(registro)
+
+        for mes, registros in por_mes.items():
+            ruta = os.path.join(destino, f'logs_{mes}.jsonl.gz')
+            with gzip.open(ruta, 'at', encoding='utf-8') as archivo:
+                for registro in registros:
+                    archivo.write(json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False))
+                    archivo.write('\n')
@@ -7,18 +7,25 @@ Define el middleware que registra automáticamente los eventos de:
 Utiliza LogEntry para mantener un registro de actividades de autenticación.
 """
 
-from .models import LogEntry
+from .services import log_action
 
 class AuthenticationLoggingMiddleware:
     """
     Middleware para registrar eventos de autenticación.
     
     Intercepta las peticiones de login/logout y crea registros
-    automáticos en el log del sistema.
+    automáticos en el log del sistema. El resto de peticiones pasan sin
+    acceder a request.user, para no cargar el usuario innecesariamente.
     
     Atributos:
         get_response: Función que procesa la siguiente petición en la cadena.
+        acciones (dict): Acción registrada para cada ruta interceptada.
     """
+    acciones = {
+        '/login/': 'LOGIN',
+        '/logout/': 'LOGOUT',
+    }
+
     def __init__(self, get_response):
         """
         Inicializa el middleware.
@@ -40,20 +47,13 @@ class AuthenticationLoggingMiddleware:
         """
         response = self.get_response(request)
         
-        if request.user.is_authenticated:
-            if request.path == '/logout/':
-                LogEntry.objects.create(
-                    user=request.user,
-                    action='LOGOUT',
-                    model='Authentication',
-                    object_id=request.user.id,
-                )
-            elif request.path == '/login/':
-                LogEntry.objects.create(
-                    user=request.user,
-                    action='LOGIN',
-                    model='Authentication',
-                    object_id=request.user.id,
-                )
+        action = self.acciones.get(request.path)
+        if action and request.user.is_authenticated:
+            log_action(
+                user=request.user,
+                action=action,
+                model_name='Authentication',
+                object_id=request.user.id,
+            )
                 
         return response
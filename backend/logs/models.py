@@ -10,6 +10,7 @@ acciones realizadas en el sistema, incluyendo:
 
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -67,12 +68,18 @@ class LogEntry(models.Model):
         help_text='Detalles específicos de la acción'
     )
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         help_text='Fecha y hora de la acción'
     )
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='logentry_ts_id_idx'),
+            models.Index(fields=['model_name', 'object_id', 'timestamp'], name='logentry_model_obj_ts_idx'),
+            models.Index(fields=['user', 'timestamp'], name='logentry_user_ts_idx'),
+            models.Index(fields=['action', 'timestamp'], name='logentry_action_ts_idx'),
+        ]
 
     def __str__(self):
         """Representación en string del registro."""
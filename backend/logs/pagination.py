@@ -0,0 +1,20 @@
+"""
+Paginación para la aplicación de logs.
+
+Define la paginación por cursor sobre (timestamp, id), respaldada por el
+índice compuesto del modelo LogEntry.
+"""
+
+from backend.pagination import KeysetCursorPagination
+
+
+class LogEntryCursorPagination(KeysetCursorPagination):
+    """
+    Paginación por cursor para la consulta de registros de actividad.
+
+    Ordena del registro más reciente al más antiguo, usando el id como
+    desempate para registros con el mismo instante.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 100
+    max_page_size = 1000
@@ -0,0 +1,22 @@
+"""
+Serializadores para la aplicación de logs.
+
+Define la representación JSON de los registros de actividad del sistema.
+"""
+
+from rest_framework import serializers
+from .models import LogEntry
+
+class LogEntrySerializer(serializers.ModelSerializer):
+    """
+    Serializador de solo lectura para el modelo LogEntry.
+    
+    Atributos:
+        username (str): Nombre de usuario de quien realizó la acción.
+    """
+    username = serializers.CharField(source='user.username', read_only=True, default=None)
+
+    class Meta:
+        model = LogEntry
+        fields = ['id', 'user', 'username', 'action', 'model_name', 'object_id', 'details', 'timestamp']
+        read_only_fields = fields
@@ -0,0 +1,233 @@
+"""
+Servicio de escritura del registro de actividades.
+
+Define el escritor asíncrono de LogEntry utilizado por todas las vistas.
+Los registros se encolan en memoria cuando se confirma la transacción de
+la petición y un hilo en segundo plano los inserta por lotes con
+bulk_create, de modo que la auditoría no añade un INSERT a la latencia
+de cada petición.
+
+Configuración opcional en settings:
+    AUDIT_LOG_ASYNC (bool): Si es False, cada registro se guarda de forma
+        síncrona (útil en pruebas). Por defecto True.
+    AUDIT_LOG_MAX_QUEUE_SIZE (int): Registros máximos en cola. Con la cola
+        llena, el registro se guarda de forma síncrona.
+    AUDIT_LOG_BATCH_SIZE (int): Registros máximos por inserción.
+    AUDIT_LOG_FLUSH_INTERVAL (float): Segundos máximos que un registro
+        permanece en cola antes de escribirse.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import LogEntry
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """
+    Escritor por lotes de registros de actividad.
+
+    Mantiene una cola acotada de instancias de LogEntry sin guardar y un
+    hilo que las inserta por lotes. Expone contadores para vigilar la
+    presión sobre la cola.
+
+    Atributos:
+        batch_size (int): Registros máximos por inserción.
+        flush_interval (float): Espera máxima antes de escribir un lote.
+    """
+
+    def __init__(self, max_queue_size=None, batch_size=None, flush_interval=None):
+        """
+        Inicializa el escritor. El hilo se inicia con el primer registro.
+
+        Args:
+            max_queue_size (int, opcional): Tamaño máximo de la cola.
+            batch_size (int, opcional): Registros máximos por inserción.
+            flush_interval (float, opcional): Segundos entre escrituras.
+        """
+        self._queue = queue.Queue(
+            maxsize=max_queue_size or getattr(settings, 'AUDIT_LOG_MAX_QUEUE_SIZE', 10000)
+        )
+        self.batch_size = batch_size or getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1.0)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'sync_writes': 0,
+            'failed': 0,
+            'max_queue_depth': 0,
+        }
+
+    def _count(self, metric, amount=1):
+        """Incrementa un contador de métricas."""
+        with self._lock:
+            self._metrics[metric] += amount
+
+    def stats(self):
+        """
+        Obtiene las métricas del escritor.
+
+        Returns:
+            dict: Contadores de registros encolados, escritos, lotes,
+                escrituras síncronas por cola llena, fallos y profundidad
+                actual y máxima de la cola.
+        """
+        with self._lock:
+            return {
+                **self._metrics,
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+            }
+
+    def _ensure_started(self):
+        """Inicia el hilo de escritura si aún no está en ejecución."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='audit-log-writer',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def enqueue(self, entry):
+        """
+        Encola un registro para su escritura en segundo plano.
+
+        Si la cola está llena, el registro se guarda inmediatamente en el
+        hilo que llama, lo que frena al productor en lugar de perder datos.
+
+        Args:
+            entry (LogEntry): Registro sin guardar.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count('sync_writes')
+            self._write([entry])
+            return
+
+        with self._lock:
+            self._metrics['enqueued'] += 1
+            depth = self._queue.qsize()
+            if depth > self._metrics['max_queue_depth']:
+                self._metrics['max_queue_depth'] = depth
+
+    def _drain(self, first=None):
+        """
+        Extrae de la cola un lote de registros.
+
+        Args:
+            first (LogEntry, opcional): Registro ya extraído que encabeza el lote.
+
+        Returns:
+            list: Registros extraídos, como máximo batch_size.
+        """
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """
+        Inserta un lote de registros.
+
+        Si la inserción por lotes falla, reintenta registro a registro
+        para no perder los registros válidos del lote.
+
+        Args:
+            batch (list): Registros sin guardar.
+        """
+        with self._write_lock:
+            close_old_connections()
+            try:
+                LogEntry.objects.bulk_create(batch)
+                self._count('written', len(batch))
+                self._count('batches')
+                return
+            except Exception:
+                logger.exception('Error al escribir un lote de registros de actividad')
+
+            for entry in batch:
+                try:
+                    entry.save()
+                    self._count('written')
+                except Exception:
+                    self._count('failed')
+                    logger.exception('Registro de actividad descartado: %s', entry)
+
+    def _run(self):
+        """Bucle del hilo de escritura."""
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._drain(first))
+
+    def flush(self):
+        """Escribe de forma síncrona todos los registros en cola."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+
+audit_writer = AuditLogWriter()
+atexit.register(audit_writer.flush)
+
+
+def log_action(action, model_name, user=None, user_id=None, object_id=None, details=None):
+    """
+    Registra una acción en el log de actividades.
+
+    Acepta los mismos argumentos que LogEntry.objects.create. En modo
+    asíncrono el registro se encola cuando se confirma la transacción
+    actual, por lo que las acciones revertidas no quedan registradas.
+
+    Args:
+        action (str): Tipo de acción (CREATE, UPDATE, etc.).
+        model_name (str): Nombre del modelo afectado.
+        user (User, opcional): Usuario que realizó la acción.
+        user_id (int, opcional): ID del usuario, si no se dispone de la instancia.
+        object_id (int, opcional): ID del objeto afectado.
+        details (dict, opcional): Detalles de la acción.
+
+    Returns:
+        LogEntry: Registro creado (sin guardar aún en modo asíncrono).
+    """
+    if user is not None and getattr(user, 'is_authenticated', False):
+        user_id = user.pk
+
+    entry = LogEntry(
+        user_id=user_id,
+        action=action,
+        model_name=model_name,
+        object_id=object_id,
+        details=details if details is not None else {},
+        timestamp=timezone.now(),
+    )
+
+    if not getattr(settings, 'AUDIT_LOG_ASYNC', True):
+        entry.save()
+        return entry
+
+    transaction.on_commit(lambda: audit_writer.enqueue(entry))
+    return entry
@@ -0,0 +1,149 @@
+import gzip
+import json
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authentication.models import CustomUser
+from logs.models import LogEntry
+from logs.services import AuditLogWriter, audit_writer, log_action
+
+class TestLogAction:
+    @pytest.mark.django_db
+    def test_sync_mode_saves_immediately(self, settings):
+        settings.AUDIT_LOG_ASYNC = False
+        entry = log_action(action='CREATE', model_name='Pedido', object_id=1, details={'a': 1})
+        assert entry.pk is not None
+        assert LogEntry.objects.filter(model_name='Pedido', object_id=1).exists()
+
+    @pytest.mark.django_db
+    def test_async_mode_enqueues_on_commit(self, settings, django_capture_on_commit_callbacks):
+        settings.AUDIT_LOG_ASYNC = True
+        with django_capture_on_commit_callbacks() as callbacks:
+            log_action(action='UPDATE', model_name='Menu', object_id=7)
+        assert not LogEntry.objects.filter(model_name='Menu').exists()
+        assert len(callbacks) == 1
+
+    @pytest.mark.django_db
+    def test_flush_writes_queued_entries_in_batches(self):
+        writer = AuditLogWriter(max_queue_size=100, batch_size=10)
+        writer._ensure_started = lambda: None
+        for i in range(25):
+            writer.enqueue(LogEntry(action='LIST', model_name='CustomUser', object_id=i))
+        writer.flush()
+        assert LogEntry.objects.filter(model_name='CustomUser').count() == 25
+        stats = writer.stats()
+        assert stats['written'] == 25
+        assert stats['batches'] == 3
+        assert stats['queue_depth'] == 0
+
+    @pytest.mark.django_db
+    def test_full_queue_falls_back_to_sync_write(self):
+        writer = AuditLogWriter(max_queue_size=2, batch_size=10)
+        writer._ensure_started = lambda: None
+        for i in range(5):
+            writer.enqueue(LogEntry(action='LIST', model_name='Cama', object_id=i))
+        assert LogEntry.objects.filter(model_name='Cama').count() == 3
+        assert writer.stats()['sync_writes'] == 3
+        writer.flush()
+        assert LogEntry.objects.filter(model_name='Cama').count() == 5
+
+class TestArchivarLogs:
+    @pytest.mark.django_db
+    def test_archives_old_entries_by_month(self, tmp_path):
+        antiguo = timezone.now() - timedelta(days=400)
+        LogEntry.objects.bulk_create([
+            LogEntry(action='LOGIN', model_name='CustomUser', timestamp=antiguo - timedelta(minutes=i))
+            for i in range(7)
+        ])
+        reciente = LogEntry.objects.create(action='LOGIN', model_name='CustomUser')
+
+        call_command('archivar_logs', meses=6, destino=str(tmp_path), lote=3)
+
+        assert list(LogEntry.objects.values_list('id', flat=True)) == [reciente.id]
+        lineas = []
+        for archivo in tmp_path.iterdir():
+            with gzip.open(archivo, 'rt', encoding='utf-8') as contenido:
+                lineas.extend(json.loads(linea) for linea in contenido)
+        assert len(lineas) == 7
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_client(api_client):
+    admin = CustomUser.objects.create_user(
+        username='admin', password='adminpass', email='admin@example.com',
+        is_staff=True, is_superuser=True, role='admin'
+    )
+    api_client.force_authenticate(user=admin)
+    return api_client
+
+class TestLogEntryViews:
+    @pytest.mark.django_db
+    def test_list_filters_and_paginates_by_cursor(self, admin_client):
+        LogEntry.objects.bulk_create([
+            LogEntry(action='UPDATE', model_name='Pedido', object_id=i % 3) for i in range(9)
+        ] + [LogEntry(action='CREATE', model_name='Menu', object_id=1)])
+
+        url = reverse('log-list')
+        response = admin_client.get(url, {'model_name': 'Pedido', 'object_id': 1, 'page_size': 2})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 2
+        assert all(r['model_name'] == 'Pedido' and r['object_id'] == 1 for r in response.data['results'])
+
+        siguiente = admin_client.get(response.data['next'])
+        assert len(siguiente.data['results']) == 1
+        assert siguiente.data['next'] is None
+
+    @pytest.mark.django_db
+    def test_list_rejects_invalid_filters(self, admin_client):
+        url = reverse('log-list')
+        for params in ({'object_id': 'abc'}, {'user': 'x'}, {'fecha_inicio': 'ayer'}, {'fecha_fin': '2024-13-45'}):
+            response = admin_client.get(url, params)
+            assert response.status_code == 400
+            assert list(response.data) == list(params)
+        assert admin_client.get(reverse('log-export'), {'user': 'x'}).status_code == 400
+
+    @pytest.mark.django_db
+    def test_list_date_range_includes_whole_end_day(self, admin_client):
+        ayer = timezone.now() - timedelta(days=1)
+        LogEntry.objects.bulk_create([
+            LogEntry(action='LOGIN', model_name='CustomUser', timestamp=ayer),
+            LogEntry(action='LOGIN', model_name='CustomUser', timestamp=ayer - timedelta(days=3)),
+        ])
+        dia = timezone.localdate(ayer).isoformat()
+        response = admin_client.get(reverse('log-list'), {'fecha_inicio': dia, 'fecha_fin': dia})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 1
+
+    @pytest.mark.django_db
+    def test_list_requires_admin(self, api_client):
+        user = CustomUser.objects.create_user(
+            username='cocina', password='pass', email='c@example.com', role='auxiliar'
+        )
+        api_client.force_authenticate(user=user)
+        assert api_client.get(reverse('log-list')).status_code == 403
+
+    @pytest.mark.django_db
+    def test_export_streams_csv_and_ndjson(self, admin_client):
+        LogEntry.objects.bulk_create([
+            LogEntry(action='DELETE', model_name='Cama', object_id=i, details={'n': i}) for i in range(5)
+        ])
+        url = reverse('log-export')
+
+        response = admin_client.get(url, {'model_name': 'Cama'})
+        assert response.status_code == 200
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().strip().splitlines()
+        assert lines[0].startswith('id,user_id,action')
+        assert len(lines) == 6
+
+        response = admin_client.get(url, {'model_name': 'Cama', 'formato': 'ndjson'})
+        registros = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert [r['object_id'] for r in registros] == [0, 1, 2, 3, 4]
+
+        assert admin_client.get(url, {'formato': 'xml'}).status_code == 400
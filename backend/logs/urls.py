@@ -0,0 +1,22 @@
+"""
+Configuración de URLs para la aplicación de logs.
+
+Define las rutas relacionadas con la consulta del registro de actividades:
+- Listado filtrado de registros
+- Exportación en CSV o NDJSON
+"""
+
+from django.urls import path
+from .views import LogEntryListView, LogEntryExportView
+
+urlpatterns = [
+    # Ruta para consultar los registros de actividad
+    path('', 
+         LogEntryListView.as_view(), 
+         name='log-list'),
+    
+    # Ruta para exportar los registros de actividad
+    path('export/', 
+         LogEntryExportView.as_view(), 
+         name='log-export'),
+]
@@ -0,0 +1,144 @@
+"""
+Vistas para la consulta del registro de actividades.
+
+Define las vistas basadas en clase para:
+- Consultar registros con filtros y paginación por cursor
+- Exportar registros en CSV o NDJSON mediante una respuesta en streaming
+Solo accesibles por administradores.
+"""
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import generics, permissions, views, status
+from rest_framework.response import Response
+from backend.params import parse_entero, parse_fecha
+from .models import LogEntry
+from .pagination import LogEntryCursorPagination
+from .serializers import LogEntrySerializer
+
+EXPORT_FIELDS = ['id', 'user_id', 'action', 'model_name', 'object_id', 'details', 'timestamp']
+
+def filtrar_logs(queryset, params):
+    """
+    Aplica a un queryset de LogEntry los filtros recibidos en la petición.
+    
+    Filtros disponibles: user, action, model_name, object_id,
+    fecha_inicio y fecha_fin (rango sobre timestamp; una fecha sin hora
+    en fecha_fin incluye el día completo).
+    
+    Args:
+        queryset (QuerySet): Registros de actividad.
+        params (QueryDict): Parámetros de la petición.
+        
+    Returns:
+        QuerySet: Registros filtrados.
+        
+    Raises:
+        ValidationError: Si algún filtro no tiene un valor válido.
+    """
+    for param, lookup in (('user', 'user_id'), ('object_id', 'object_id')):
+        valor = params.get(param)
+        if valor:
+            queryset = queryset.filter(**{lookup: parse_entero(param, valor)})
+
+    for param in ('action', 'model_name'):
+        valor = params.get(param)
+        if valor:
+            queryset = queryset.filter(**{param: valor})
+
+    if params.get('fecha_inicio'):
+        inicio, _ = parse_fecha('fecha_inicio', params['fecha_inicio'])
+        queryset = queryset.filter(timestamp__gte=inicio)
+    if params.get('fecha_fin'):
+        fin, es_dia = parse_fecha('fecha_fin', params['fecha_fin'], fin=True)
+        queryset = queryset.filter(**{'timestamp__lt' if es_dia else 'timestamp__lte': fin})
+    return queryset
+
+class LogEntryListView(generics.ListAPIView):
+    """
+    Vista para consultar los registros de actividad.
+    
+    GET: Retorna registros filtrados, paginados por cursor sobre (timestamp, id).
+    """
+    serializer_class = LogEntrySerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = LogEntryCursorPagination
+
+    def get_queryset(self):
+        """
+        Obtiene los registros aplicando los filtros de la petición.
+        
+        Returns:
+            QuerySet: Registros filtrados con su usuario precargado.
+        """
+        return filtrar_logs(
+            LogEntry.objects.select_related('user'),
+            self.request.query_params
+        )
+
+class Echo:
+    """Objeto con interfaz de archivo que devuelve lo que se le escribe."""
+
+    def write(self, value):
+        return value
+
+class LogEntryExportView(views.APIView):
+    """
+    Vista para exportar los registros de actividad.
+    
+    GET: Devuelve los registros filtrados en CSV (?formato=csv, por defecto)
+    o NDJSON (?formato=ndjson). La respuesta se genera en streaming a partir
+    de un cursor de base de datos, con un consumo de memoria constante.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    chunk_size = 2000
+
+    def get(self, request):
+        """
+        Genera la exportación de registros.
+        
+        Args:
+            request: Request HTTP con los filtros y el formato.
+            
+        Returns:
+            StreamingHttpResponse: Archivo CSV o NDJSON.
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'ndjson'):
+            return Response(
+                {"detail": "Formato no soportado. Use csv o ndjson."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        registros = filtrar_logs(LogEntry.objects.all(), request.query_params).order_by(
+            'timestamp', 'id'
+        ).values(*EXPORT_FIELDS).iterator(chunk_size=self.chunk_size)
+
+        if formato == 'csv':
+            content = self._csv(registros)
+            content_type = 'text/csv'
+        else:
+            content = self._ndjson(registros)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="logs.{formato}"'
+        return response
+
+    def _csv(self, registros):
+        """Genera las filas CSV de los registros."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for registro in registros:
+            yield writer.writerow([
+                json.dumps(registro['details'], cls=DjangoJSONEncoder, ensure_ascii=False)
+                if field == 'details' else registro[field]
+                for field in EXPORT_FIELDS
+            ])
+
+    def _ndjson(self, registros):
+        """Genera las líneas NDJSON de los registros."""
+        for registro in registros:
+            yield json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -16,3 +16,17 @@ class MenusConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menus'
+
+    def ready(self):
+        """
+        Conecta la limpieza de etiquetas de compatibilidad.
+        
+        Al eliminar una alergia o una dieta se retira su ID de las
+        opciones de menú que la tenían como etiqueta.
+        """
+        from django.db.models.signals import post_delete
+        from dietas.models import Alergia, Dieta
+        from .compatibilidad import retirar_alergia, retirar_dieta
+
+        post_delete.connect(retirar_alergia, sender=Alergia, dispatch_uid='menus_retirar_alergia')
+        post_delete.connect(retirar_dieta, sender=Dieta, dispatch_uid='menus_retirar_dieta')
@@ -0,0 +1,197 @@
+"""
+Caché de representaciones serializadas de menús.
+
+Los listados de pedidos y de menús repiten la serialización del mismo
+puñado de menús en cada consulta. Este módulo mantiene una caché LRU
+local al proceso, respaldada opcionalmente por una caché de Django
+compartida entre procesos, con las representaciones ya construidas
+por MenuSerializer.
+
+Las entradas se identifican por (menu_id, version). La versión se guarda
+en la base de datos y se incrementa en cada modificación del menú, por lo
+que todos los procesos dejan de usar una representación obsoleta sin
+necesidad de coordinarse.
+
+Las versiones publicadas (MenuVersion) son inmutables: su representación
+se guarda en caché por su ID, sin expiración ni invalidación.
+
+Configuración opcional en settings:
+    MENU_CACHE_ALIAS (str): Alias de la caché de Django compartida.
+        Si no se define, solo se usa la caché local del proceso.
+    MENU_CACHE_MAX_ENTRIES (int): Máximo de menús en la caché local.
+    MENU_CACHE_TIMEOUT (int): Tiempo de vida en segundos en la caché compartida.
+"""
+
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import prefetch_related_objects
+
+
+class MenuCache:
+    """
+    Caché LRU de menús serializados con una capa compartida opcional.
+
+    Atributos:
+        max_entries (int): Número máximo de representaciones en memoria.
+    """
+
+    def __init__(self, max_entries=None):
+        """
+        Inicializa la caché vacía.
+
+        Args:
+            max_entries (int, opcional): Límite de entradas locales. Por defecto
+                se toma de MENU_CACHE_MAX_ENTRIES o 128.
+        """
+        self.max_entries = max_entries or getattr(settings, 'MENU_CACHE_MAX_ENTRIES', 128)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_cache(self):
+        """
+        Obtiene la caché de Django compartida, si está configurada.
+
+        Returns:
+            BaseCache | None: Backend de caché o None si no se configuró.
+        """
+        alias = getattr(settings, 'MENU_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _shared_key(menu_id, version):
+        """Clave usada en la caché compartida."""
+        return f'menu:{menu_id}:v{version}'
+
+    def _get_local(self, key):
+        """Busca una entrada local y la marca como usada recientemente."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _set_local(self, key, data):
+        """Guarda una entrada local descartando las menos usadas."""
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def obtener(self, menu):
+        """
+        Devuelve la representación serializada de un menú.
+
+        Busca primero en la caché local y luego en la compartida. Si no
+        existe, serializa el menú cargando sus secciones y opciones con
+        dos consultas.
+
+        Args:
+            menu (Menu): Instancia del menú, con su versión actual.
+
+        Returns:
+            dict: Representación equivalente a MenuSerializer(menu).data.
+                Se comparte entre peticiones y no debe modificarse.
+        """
+        key = (menu.pk, menu.version)
+        data = self._get_local(key)
+        if data is not None:
+            return data
+
+        shared = self._shared_cache()
+        if shared is not None:
+            data = shared.get(self._shared_key(*key))
+
+        if data is None:
+            from .serializers import MenuSerializer
+            prefetch_related_objects([menu], 'sections__options')
+            data = MenuSerializer(menu).data
+            if shared is not None:
+                shared.set(
+                    self._shared_key(*key),
+                    data,
+                    getattr(settings, 'MENU_CACHE_TIMEOUT', None)
+                )
+
+        self._set_local(key, data)
+        return data
+
+    def obtener_varios(self, menus):
+        """
+        Devuelve las representaciones de varios menús conservando su orden.
+
+        Los menús que no están en caché se serializan juntos, con un número
+        fijo de consultas.
+
+        Args:
+            menus (Iterable[Menu]): Menús a representar.
+
+        Returns:
+            list: Representaciones serializadas en el mismo orden.
+        """
+        menus = list(menus)
+        pendientes = [
+            menu for menu in menus
+            if self._get_local((menu.pk, menu.version)) is None
+        ]
+        if pendientes:
+            prefetch_related_objects(pendientes, 'sections__options')
+        return [self.obtener(menu) for menu in menus]
+
+    def obtener_version(self, menu_version_id):
+        """
+        Devuelve la representación guardada de una versión publicada.
+
+        Como las versiones no cambian, la entrada no se invalida nunca y en
+        la caché compartida se guarda sin expiración.
+
+        Args:
+            menu_version_id (int): ID de la versión publicada.
+
+        Returns:
+            dict: Representación del menú en esa versión. Se comparte entre
+                peticiones y no debe modificarse.
+        """
+        key = ('version', menu_version_id)
+        data = self._get_local(key)
+        if data is not None:
+            return data
+
+        shared = self._shared_cache()
+        shared_key = f'menuversion:{menu_version_id}'
+        if shared is not None:
+            data = shared.get(shared_key)
+
+        if data is None:
+            from .models import MenuVersion
+            data = MenuVersion.objects.values_list('snapshot', flat=True).get(pk=menu_version_id)
+            if shared is not None:
+                shared.set(shared_key, data, None)
+
+        self._set_local(key, data)
+        return data
+
+    def invalidar(self, menu_id):
+        """
+        Elimina de la caché local todas las versiones de un menú.
+
+        Las entradas de la caché compartida quedan obsoletas por el cambio
+        de versión y expiran por sí solas.
+
+        Args:
+            menu_id (int): Identificador del menú modificado o eliminado.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == menu_id]:
+                del self._entries[key]
+
+    def limpiar(self):
+        """Vacía la caché local del proceso."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instancia compartida por las vistas y serializadores del proceso
+menu_cache = MenuCache()
@@ -0,0 +1,188 @@
+"""
+Índice de compatibilidad entre opciones de menú, alergias y dietas.
+
+Cada opción de menú guarda precalculadas dos máscaras de bits: la de sus
+alérgenos y la de las dietas con las que es incompatible. El bit n de cada
+máscara corresponde a la alergia o dieta con ID n, de modo que las máscaras
+no dependen del catálogo y no hay que recalcularlas cuando se crean
+alergias y dietas; solo cambian al editar las etiquetas de la opción. Se
+guardan en hexadecimal porque los IDs pueden superar los 64 bits de un
+entero de la base de datos; los IDs se validan contra el catálogo y no
+pueden superar MAX_ID, lo que acota el tamaño de cada máscara. Al eliminar
+una alergia o dieta, retirar_etiqueta la quita de las opciones.
+
+Comprobar una opción contra un paciente se reduce a un AND entre enteros:
+- Filtrado de las opciones de un menú para un paciente
+- Validación de la selección de un pedido
+"""
+
+from django.db.models import F
+from django.utils import timezone
+from pacientes.models import Paciente
+from .models import Menu, MenuOption
+
+# Mayor ID de alergia o dieta admitido en las máscaras (máscaras de hasta 1 KB)
+MAX_ID = 8191
+
+
+def mascara(ids):
+    """
+    Construye la máscara de bits de un conjunto de IDs.
+
+    Args:
+        ids (Iterable[int]): IDs de alergias o dietas.
+
+    Returns:
+        int: Entero con el bit n activo para cada ID n.
+
+    Raises:
+        ValueError: Si algún ID es negativo o mayor que MAX_ID.
+    """
+    bits = 0
+    for id in ids or ():
+        id = int(id)
+        if not 0 <= id <= MAX_ID:
+            raise ValueError(f'ID fuera del rango de la máscara: {id}')
+        bits |= 1 << id
+    return bits
+
+
+def a_hex(bits):
+    """Representación hexadecimal de una máscara, tal como se guarda."""
+    return format(bits, 'x')
+
+
+def de_hex(valor):
+    """Convierte una máscara guardada en hexadecimal a entero."""
+    return int(valor or '0', 16)
+
+
+def mascaras_paciente(paciente_id):
+    """
+    Obtiene las máscaras de alergias y dietas de un paciente.
+
+    Args:
+        paciente_id (int): ID del paciente.
+
+    Returns:
+        tuple: (alergias, dietas) como enteros.
+    """
+    # Los IDs mayores que MAX_ID no pueden etiquetar opciones
+    alergias = Paciente.alergias.through.objects.filter(
+        paciente_id=paciente_id, alergia_id__lte=MAX_ID
+    ).values_list('alergia_id', flat=True)
+    dietas = Paciente.dietas.through.objects.filter(
+        paciente_id=paciente_id, dieta_id__lte=MAX_ID
+    ).values_list('dieta_id', flat=True)
+    return mascara(alergias), mascara(dietas)
+
+
+def es_compatible(alergenos_bits, dietas_bits, alergias, dietas):
+    """
+    Indica si una opción es apta para un paciente.
+
+    Args:
+        alergenos_bits (str): Máscara hexadecimal de alérgenos de la opción.
+        dietas_bits (str): Máscara hexadecimal de dietas excluidas de la opción.
+        alergias (int): Máscara de alergias del paciente.
+        dietas (int): Máscara de dietas del paciente.
+
+    Returns:
+        bool: True si la opción no contiene alérgenos del paciente ni está
+            excluida de sus dietas.
+    """
+    return not (de_hex(alergenos_bits) & alergias or de_hex(dietas_bits) & dietas)
+
+
+def opciones_incompatibles(menu_id, paciente_id):
+    """
+    Obtiene los IDs de las opciones de un menú no aptas para un paciente.
+
+    Usa tres consultas: las máscaras del paciente y las de las opciones
+    del menú, sin cargar las opciones completas.
+
+    Args:
+        menu_id (int): ID del menú.
+        paciente_id (int): ID del paciente.
+
+    Returns:
+        set: IDs de las opciones incompatibles.
+    """
+    alergias, dietas = mascaras_paciente(paciente_id)
+    if not alergias and not dietas:
+        return set()
+    return {
+        id for id, alergenos_bits, dietas_bits in MenuOption.objects.filter(
+            section__menu_id=menu_id
+        ).values_list('id', 'alergenos_bits', 'dietas_bits')
+        if not es_compatible(alergenos_bits, dietas_bits, alergias, dietas)
+    }
+
+
+def filtrar_menu(data, excluir):
+    """
+    Copia la representación de un menú sin las opciones indicadas.
+
+    La representación recibida puede venir de la caché, por lo que no se
+    modifica.
+
+    Args:
+        data (dict): Representación del menú (MenuSerializer).
+        excluir (set): IDs de las opciones a quitar.
+
+    Returns:
+        dict: Nueva representación del menú.
+    """
+    if not excluir:
+        return data
+    return {
+        **data,
+        'sections': [
+            {
+                **section,
+                'opciones': {
+                    tipo: [opcion for opcion in opciones if opcion['id'] not in excluir]
+                    for tipo, opciones in section.get('opciones', {}).items()
+                },
+            }
+            for section in data['sections']
+        ],
+    }
+
+
+def retirar_etiqueta(campo, id):
+    """
+    Quita una alergia o dieta eliminada de las etiquetas de las opciones.
+
+    Recalcula las máscaras de las opciones afectadas con un bulk_update e
+    incrementa la versión de sus menús para descartar las representaciones
+    en caché. Las versiones publicadas conservan sus etiquetas.
+
+    Args:
+        campo (str): 'alergenos' o 'dietas_excluidas'.
+        id (int): ID de la alergia o dieta eliminada.
+    """
+    afectadas = [
+        opcion for opcion in MenuOption.objects.exclude(**{campo: []}).select_related('section')
+        if id in getattr(opcion, campo)
+    ]
+    if not afectadas:
+        return
+    for opcion in afectadas:
+        setattr(opcion, campo, [valor for valor in getattr(opcion, campo) if valor != id])
+        opcion.actualizar_mascaras()
+    MenuOption.objects.bulk_update(afectadas, [campo, 'alergenos_bits', 'dietas_bits'])
+    Menu.objects.filter(id__in={opcion.section.menu_id for opcion in afectadas}).update(
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+
+
+def retirar_alergia(sender, instance, **kwargs):
+    """Receptor de post_delete de Alergia."""
+    retirar_etiqueta('alergenos', instance.pk)
+
+
+def retirar_dieta(sender, instance, **kwargs):
+    """Receptor de post_delete de Dieta."""
+    retirar_etiqueta('dietas_excluidas', instance.pk)
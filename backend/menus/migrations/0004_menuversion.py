@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def publicar_versiones(apps, schema_editor):
+    """Publica la versión actual de los menús existentes."""
+    Menu = apps.get_model('menus', 'Menu')
+    MenuOption = apps.get_model('menus', 'MenuOption')
+    MenuVersion = apps.get_model('menus', 'MenuVersion')
+
+    for menu in Menu.objects.prefetch_related('sections').iterator(chunk_size=100):
+        sections = []
+        for section in menu.sections.all():
+            opciones = {}
+            for opcion in MenuOption.objects.filter(section=section).order_by('id'):
+                opciones.setdefault(opcion.tipo, []).append(
+                    {'id': opcion.id, 'texto': opcion.texto, 'tipo': opcion.tipo}
+                )
+            sections.append({'id': section.id, 'titulo': section.titulo, 'opciones': opciones})
+        MenuVersion.objects.create(
+            menu=menu,
+            numero=menu.version,
+            snapshot={'id': menu.id, 'nombre': menu.nombre, 'sections': sections}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0003_menu_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField()),
+                ('snapshot', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('menu', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='versiones', to='menus.menu')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='menuversion',
+            constraint=models.UniqueConstraint(fields=('menu', 'numero'), name='menuversion_menu_numero_uniq'),
+        ),
+        migrations.RunPython(publicar_versiones, migrations.RunPython.noop),
+    ]
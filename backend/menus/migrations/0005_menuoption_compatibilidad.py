@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0004_menuversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuoption',
+            name='alergenos',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='menuoption',
+            name='alergenos_bits',
+            field=models.TextField(default='0', editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuoption',
+            name='dietas_bits',
+            field=models.TextField(default='0', editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuoption',
+            name='dietas_excluidas',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
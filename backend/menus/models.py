@@ -4,10 +4,11 @@ Módulo de modelos para la gestión de menús hospitalarios.
 Define los modelos para estructurar los menús del hospital:
 - Menús principales
 - Secciones de menú
-- Opciones específicas por sección
+- Opciones específicas por sección, con sus alérgenos y dietas incompatibles
+- Versiones publicadas e inmutables de cada menú
 """
 
-from django.db import models
+from django.db import models, IntegrityError, transaction
 
 class Menu(models.Model):
     """
@@ -18,8 +19,13 @@ class Menu(models.Model):
     
     Atributos:
         nombre (str): Nombre identificativo del menú.
+        version (int): Versión del contenido del menú. Se incrementa con cada
+            modificación y forma parte de la clave de la caché de menús.
+        updated_at (DateTime): Fecha y hora de la última modificación.
     """
     nombre = models.CharField(max_length=255)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.nombre
@@ -56,6 +62,12 @@ class MenuOption(models.Model):
         section (MenuSection): Sección a la que pertenece la opción.
         texto (str): Descripción de la opción del menú.
         tipo (str): Categoría de la opción (entrada, plato principal, etc.).
+        alergenos (JSONField): IDs de las alergias (Alergia) que contiene la opción.
+        dietas_excluidas (JSONField): IDs de las dietas (Dieta) con las que la
+            opción no es compatible.
+        alergenos_bits (str): Máscara precalculada de alergenos en hexadecimal,
+            con un bit por ID de alergia.
+        dietas_bits (str): Máscara precalculada de dietas_excluidas en hexadecimal.
     """
     TIPO_OPCION_CHOICES = [
         ('entrada', 'Entrada'),
@@ -87,6 +99,102 @@ class MenuOption(models.Model):
         max_length=50, 
         choices=TIPO_OPCION_CHOICES
     )
+    alergenos = models.JSONField(default=list, blank=True)
+    dietas_excluidas = models.JSONField(default=list, blank=True)
+    alergenos_bits = models.TextField(default='0', editable=False)
+    dietas_bits = models.TextField(default='0', editable=False)
+
+    def actualizar_mascaras(self):
+        """
+        Recalcula las máscaras de compatibilidad a partir de las etiquetas.
+        
+        Se invoca al guardar la opción y antes de las escrituras masivas,
+        que no pasan por save().
+        """
+        from .compatibilidad import a_hex, mascara
+        self.alergenos_bits = a_hex(mascara(self.alergenos))
+        self.dietas_bits = a_hex(mascara(self.dietas_excluidas))
+
+    def save(self, *args, **kwargs):
+        """
+        Sobrescribe el método save para mantener las máscaras de compatibilidad.
+        """
+        self.actualizar_mascaras()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'alergenos_bits', 'dietas_bits'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.texto
+
+
+class MenuVersionQuerySet(models.QuerySet):
+    """
+    QuerySet personalizado para el modelo MenuVersion.
+    """
+
+    def vigente(self, menu):
+        """
+        Obtiene la versión publicada correspondiente al contenido actual del menú.
+        
+        Si la versión actual del menú aún no se ha publicado, la publica
+        guardando la representación serializada del menú.
+        
+        Args:
+            menu (Menu): Menú con su versión actual.
+            
+        Returns:
+            MenuVersion: Versión publicada del menú.
+        """
+        version = self.filter(menu=menu, numero=menu.version).only('id', 'menu_id', 'numero').first()
+        if version is not None:
+            return version
+
+        from .serializers import MenuSerializer
+        snapshot = MenuSerializer(
+            Menu.objects.prefetch_related('sections__options').get(pk=menu.pk)
+        ).data
+        try:
+            with transaction.atomic():
+                return self.create(menu=menu, numero=menu.version, snapshot=snapshot)
+        except IntegrityError:
+            # Otro proceso publicó la misma versión al mismo tiempo
+            return self.get(menu=menu, numero=menu.version)
+
+
+class MenuVersion(models.Model):
+    """
+    Modelo que representa una versión publicada e inmutable de un menú.
+    
+    Guarda la representación serializada del menú en el momento de la
+    publicación. Los pedidos referencian la versión vigente al crearse,
+    de modo que su menú no cambia con las ediciones posteriores y su
+    representación puede guardarse en caché sin invalidación.
+    
+    Atributos:
+        menu (Menu): Menú publicado. Se conserva la versión aunque el menú
+            se elimine.
+        numero (int): Versión del menú que se publicó.
+        snapshot (JSONField): Representación del menú (MenuSerializer).
+        created_at (DateTime): Fecha y hora de publicación.
+    """
+    menu = models.ForeignKey(
+        Menu,
+        related_name='versiones',
+        null=True,
+        on_delete=models.SET_NULL
+    )
+    numero = models.PositiveIntegerField()
+    snapshot = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = MenuVersionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['menu', 'numero'], name='menuversion_menu_numero_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot.get('nombre')} v{self.numero}"
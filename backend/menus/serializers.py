@@ -3,22 +3,44 @@ Serializadores para la aplicación de menús.
 
 Define los serializadores para convertir los modelos de menús, secciones y opciones
 en representaciones JSON y viceversa, incluyendo la gestión anidada de sus relaciones.
+
+Las actualizaciones cargan el árbol existente con un número fijo de consultas,
+calculan la diferencia con los datos recibidos y la aplican con bulk_create,
+bulk_update y un único delete por nivel.
 """
 
 from rest_framework import serializers
-from .models import Menu, MenuSection, MenuOption
+from .models import Menu, MenuSection, MenuOption, MenuVersion
+from .cache import menu_cache
+from .compatibilidad import MAX_ID
+from dietas.models import Alergia, Dieta
 from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
 class MenuOptionSerializer(serializers.ModelSerializer):
     """
     Serializador para el modelo MenuOption.
     
     Proporciona la conversión entre instancias de opciones de menú
-    y su representación en JSON.
+    y su representación en JSON. El id es escribible para identificar
+    las opciones existentes al actualizar un menú.
+    
+    Atributos:
+        alergenos (ListField): IDs de las alergias que contiene la opción.
+        dietas_excluidas (ListField): IDs de las dietas incompatibles con la opción.
     """
+    id = serializers.IntegerField(required=False)
+    alergenos = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID), required=False
+    )
+    dietas_excluidas = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID), required=False
+    )
+
     class Meta:
         model = MenuOption
-        fields = ['id', 'texto', 'tipo']
+        fields = ['id', 'texto', 'tipo', 'alergenos', 'dietas_excluidas']
 
 class MenuSectionSerializer(serializers.ModelSerializer):
     """
@@ -28,8 +50,11 @@ class MenuSectionSerializer(serializers.ModelSerializer):
     agrupadas por tipo.
     
     Atributos:
+        id (IntegerField): ID de la sección, escribible para identificar
+            las secciones existentes al actualizar un menú.
         opciones (DictField): Diccionario de opciones agrupadas por tipo.
     """
+    id = serializers.IntegerField(required=False)
     opciones = serializers.DictField(
         child=serializers.ListField(child=MenuOptionSerializer()),
         required=False
@@ -56,18 +81,18 @@ class MenuSectionSerializer(serializers.ModelSerializer):
         menu = self.context.get('menu')
         if not menu:
             raise serializers.ValidationError("El menú asociado es requerido.")
+        validated_data.pop('id', None)
         section = MenuSection.objects.create(menu=menu, **validated_data)
-
-        for tipo, opciones_list in opciones_data.items():
-            for opcion_data in opciones_list:
-                opcion_data['tipo'] = tipo
-                MenuOption.objects.create(section=section, **opcion_data)
+        sincronizar_opciones([(section, opciones_data)], {})
         return section
 
     def update(self, instance, validated_data):
         """
         Actualiza una sección existente y sus opciones.
         
+        Carga las opciones de la sección en una sola consulta y aplica
+        la diferencia con sincronizar_opciones.
+        
         Args:
             instance: Instancia de MenuSection a actualizar.
             validated_data: Nuevos datos validados.
@@ -76,29 +101,14 @@ class MenuSectionSerializer(serializers.ModelSerializer):
             MenuSection: Instancia actualizada.
         """
         opciones_data = validated_data.pop('opciones', {})
-        instance.titulo = validated_data.get('titulo', instance.titulo)
-        instance.save()
+        if instance.titulo != validated_data.get('titulo', instance.titulo):
+            instance.titulo = validated_data['titulo']
+            instance.save(update_fields=['titulo'])
 
-        existing_option_ids = []
-        for tipo, opciones_list in opciones_data.items():
-            for opcion_data in opciones_list:
-                opcion_id = opcion_data.get('id', None)
-                opcion_data['tipo'] = tipo
-                if opcion_id:
-                    try:
-                        opcion = MenuOption.objects.get(id=opcion_id, section=instance)
-                        for attr, value in opcion_data.items():
-                            setattr(opcion, attr, value)
-                        opcion.save()
-                        existing_option_ids.append(opcion_id)
-                    except MenuOption.DoesNotExist:
-                        new_option = MenuOption.objects.create(section=instance, **opcion_data)
-                        existing_option_ids.append(new_option.id)
-                else:
-                    new_option = MenuOption.objects.create(section=instance, **opcion_data)
-                    existing_option_ids.append(new_option.id)
-
-        MenuOption.objects.filter(section=instance).exclude(id__in=existing_option_ids).delete()
+        sincronizar_opciones(
+            [(instance, opciones_data)],
+            {opcion.id: opcion for opcion in MenuOption.objects.filter(section=instance)}
+        )
         return instance
 
     def to_representation(self, instance):
@@ -138,9 +148,44 @@ class MenuSerializer(serializers.ModelSerializer):
         model = Menu
         fields = ['id', 'nombre', 'sections']
 
+    def validate_sections(self, sections):
+        """
+        Verifica que las etiquetas de las opciones existan en el catálogo.
+        
+        Reúne los IDs de alergias y dietas de todas las opciones y los
+        comprueba con una consulta por catálogo.
+        
+        Args:
+            sections (list): Secciones validadas con sus opciones.
+            
+        Returns:
+            list: Las mismas secciones.
+            
+        Raises:
+            ValidationError: Si alguna etiqueta no corresponde a una alergia
+                o dieta existente.
+        """
+        opciones = [
+            opcion
+            for section in sections
+            for opciones_list in (section.get('opciones') or {}).values()
+            for opcion in opciones_list
+        ]
+        for campo, modelo in (('alergenos', Alergia), ('dietas_excluidas', Dieta)):
+            ids = {id for opcion in opciones for id in opcion.get(campo, [])}
+            if not ids:
+                continue
+            desconocidos = ids - set(modelo.objects.filter(id__in=ids).values_list('id', flat=True))
+            if desconocidos:
+                raise serializers.ValidationError(
+                    f"{campo}: no existen los IDs {', '.join(map(str, sorted(desconocidos)))}."
+                )
+        return sections
+
     def create(self, validated_data):
         """
-        Crea un nuevo menú con todas sus secciones y opciones.
+        Crea un nuevo menú con todas sus secciones y opciones y publica
+        su primera versión.
         
         Args:
             validated_data: Datos validados del menú y sus secciones.
@@ -158,12 +203,18 @@ class MenuSerializer(serializers.ModelSerializer):
                 )
                 section_serializer.is_valid(raise_exception=True)
                 section_serializer.save()
+        menu_cache.invalidar(menu.id)
+        MenuVersion.objects.vigente(menu)
         return menu
 
     def update(self, instance, validated_data):
         """
         Actualiza un menú existente y todas sus secciones.
         
+        Al finalizar incrementa la versión del menú para que las
+        representaciones en caché dejen de utilizarse y publica la nueva
+        versión, que referenciarán los pedidos creados a partir de ahora.
+        
         Args:
             instance: Instancia de Menu a actualizar.
             validated_data: Nuevos datos validados.
@@ -171,40 +222,117 @@ class MenuSerializer(serializers.ModelSerializer):
         Returns:
             Menu: Instancia actualizada.
         """
+        with transaction.atomic():
+            self._update_sections(instance, validated_data)
+            Menu.objects.filter(pk=instance.pk).update(
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+        instance.refresh_from_db(fields=['version'])
+        menu_cache.invalidar(instance.id)
+        MenuVersion.objects.vigente(instance)
+        return instance
+
+    def _update_sections(self, instance, validated_data):
+        """
+        Aplica los cambios del menú y de sus secciones.
+        
+        Carga las secciones y las opciones existentes del menú en dos
+        consultas y aplica la diferencia por niveles: las secciones nuevas
+        se insertan (sus IDs son necesarios para sus opciones), las
+        modificadas se actualizan con bulk_update y las que ya no están se
+        eliminan con un único delete; las opciones se sincronizan con
+        sincronizar_opciones.
+        
+        Args:
+            instance: Instancia de Menu a actualizar.
+            validated_data: Nuevos datos validados.
+        """
         sections_data = validated_data.pop('sections', [])
         instance.nombre = validated_data.get('nombre', instance.nombre)
         instance.save()
 
-        existing_section_ids = []
+        secciones = {section.id: section for section in MenuSection.objects.filter(menu=instance)}
+        opciones = {opcion.id: opcion for opcion in MenuOption.objects.filter(section__menu=instance)}
+
+        conservar = set()
+        actualizar = []
+        opciones_por_seccion = []
         for section_data in sections_data:
-            section_id = section_data.get('id', None)
-            if section_id:
-                try:
-                    section = MenuSection.objects.get(id=section_id, menu=instance)
-                    section_serializer = MenuSectionSerializer(
-                        instance=section,
-                        data=section_data,
-                        context={'menu': instance}
-                    )
-                    section_serializer.is_valid(raise_exception=True)
-                    section_serializer.save()
-                    existing_section_ids.append(section.id)
-                except MenuSection.DoesNotExist:
-                    new_section_serializer = MenuSectionSerializer(
-                        data=section_data,
-                        context={'menu': instance}
-                    )
-                    new_section_serializer.is_valid(raise_exception=True)
-                    new_section_serializer.save()
-                    existing_section_ids.append(new_section_serializer.instance.id)
+            section = secciones.get(section_data.get('id'))
+            if section is None or section.id in conservar:
+                section = MenuSection.objects.create(menu=instance, titulo=section_data['titulo'])
             else:
-                new_section_serializer = MenuSectionSerializer(
-                    data=section_data,
-                    context={'menu': instance}
-                )
-                new_section_serializer.is_valid(raise_exception=True)
-                new_section_serializer.save()
-                existing_section_ids.append(new_section_serializer.instance.id)
+                conservar.add(section.id)
+                if section.titulo != section_data['titulo']:
+                    section.titulo = section_data['titulo']
+                    actualizar.append(section)
+            opciones_por_seccion.append((section, section_data.get('opciones', {})))
 
-        MenuSection.objects.filter(menu=instance).exclude(id__in=existing_section_ids).delete()
-        return instance
+        eliminar = set(secciones) - conservar
+        if eliminar:
+            MenuSection.objects.filter(id__in=eliminar).delete()
+        if actualizar:
+            MenuSection.objects.bulk_update(actualizar, ['titulo'])
+        sincronizar_opciones(
+            opciones_por_seccion,
+            {id: opcion for id, opcion in opciones.items() if opcion.section_id not in eliminar}
+        )
+
+
+def sincronizar_opciones(opciones_por_seccion, existentes):
+    """
+    Aplica la diferencia entre las opciones existentes y las recibidas.
+    
+    Las opciones recibidas con el ID de una opción existente se actualizan
+    (texto, tipo, sección y etiquetas de compatibilidad) solo si cambiaron;
+    el resto se crean. Las opciones existentes que no se reciben se
+    eliminan. Cada tipo de escritura se realiza en una sola consulta (la
+    actualización solo incluye las columnas que cambiaron) y
+    las máscaras de compatibilidad se recalculan antes de escribir.
+    
+    Args:
+        opciones_por_seccion (list): Pares (MenuSection, opciones agrupadas por tipo).
+        existentes (dict): Opciones existentes de esas secciones por ID.
+    """
+    conservar = set()
+    crear = []
+    actualizar = []
+    campos = set()
+    for section, opciones_data in opciones_por_seccion:
+        for tipo, opciones_list in opciones_data.items():
+            for opcion_data in opciones_list:
+                valores = {
+                    'section_id': section.id,
+                    'texto': opcion_data['texto'],
+                    'tipo': tipo,
+                    'alergenos': sorted(set(opcion_data.get('alergenos', []))),
+                    'dietas_excluidas': sorted(set(opcion_data.get('dietas_excluidas', []))),
+                }
+                opcion = existentes.get(opcion_data.get('id'))
+                if opcion is None or opcion.id in conservar:
+                    opcion = MenuOption(**valores)
+                    opcion.actualizar_mascaras()
+                    crear.append(opcion)
+                    continue
+                conservar.add(opcion.id)
+                cambios = {campo for campo, valor in valores.items() if getattr(opcion, campo) != valor}
+                if cambios:
+                    for campo in cambios:
+                        setattr(opcion, campo, valores[campo])
+                    if cambios & {'alergenos', 'dietas_excluidas'}:
+                        opcion.actualizar_mascaras()
+                        cambios |= {'alergenos_bits', 'dietas_bits'}
+                    campos |= cambios
+                    actualizar.append(opcion)
+
+    eliminar = set(existentes) - conservar
+    if eliminar:
+        MenuOption.objects.filter(id__in=eliminar).delete()
+    if actualizar:
+        # Solo se escriben las columnas que cambiaron en alguna opción
+        MenuOption.objects.bulk_update(actualizar, sorted(
+            'section' if campo == 'section_id' else campo for campo in campos
+        ))
+    if crear:
+        MenuOption.objects.bulk_create(crear)
@@ -1,8 +1,17 @@
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from menus.models import Menu, MenuSection, MenuOption
+from menus.serializers import MenuSectionSerializer
+from authentication.cache import usuario_cache
+from servicios.models import Servicio
+from habitaciones.models import Habitacion
+from camas.models import Cama
+from dietas.models import Dieta, Alergia
+from pacientes.models import Paciente
 from authentication.models import CustomUser
 
 @pytest.fixture
@@ -199,4 +208,206 @@ class TestMenuCRUD:
         response = authenticated_client.put(url, payload, format='json')
         assert response.status_code == status.HTTP_200_OK
         option = MenuOption.objects.get(id=option.id)
-        assert option.preparado_en == ['Leche', 'Agua']
\ No newline at end of file
+        assert option.preparado_en == ['Leche', 'Agua']
+
+    @pytest.mark.django_db
+    def test_retrieve_reflects_update_after_cache(self, authenticated_client):
+        menu = Menu.objects.create(nombre='Menú en Caché')
+        section = MenuSection.objects.create(menu=menu, titulo='Almuerzo')
+        MenuOption.objects.create(section=section, texto='Sopa', tipo='sopa_del_dia')
+
+        url = reverse('menu-detail', args=[menu.id])
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['nombre'] == 'Menú en Caché'
+
+        payload = {
+            'nombre': 'Menú Renombrado',
+            'sections': [
+                {
+                    'titulo': 'Almuerzo',
+                    'opciones': {
+                        'sopa_del_dia': [
+                            {'texto': 'Sopa de Verduras', 'tipo': 'sopa_del_dia'},
+                        ],
+                    }
+                },
+            ]
+        }
+        response = authenticated_client.put(url, payload, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        menu.refresh_from_db()
+        assert menu.version == 2
+
+        response = authenticated_client.get(url)
+        assert response.data['nombre'] == 'Menú Renombrado'
+        assert response.data['sections'][0]['opciones']['sopa_del_dia'][0]['texto'] == 'Sopa de Verduras'
+
+
+def crear_menu(cantidad):
+    menu = Menu.objects.create(nombre='Menú Grande')
+    desayuno = MenuSection.objects.create(menu=menu, titulo='Desayuno')
+    almuerzo = MenuSection.objects.create(menu=menu, titulo='Almuerzo')
+    MenuOption.objects.bulk_create(
+        MenuOption(section=desayuno if i % 2 else almuerzo, texto=f'Opción {i}', tipo='entrada')
+        for i in range(cantidad)
+    )
+    return menu
+
+def payload_menu(menu):
+    return {
+        'nombre': menu.nombre,
+        'sections': [
+            {
+                'id': section.id,
+                'titulo': section.titulo,
+                'opciones': {
+                    'entrada': [
+                        {'id': opcion.id, 'texto': f'{opcion.texto} editada', 'tipo': 'entrada'}
+                        for opcion in section.options.order_by('id')
+                    ],
+                },
+            }
+            for section in menu.sections.order_by('id')
+        ],
+    }
+
+class TestMenuBulkUpdate:
+    @pytest.mark.django_db
+    def test_update_query_count_does_not_depend_on_options(self, authenticated_client):
+        consultas = []
+        for cantidad in (4, 150):
+            menu = crear_menu(cantidad)
+            usuario_cache.limpiar()
+            with CaptureQueriesContext(connection) as context:
+                response = authenticated_client.put(
+                    reverse('menu-detail', args=[menu.id]), payload_menu(menu), format='json'
+                )
+            assert response.status_code == status.HTTP_200_OK
+            assert MenuOption.objects.filter(section__menu=menu, texto__endswith='editada').count() == cantidad
+            consultas.append(len(context.captured_queries))
+        assert consultas[0] == consultas[1]
+
+    @pytest.mark.django_db
+    def test_update_applies_diff(self, authenticated_client):
+        menu = crear_menu(4)
+        payload = payload_menu(menu)
+        desayuno, almuerzo = payload['sections']
+        conservada = desayuno['opciones']['entrada'][0]
+        desayuno['opciones'] = {
+            'huevos': [dict(conservada, tipo='huevos')],
+            'entrada': [{'texto': 'Nueva', 'tipo': 'entrada'}],
+        }
+        payload['sections'] = [desayuno, {'titulo': 'Cena', 'opciones': {'entrada': [{'texto': 'Arepa', 'tipo': 'entrada'}]}}]
+
+        response = authenticated_client.put(reverse('menu-detail', args=[menu.id]), payload, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert not MenuSection.objects.filter(id=almuerzo['id']).exists()
+        assert list(menu.sections.order_by('id').values_list('titulo', flat=True)) == ['Desayuno', 'Cena']
+        opcion = MenuOption.objects.get(id=conservada['id'])
+        assert (opcion.tipo, opcion.texto) == ('huevos', conservada['texto'])
+        assert sorted(MenuOption.objects.filter(section__menu=menu).values_list('texto', flat=True)) == [
+            'Arepa', 'Nueva', conservada['texto']
+        ]
+
+    @pytest.mark.django_db
+    def test_section_update_loads_options_once(self):
+        menu = crear_menu(4)
+        section = menu.sections.order_by('id').first()
+        data = payload_menu(menu)['sections'][0]
+        serializer = MenuSectionSerializer(section, data=data, context={'menu': menu})
+        assert serializer.is_valid(), serializer.errors
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+        lecturas = [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "menus_menuoption"' in q['sql']
+        ]
+        assert len(lecturas) == 1
+        editadas = sum(len(opciones) for opciones in data['opciones'].values())
+        assert MenuOption.objects.filter(section=section, texto__endswith='editada').count() == editadas
+
+class TestMenuCompatibilidad:
+    @pytest.mark.django_db
+    def test_update_refreshes_compatibility_masks(self, authenticated_client):
+        mani = Alergia.objects.create(nombre='Maní')
+        menu = crear_menu(2)
+        payload = payload_menu(menu)
+        opcion = payload['sections'][0]['opciones']['entrada'][0]
+        opcion['alergenos'] = [mani.id, mani.id]
+
+        response = authenticated_client.put(reverse('menu-detail', args=[menu.id]), payload, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        guardada = MenuOption.objects.get(id=opcion['id'])
+        assert guardada.alergenos == [mani.id]
+        assert int(guardada.alergenos_bits, 16) == 1 << mani.id
+        assert guardada.dietas_bits == '0'
+
+    @pytest.mark.django_db
+    def test_retrieve_filters_options_for_patient(self, authenticated_client):
+        mani = Alergia.objects.create(nombre='Maní')
+        hiposodica = Dieta.objects.create(nombre='Hiposódica')
+        servicio = Servicio.objects.create(nombre='Medicina Interna')
+        habitacion = Habitacion.objects.create(nombre='101', servicio=servicio)
+        cama = Cama.objects.create(nombre='A', habitacion=habitacion)
+        paciente = Paciente.objects.create(cedula='1000', name='Ana Pérez', cama=cama)
+        paciente.alergias.set([mani])
+        paciente.dietas.set([hiposodica])
+
+        response = authenticated_client.post(reverse('menu-list'), {
+            'nombre': 'Menú del Día',
+            'sections': [{
+                'titulo': 'Almuerzo',
+                'opciones': {
+                    'plato_principal': [
+                        {'texto': 'Pollo con Maní', 'tipo': 'plato_principal', 'alergenos': [mani.id]},
+                        {'texto': 'Cerdo Ahumado', 'tipo': 'plato_principal', 'dietas_excluidas': [hiposodica.id]},
+                        {'texto': 'Pescado al Vapor', 'tipo': 'plato_principal'},
+                    ],
+                },
+            }],
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        url = reverse('menu-detail', args=[response.data['id']])
+
+        completo = authenticated_client.get(url).data
+        assert len(completo['sections'][0]['opciones']['plato_principal']) == 3
+
+        with CaptureQueriesContext(connection) as context:
+            filtrado = authenticated_client.get(url, {'paciente': paciente.id}).data
+        opciones = filtrado['sections'][0]['opciones']['plato_principal']
+        assert [opcion['texto'] for opcion in opciones] == ['Pescado al Vapor']
+        # Autenticación, menú, alergias y dietas del paciente y máscaras de las opciones
+        assert len(context.captured_queries) <= 5
+
+        # La representación en caché no se modifica
+        assert len(authenticated_client.get(url).data['sections'][0]['opciones']['plato_principal']) == 3
+        assert authenticated_client.get(url, {'paciente': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_rejects_unknown_or_out_of_range_tags(self, authenticated_client):
+        mani = Alergia.objects.create(nombre='Maní')
+        for alergenos in ([mani.id + 1000], [50000000]):
+            response = authenticated_client.post(reverse('menu-list'), {
+                'nombre': 'Menú',
+                'sections': [{'titulo': 'Almuerzo', 'opciones': {
+                    'postre': [{'texto': 'Flan', 'tipo': 'postre', 'alergenos': alergenos}],
+                }}],
+            }, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not MenuOption.objects.exists()
+
+    @pytest.mark.django_db
+    def test_deleting_allergy_removes_tag(self, authenticated_client):
+        mani, gluten = Alergia.objects.create(nombre='Maní'), Alergia.objects.create(nombre='Gluten')
+        menu = crear_menu(2)
+        opcion = MenuOption.objects.filter(section__menu=menu).first()
+        opcion.alergenos = [mani.id, gluten.id]
+        opcion.save()
+        version = Menu.objects.get(id=menu.id).version
+
+        mani.delete()
+        opcion.refresh_from_db()
+        assert opcion.alergenos == [gluten.id]
+        assert int(opcion.alergenos_bits, 16) == 1 << gluten.id
+        assert Menu.objects.get(id=menu.id).version == version + 1
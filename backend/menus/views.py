@@ -4,15 +4,20 @@ Vistas para la gestión de menús hospitalarios.
 Define las vistas basadas en clase para:
 - Listar y crear menús
 - Recuperar, actualizar y eliminar menús específicos
-Incluye registro de actividades mediante LogEntry.
+Incluye registro de actividades mediante log_action.
 """
 
 from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from .cache import menu_cache
+from .compatibilidad import filtrar_menu, opciones_incompatibles
 from .models import Menu
 from .serializers import MenuSerializer
-from logs.models import LogEntry
+from logs.services import log_action
+from backend.conditional import ConditionalGetMixin
 
-class MenuListCreateView(generics.ListCreateAPIView):
+class MenuListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     Vista para listar todos los menús y crear nuevos.
     
@@ -22,6 +27,16 @@ class MenuListCreateView(generics.ListCreateAPIView):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Lista los menús reutilizando sus representaciones en caché.
+        
+        Returns:
+            Response: Lista de menús serializados.
+        """
+        menus = self.filter_queryset(self.get_queryset())
+        return Response(menu_cache.obtener_varios(menus))
+
     def perform_create(self, serializer):
         """
         Guarda el nuevo menú y registra la acción en el log.
@@ -30,7 +45,7 @@ class MenuListCreateView(generics.ListCreateAPIView):
             serializer: Serializador con los datos validados del menú.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -39,7 +54,7 @@ class MenuListCreateView(generics.ListCreateAPIView):
         )
 
 
-class MenuDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MenuDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para recuperar, actualizar o eliminar un menú específico.
     
@@ -50,6 +65,46 @@ class MenuDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
 
+    def get(self, request, *args, **kwargs):
+        """
+        Omite las validaciones condicionales en las consultas por paciente.
+        
+        La versión del menú no cambia cuando se modifican las alergias o
+        dietas del paciente, por lo que su ETag no identifica la respuesta
+        filtrada.
+        
+        Returns:
+            Response: Menú serializado.
+        """
+        if request.query_params.get('paciente'):
+            return self.retrieve(request, *args, **kwargs)
+        return super().get(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retorna un menú reutilizando su representación en caché.
+        
+        Con el parámetro ?paciente=<id> solo incluye las opciones aptas
+        para las alergias y dietas del paciente, usando las máscaras de
+        compatibilidad precalculadas de las opciones.
+        
+        Returns:
+            Response: Menú serializado.
+            
+        Raises:
+            ValidationError: Si el parámetro paciente no es un ID válido.
+        """
+        menu = self.get_object()
+        data = menu_cache.obtener(menu)
+        paciente = request.query_params.get('paciente')
+        if paciente:
+            try:
+                paciente_id = int(paciente)
+            except ValueError:
+                raise ValidationError({'paciente': 'El paciente debe ser un ID válido.'})
+            data = filtrar_menu(data, opciones_incompatibles(menu.pk, paciente_id))
+        return Response(data)
+
     def perform_update(self, serializer):
         """
         Actualiza un menú existente y registra la acción en el log.
@@ -58,7 +113,7 @@ class MenuDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer: Serializador con los datos validados del menú.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -73,11 +128,13 @@ class MenuDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             instance: Instancia del menú a eliminar.
         """
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
             object_id=instance.id,
             details={}
         )
+        menu_id = instance.id
         instance.delete()
+        menu_cache.invalidar(menu_id)
@@ -17,3 +17,14 @@ class PacientesConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pacientes'
+
+    def ready(self):
+        """
+        Conecta la actualización de updated_at al cambiar las dietas o
+        alergias de un paciente.
+        """
+        from django.db.models.signals import m2m_changed
+        from .models import Paciente, tocar_pacientes
+
+        m2m_changed.connect(tocar_pacientes, sender=Paciente.dietas.through, dispatch_uid='pacientes_tocar_dietas')
+        m2m_changed.connect(tocar_pacientes, sender=Paciente.alergias.through, dispatch_uid='pacientes_tocar_alergias')
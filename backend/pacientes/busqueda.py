@@ -0,0 +1,107 @@
+"""
+Búsqueda de pacientes por nombre y cédula.
+
+Mantiene la tabla PacienteSearchToken con las palabras del nombre de cada
+paciente normalizadas (minúsculas y sin tildes) y ofrece el filtro usado
+por el endpoint de búsqueda. Las coincidencias se resuelven con
+startswith sobre columnas indexadas (token LIKE 'ana%'), que puede usar el
+índice, en lugar de LIKE '%texto%' sobre toda la tabla.
+"""
+
+import re
+import unicodedata
+from django.db.models import Q
+
+
+def normalizar(texto):
+    """
+    Normaliza un texto para la búsqueda.
+
+    Args:
+        texto (str): Texto original.
+
+    Returns:
+        str: Texto en minúsculas, sin tildes ni signos de puntuación.
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', sin_tildes.lower()).strip()
+
+
+def tokens(texto):
+    """
+    Obtiene las palabras normalizadas de un texto.
+
+    Args:
+        texto (str): Texto original.
+
+    Returns:
+        list: Palabras distintas, en el orden en que aparecen.
+    """
+    return list(dict.fromkeys(normalizar(texto).split()))
+
+
+def tokens_de_pacientes(pacientes):
+    """
+    Construye los tokens de búsqueda de varios pacientes.
+
+    Args:
+        pacientes (Iterable[Paciente]): Pacientes ya guardados.
+
+    Returns:
+        list: Instancias de PacienteSearchToken sin guardar.
+    """
+    from .models import PacienteSearchToken
+
+    return [
+        PacienteSearchToken(paciente_id=paciente.id, token=token[:100])
+        for paciente in pacientes
+        for token in tokens(paciente.name)
+    ]
+
+
+def actualizar_tokens(pacientes):
+    """
+    Reemplaza los tokens de búsqueda de los pacientes indicados.
+
+    Args:
+        pacientes (Iterable[Paciente]): Pacientes ya guardados.
+    """
+    from .models import PacienteSearchToken
+
+    pacientes = list(pacientes)
+    PacienteSearchToken.objects.filter(
+        paciente_id__in=[paciente.id for paciente in pacientes]
+    ).delete()
+    PacienteSearchToken.objects.bulk_create(tokens_de_pacientes(pacientes))
+
+
+def filtrar_pacientes(queryset, texto, ruta=''):
+    """
+    Filtra un queryset por nombre o cédula del paciente.
+
+    Un registro coincide si cada palabra buscada es prefijo de alguna
+    palabra del nombre, o si el texto es prefijo de la cédula.
+
+    Args:
+        queryset (QuerySet): Pacientes o modelos relacionados con un paciente.
+        texto (str): Texto buscado.
+        ruta (str): Ruta hasta el paciente desde el modelo del queryset,
+            por ejemplo 'paciente__' para pedidos.
+
+    Returns:
+        QuerySet: Registros que coinciden con la búsqueda.
+    """
+    from .models import PacienteSearchToken
+
+    palabras = tokens(texto)
+    if not palabras:
+        return queryset
+
+    por_nombre = Q()
+    for palabra in palabras:
+        por_nombre &= Q(**{f'{ruta}id__in': PacienteSearchToken.objects.filter(
+            token__startswith=palabra
+        ).values('paciente_id')})
+
+    return queryset.filter(por_nombre | Q(**{f'{ruta}cedula__startswith': texto.strip()}))
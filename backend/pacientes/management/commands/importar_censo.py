@@ -0,0 +1,59 @@
+"""
+Comando para importar el censo de pacientes.
+
+Lee un archivo CSV o JSON con los ingresos, traslados y altas del día y
+los aplica en bloque mediante el servicio de censo.
+
+Uso:
+    python manage.py importar_censo censo.csv
+    python manage.py importar_censo censo.json --dry-run
+"""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from pacientes.services import importar_censo, leer_csv
+
+
+class Command(BaseCommand):
+    """
+    Importa un censo de pacientes desde un archivo.
+
+    El CSV debe tener las columnas accion, cedula, name, cama_id, dietas y
+    alergias (IDs separados por '|'). El JSON debe ser una lista de objetos
+    con las mismas claves. Si alguna fila es inválida no se aplica ningún
+    cambio y se muestran los errores.
+    """
+    help = 'Importa en bloque los ingresos, traslados y altas de un censo CSV o JSON.'
+
+    def add_arguments(self, parser):
+        """Define los argumentos del comando."""
+        parser.add_argument('archivo', help='Ruta del archivo CSV o JSON.')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo valida el censo, sin aplicar cambios.'
+        )
+
+    def handle(self, *args, **options):
+        """Ejecuta la importación."""
+        try:
+            with open(options['archivo'], encoding='utf-8-sig') as archivo:
+                if options['archivo'].lower().endswith('.json'):
+                    registros = json.load(archivo)
+                else:
+                    registros = leer_csv(archivo)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'No se pudo leer el censo: {exc}')
+
+        resultado = importar_censo(registros, dry_run=options['dry_run'])
+
+        if resultado['errores']:
+            for error in resultado['errores']:
+                self.stderr.write(f"Fila {error['fila']}: {error['error']}")
+            raise CommandError(f"El censo tiene {len(resultado['errores'])} errores; no se aplicó ningún cambio.")
+
+        accion = 'validaría' if options['dry_run'] else 'importó'
+        self.stdout.write(self.style.SUCCESS(
+            f"Se {accion} el censo: {resultado['ingresos']} ingresos, "
+            f"{resultado['traslados']} traslados y {resultado['altas']} altas."
+        ))
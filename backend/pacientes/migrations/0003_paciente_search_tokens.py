@@ -0,0 +1,62 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:29
+
+import re
+import unicodedata
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def tokens(texto):
+    """
+    Obtiene las palabras normalizadas de un nombre.
+
+    El cálculo se copia aquí en lugar de importar pacientes.busqueda, que
+    puede cambiar después de esta migración.
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    normalizado = re.sub(r'[^a-z0-9]+', ' ', sin_tildes.lower()).strip()
+    return list(dict.fromkeys(normalizado.split()))
+
+
+def crear_tokens(apps, schema_editor):
+    """Genera los tokens de búsqueda de los pacientes existentes."""
+    Paciente = apps.get_model('pacientes', 'Paciente')
+    PacienteSearchToken = apps.get_model('pacientes', 'PacienteSearchToken')
+    lote = []
+    for paciente_id, name in Paciente.objects.values_list('id', 'name').iterator(chunk_size=2000):
+        lote.extend(
+            PacienteSearchToken(paciente_id=paciente_id, token=token[:100])
+            for token in tokens(name)
+        )
+        if len(lote) >= 5000:
+            PacienteSearchToken.objects.bulk_create(lote)
+            lote = []
+    PacienteSearchToken.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pacientes', '0002_paciente_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paciente',
+            name='cedula',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PacienteSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='pacientes.paciente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'paciente'], name='paciente_token_idx')],
+            },
+        ),
+        migrations.RunPython(crear_tokens, migrations.RunPython.noop),
+    ]
@@ -6,11 +6,12 @@ incluyendo sus relaciones con:
 - Camas asignadas
 - Dietas recomendadas
 - Alergias registradas
-Incluye validaciones para el estado activo/inactivo del paciente.
+Incluye validaciones para el estado activo/inactivo del paciente y los
+tokens normalizados usados por la búsqueda de pacientes.
 """
 
-from django.db import models
-from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
 from camas.models import Cama
 from dietas.models import Dieta, Alergia
 
@@ -30,40 +31,49 @@ class Paciente(models.Model):
         alergias (ManyToManyField): Alergias registradas del paciente.
         activo (bool): Estado del paciente en el sistema.
         created_at (DateTime): Fecha y hora de registro del paciente.
+        updated_at (DateTime): Fecha y hora de la última modificación.
     """
     id = models.AutoField(primary_key=True)  
-    cedula = models.CharField(max_length=20)  
+    cedula = models.CharField(max_length=20, db_index=True)
     name = models.CharField(max_length=100)
     cama = models.ForeignKey(Cama, on_delete=models.CASCADE)
     dietas = models.ManyToManyField(Dieta, related_name='pacientes')
     alergias = models.ManyToManyField(Alergia, related_name='pacientes')
     activo = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)  
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         """
         Sobrescribe el método save para incluir validaciones adicionales.
         
-        Verifica el estado activo de la cama, habitación y servicio antes
-        de activar un paciente. Si el paciente se desactiva, también
-        desactiva su cama asignada.
+        Verifica con una sola consulta el estado activo de la cama, habitación
+        y servicio antes de activar un paciente. Si el paciente se desactiva,
+        también desactiva su cama asignada. Al guardar el nombre actualiza
+        los tokens de búsqueda.
+        
+        Los conteos de la cascada quedan en self.cascada, sin registrarlos,
+        para que la vista los incluya en su registro de actividad.
         
         Raises:
             ValidationError: Si se intenta activar un paciente con cama,
                            habitación o servicio inactivos.
         """
+        from servicios.services import desactivar_en_cascada, validar_activacion
+        from .busqueda import actualizar_tokens
+
         if self.activo:
-            if not self.cama.activo:
-                raise ValidationError('No se puede activar un paciente porque la cama no está activa.')
-            if not self.cama.habitacion.activo:
-                raise ValidationError('No se puede activar un paciente porque la habitación no está activa.')
-            if not self.cama.habitacion.servicio.activo:
-                raise ValidationError('No se puede activar un paciente porque el servicio no está activo.')
-        else:
-            self.cama.activo = False
-            self.cama.save()
-
-        super(Paciente, self).save(*args, **kwargs)
+            validar_activacion('paciente', self.cama_id)
+
+        with transaction.atomic():
+            self.cascada = {}
+            if not self.activo:
+                self.cascada = desactivar_en_cascada('cama', [self.cama_id], registrar=False)
+            super(Paciente, self).save(*args, **kwargs)
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None or 'name' in update_fields:
+                actualizar_tokens([self])
 
     def __str__(self):
         """
@@ -73,3 +83,61 @@ class Paciente(models.Model):
             str: Nombre del paciente.
         """
         return self.name
+
+
+def tocar_pacientes(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Receptor de m2m_changed de las dietas y alergias de los pacientes.
+
+    Actualiza updated_at de los pacientes afectados para que las vistas
+    con peticiones condicionales, que calculan su versión con
+    Max(updated_at), no respondan 304 tras cambiar sus relaciones.
+
+    Args:
+        sender: Tabla intermedia de la relación.
+        instance: Paciente modificado o, desde el lado inverso, la dieta o
+            alergia modificada.
+        action (str): Tipo de cambio (pre_add, post_add, pre_clear, ...).
+        reverse (bool): Si el cambio se hizo desde la dieta o la alergia.
+        model: Modelo de los objetos añadidos o retirados.
+        pk_set (set): IDs añadidos o retirados, o None al vaciar la relación.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        pacientes = Paciente.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        # Al vaciar desde el lado inverso pk_set es None: se toman antes de borrar
+        campo = 'dietas' if sender is Paciente.dietas.through else 'alergias'
+        pacientes = Paciente.objects.filter(**{campo: instance})
+    else:
+        pacientes = Paciente.objects.filter(pk__in=pk_set)
+    pacientes.update(updated_at=timezone.now())
+
+
+class PacienteSearchToken(models.Model):
+    """
+    Modelo con las palabras normalizadas del nombre de cada paciente.
+    
+    Permite buscar pacientes por prefijo de cualquier palabra de su nombre,
+    sin distinguir mayúsculas ni tildes, mediante un índice.
+    
+    Atributos:
+        paciente (Paciente): Paciente al que pertenece la palabra.
+        token (str): Palabra del nombre en minúsculas y sin tildes.
+    """
+    paciente = models.ForeignKey(
+        Paciente,
+        related_name='search_tokens',
+        on_delete=models.CASCADE
+    )
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'paciente'], name='paciente_token_idx'),
+        ]
+
+    def __str__(self):
+        """Representación en string del token."""
+        return f"{self.token} - {self.paciente_id}"
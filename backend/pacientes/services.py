@@ -0,0 +1,268 @@
+"""
+Servicio de importación del censo de pacientes.
+
+Procesa en bloque los movimientos del censo hospitalario:
+- Ingresos: crean pacientes nuevos con sus dietas, alergias y tokens de búsqueda
+- Traslados: cambian la cama de pacientes activos
+- Altas: desactivan pacientes activos (y su cama, como en Paciente.save)
+
+Todas las filas se validan antes de aplicar cambios con un número fijo de
+consultas; si alguna fila es inválida no se aplica ninguna. Los cambios se
+escriben con bulk_create/bulk_update dentro de una transacción y dejan un
+único registro en el log de actividades.
+"""
+
+import csv
+import io
+from django.db import transaction
+from django.utils import timezone
+from camas.models import Cama
+from dietas.models import Dieta, Alergia
+from logs.services import log_action
+from servicios.services import desactivar_en_cascada
+from .busqueda import tokens_de_pacientes
+from .models import Paciente, PacienteSearchToken
+
+ACCIONES = ('ingreso', 'traslado', 'alta')
+
+
+def _lista_ids(valor):
+    """
+    Convierte una lista de IDs de dietas o alergias a enteros.
+
+    Args:
+        valor (list | str | None): Lista de IDs o texto separado por '|' o ','.
+
+    Returns:
+        list | None: IDs enteros, o None si el campo no se indicó.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = [parte for parte in valor.replace(',', '|').split('|') if parte.strip()]
+    return [int(item) for item in valor]
+
+
+def leer_csv(archivo):
+    """
+    Lee un censo en formato CSV.
+
+    El archivo debe tener cabecera con las columnas accion, cedula, name,
+    cama_id, dietas y alergias; dietas y alergias son IDs separados por '|'.
+
+    Args:
+        archivo (file | str): Archivo abierto (texto o binario) o contenido CSV.
+
+    Returns:
+        list: Registros del censo como diccionarios.
+    """
+    if isinstance(archivo, str):
+        contenido = archivo
+    else:
+        contenido = archivo.read()
+        if isinstance(contenido, bytes):
+            contenido = contenido.decode('utf-8-sig')
+    return [
+        {clave: valor for clave, valor in fila.items() if valor not in (None, '')}
+        for fila in csv.DictReader(io.StringIO(contenido))
+    ]
+
+
+def _normalizar(indice, registro, errores):
+    """
+    Valida el formato de una fila del censo.
+
+    Args:
+        indice (int): Número de fila, empezando en 1.
+        registro (dict): Fila recibida.
+        errores (list): Lista donde se añaden los errores encontrados.
+
+    Returns:
+        dict | None: Fila normalizada, o None si tiene errores de formato.
+    """
+    accion = str(registro.get('accion', '')).strip().lower()
+    cedula = str(registro.get('cedula', '')).strip()
+    if accion not in ACCIONES:
+        errores.append({'fila': indice, 'error': f'Acción no válida: {accion or "vacía"}.'})
+        return None
+    if not cedula:
+        errores.append({'fila': indice, 'error': 'La cédula es obligatoria.'})
+        return None
+
+    try:
+        fila = {
+            'fila': indice,
+            'accion': accion,
+            'cedula': cedula,
+            'name': str(registro.get('name', '')).strip(),
+            'cama_id': int(registro['cama_id']) if registro.get('cama_id') not in (None, '') else None,
+            'dietas': _lista_ids(registro.get('dietas')),
+            'alergias': _lista_ids(registro.get('alergias')),
+        }
+    except (TypeError, ValueError):
+        errores.append({'fila': indice, 'error': 'Los IDs de cama, dietas y alergias deben ser números.'})
+        return None
+
+    if accion == 'ingreso' and not fila['name']:
+        errores.append({'fila': indice, 'error': 'El nombre es obligatorio para un ingreso.'})
+        return None
+    if accion in ('ingreso', 'traslado') and fila['cama_id'] is None:
+        errores.append({'fila': indice, 'error': f'La cama es obligatoria para un {accion}.'})
+        return None
+    return fila
+
+
+def importar_censo(registros, user=None, dry_run=False):
+    """
+    Valida y aplica en bloque los ingresos, traslados y altas de un censo.
+
+    La validación usa una consulta para los pacientes activos, una para las
+    camas (con su habitación y servicio) y una para cada catálogo de dietas
+    y alergias, independientemente del número de filas.
+
+    Args:
+        registros (Iterable[dict]): Filas del censo con accion, cedula, name,
+            cama_id, dietas y alergias.
+        user (User, opcional): Usuario que realiza la importación.
+        dry_run (bool): Si es True solo valida, sin aplicar cambios.
+
+    Returns:
+        dict: Conteos de ingresos, traslados y altas, IDs de los pacientes
+            creados y lista de errores por fila. Si hay errores no se
+            aplica ningún cambio.
+    """
+    errores = []
+    filas = [
+        fila for fila in (
+            _normalizar(indice, registro, errores)
+            for indice, registro in enumerate(registros, start=1)
+        ) if fila is not None
+    ]
+
+    activos = {
+        cedula: (paciente_id, cama_id)
+        for paciente_id, cedula, cama_id in Paciente.objects.filter(
+            activo=True,
+            cedula__in={fila['cedula'] for fila in filas}
+        ).values_list('id', 'cedula', 'cama_id')
+    }
+
+    # Validación de pacientes y cédulas repetidas en el censo
+    vistas = set()
+    for fila in filas:
+        if fila['cedula'] in vistas:
+            errores.append({'fila': fila['fila'], 'error': 'La cédula aparece más de una vez en el censo.'})
+        vistas.add(fila['cedula'])
+        if fila['accion'] == 'ingreso' and fila['cedula'] in activos:
+            errores.append({'fila': fila['fila'], 'error': 'El paciente ya tiene un ingreso activo.'})
+        if fila['accion'] != 'ingreso' and fila['cedula'] not in activos:
+            errores.append({'fila': fila['fila'], 'error': 'No existe un paciente activo con esa cédula.'})
+
+    # Validación de dietas y alergias
+    for campo, modelo in (('dietas', Dieta), ('alergias', Alergia)):
+        solicitados = {item for fila in filas for item in (fila[campo] or [])}
+        existentes = set(modelo.objects.filter(pk__in=solicitados).values_list('id', flat=True))
+        for fila in filas:
+            faltantes = set(fila[campo] or []) - existentes
+            if faltantes:
+                errores.append({'fila': fila['fila'], 'error': f'No existen {campo}: {sorted(faltantes)}.'})
+
+    # Validación de camas en una sola consulta; las camas de las altas quedan inactivas
+    camas_alta = {activos[fila['cedula']][1] for fila in filas
+                  if fila['accion'] == 'alta' and fila['cedula'] in activos}
+    estados = {
+        cama_id: activo and habitacion_activa and servicio_activo and cama_id not in camas_alta
+        for cama_id, activo, habitacion_activa, servicio_activo in Cama.objects.filter(
+            pk__in={fila['cama_id'] for fila in filas if fila['accion'] != 'alta'}
+        ).values_list('id', 'activo', 'habitacion__activo', 'habitacion__servicio__activo')
+    }
+    for fila in filas:
+        if fila['accion'] == 'alta':
+            continue
+        if fila['cama_id'] not in estados:
+            errores.append({'fila': fila['fila'], 'error': 'La cama no existe.'})
+        elif not estados[fila['cama_id']]:
+            errores.append({
+                'fila': fila['fila'],
+                'error': 'La cama, su habitación o su servicio no están activos.'
+            })
+
+    resultado = {
+        'ingresos': sum(fila['accion'] == 'ingreso' for fila in filas),
+        'traslados': sum(fila['accion'] == 'traslado' for fila in filas),
+        'altas': sum(fila['accion'] == 'alta' for fila in filas),
+        'creados': [],
+        'errores': sorted(errores, key=lambda error: error['fila']),
+    }
+    if errores or dry_run:
+        return resultado
+
+    with transaction.atomic():
+        resultado['creados'] = _aplicar(filas, activos, camas_alta, user)
+    return resultado
+
+
+def _aplicar(filas, activos, camas_alta, user):
+    """
+    Escribe los cambios de un censo ya validado.
+
+    Args:
+        filas (list): Filas normalizadas.
+        activos (dict): Pacientes activos por cédula (id, cama_id).
+        camas_alta (set): Camas de los pacientes dados de alta.
+        user (User, opcional): Usuario que realiza la importación.
+
+    Returns:
+        list: IDs de los pacientes creados.
+    """
+    ahora = timezone.now()
+    cascada = desactivar_en_cascada('cama', camas_alta, registrar=False) if camas_alta else {}
+
+    traslados = [
+        Paciente(id=activos[fila['cedula']][0], cama_id=fila['cama_id'], updated_at=ahora)
+        for fila in filas if fila['accion'] == 'traslado'
+    ]
+    Paciente.objects.bulk_update(traslados, ['cama', 'updated_at'])
+
+    ingresos = [fila for fila in filas if fila['accion'] == 'ingreso']
+    creados = Paciente.objects.bulk_create([
+        Paciente(cedula=fila['cedula'], name=fila['name'], cama_id=fila['cama_id'])
+        for fila in ingresos
+    ])
+    PacienteSearchToken.objects.bulk_create(tokens_de_pacientes(creados))
+
+    # Relaciones con dietas y alergias mediante sus tablas intermedias
+    paciente_ids = {fila['fila']: activos[fila['cedula']][0]
+                    for fila in filas if fila['accion'] == 'traslado'}
+    paciente_ids.update({fila['fila']: paciente.id for fila, paciente in zip(ingresos, creados)})
+    for campo in ('dietas', 'alergias'):
+        relacion = getattr(Paciente, campo)
+        through = relacion.through
+        origen = f'{relacion.field.m2m_field_name()}_id'
+        destino = f'{relacion.field.m2m_reverse_field_name()}_id'
+        con_cambios = {fila['fila']: fila[campo] for fila in filas
+                       if fila['fila'] in paciente_ids and fila[campo] is not None}
+        through.objects.filter(**{
+            f'{origen}__in': [paciente_ids[indice] for indice in con_cambios]
+        }).delete()
+        through.objects.bulk_create([
+            through(**{origen: paciente_ids[indice], destino: item})
+            for indice, items in con_cambios.items()
+            for item in set(items)
+        ])
+
+    log_action(
+        user=user,
+        action='UPDATE',
+        model_name='Paciente',
+        details={
+            'censo': {
+                'ingresos': len(creados),
+                'traslados': len(traslados),
+                'altas': sum(fila['accion'] == 'alta' for fila in filas),
+            },
+            'creados': [paciente.id for paciente in creados],
+            'cascada': cascada,
+        }
+    )
+    return [paciente.id for paciente in creados]
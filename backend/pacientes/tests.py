@@ -0,0 +1,146 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from authentication.models import CustomUser
+from servicios.models import Servicio
+from habitaciones.models import Habitacion
+from camas.models import Cama
+from dietas.models import Dieta, Alergia
+from pacientes.models import Paciente
+from logs.models import LogEntry
+
+@pytest.fixture
+def authenticated_client(db):
+    user = CustomUser.objects.create_user(
+        username='admisiones', password='pass', email='admisiones@example.com', role='admin'
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+@pytest.fixture
+def camas(db):
+    servicio = Servicio.objects.create(nombre='Medicina Interna')
+    habitacion = Habitacion.objects.create(nombre='101', servicio=servicio)
+    return [Cama.objects.create(nombre=str(numero), habitacion=habitacion) for numero in range(60)]
+
+class TestCenso:
+    @pytest.mark.django_db
+    def test_bulk_admissions_use_constant_queries(self, authenticated_client, camas, settings):
+        settings.AUDIT_LOG_ASYNC = False
+        dieta = Dieta.objects.create(nombre='Blanda')
+        alergia = Alergia.objects.create(nombre='Lactosa')
+
+        def censo(desde, cantidad):
+            return [{
+                'accion': 'ingreso',
+                'cedula': str(1000 + numero),
+                'name': f'Paciente {numero}',
+                'cama_id': camas[numero].id,
+                'dietas': [dieta.id],
+                'alergias': [alergia.id],
+            } for numero in range(desde, desde + cantidad)]
+
+        url = reverse('paciente-bulk')
+        with CaptureQueriesContext(connection) as pocos:
+            response = authenticated_client.post(url, censo(0, 2), format='json')
+        assert response.status_code == status.HTTP_200_OK
+        with CaptureQueriesContext(connection) as muchos:
+            response = authenticated_client.post(url, censo(2, 50), format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert len(pocos.captured_queries) == len(muchos.captured_queries)
+
+        assert Paciente.objects.filter(activo=True).count() == 52
+        assert Paciente.dietas.through.objects.count() == 52
+        assert LogEntry.objects.filter(model_name='Paciente').count() == 2
+
+    @pytest.mark.django_db
+    def test_transfer_discharge_and_errors(self, authenticated_client, camas):
+        trasladado = Paciente.objects.create(cedula='1', name='Ana', cama=camas[0])
+        de_alta = Paciente.objects.create(cedula='2', name='Luis', cama=camas[1])
+        url = reverse('paciente-bulk')
+
+        response = authenticated_client.post(url, [
+            {'accion': 'traslado', 'cedula': '1', 'cama_id': camas[5].id},
+            {'accion': 'ingreso', 'cedula': '3', 'name': 'Eva', 'cama_id': camas[1].id},
+            {'accion': 'alta', 'cedula': '2'},
+        ], format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [error['fila'] for error in response.data['errores']] == [2]
+        trasladado.refresh_from_db()
+        assert trasladado.cama_id == camas[0].id
+
+        response = authenticated_client.post(url, [
+            {'accion': 'traslado', 'cedula': '1', 'cama_id': camas[5].id},
+            {'accion': 'alta', 'cedula': '2'},
+        ], format='json')
+        assert response.status_code == status.HTTP_200_OK
+        trasladado.refresh_from_db()
+        de_alta.refresh_from_db()
+        assert trasladado.cama_id == camas[5].id
+        assert de_alta.activo is False
+
+    @pytest.mark.django_db
+    def test_command_imports_csv(self, camas, tmp_path):
+        archivo = tmp_path / 'censo.csv'
+        archivo.write_text(
+            'accion,cedula,name,cama_id,dietas,alergias\n'
+            f'ingreso,10,Marta,{camas[0].id},,\n'
+            f'ingreso,11,Pedro,{camas[1].id},,\n',
+            encoding='utf-8'
+        )
+        call_command('importar_censo', str(archivo))
+        assert set(Paciente.objects.values_list('cedula', flat=True)) == {'10', '11'}
+
+class TestPacienteConditionalGet:
+    @pytest.mark.django_db
+    def test_diet_and_allergy_changes_invalidate_etag(self, authenticated_client, camas):
+        paciente = Paciente.objects.create(cedula='1000', name='Ana Pérez', cama=camas[0])
+        dieta = Dieta.objects.create(nombre='Blanda')
+        alergia = Alergia.objects.create(nombre='Lactosa')
+        url = reverse('paciente-detail', args=[paciente.id])
+
+        for cambiar in (
+            lambda: paciente.dietas.add(dieta),
+            lambda: alergia.pacientes.add(paciente),
+            lambda: dieta.pacientes.clear(),
+        ):
+            etag = authenticated_client.get(url)['ETag']
+            cambiar()
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+
+class TestBusqueda:
+    @pytest.mark.django_db
+    def test_accent_insensitive_token_prefix_and_cedula(self, authenticated_client, camas):
+        Paciente.objects.create(cedula='1020304050', name='José Ángel Muñoz', cama=camas[0])
+        Paciente.objects.create(cedula='5566', name='María Fernanda López', cama=camas[1])
+        historico = Paciente.objects.create(cedula='7788', name='Jose Luis Pérez', cama=camas[2])
+        Paciente.objects.filter(id=historico.id).update(activo=False)
+        url = reverse('paciente-search')
+
+        nombres = lambda params: [p['name'] for p in authenticated_client.get(url, params).data]
+        assert nombres({'q': 'munoz ang'}) == ['José Ángel Muñoz']
+        assert nombres({'q': 'JOSE'}) == ['José Ángel Muñoz', 'Jose Luis Pérez']
+        assert nombres({'q': 'jose', 'activo': 'false'}) == ['Jose Luis Pérez']
+        assert nombres({'q': '10203'}) == ['José Ángel Muñoz']
+        assert nombres({'q': 'ernanda'}) == []
+        assert nombres({'q': ''}) == []
+        assert nombres({'q': 'jose', 'limit': '-5'}) == ['José Ángel Muñoz']
+
+    @pytest.mark.django_db
+    def test_tokens_follow_renames_and_census(self, authenticated_client, camas):
+        paciente = Paciente.objects.create(cedula='1', name='Ana Gómez', cama=camas[0])
+        paciente.name = 'Ana Rodríguez'
+        paciente.save()
+        authenticated_client.post(reverse('paciente-bulk'), [
+            {'accion': 'ingreso', 'cedula': '2', 'name': 'Óscar Núñez', 'cama_id': camas[1].id},
+        ], format='json')
+        url = reverse('paciente-search')
+        assert authenticated_client.get(url, {'q': 'gomez'}).data == []
+        assert len(authenticated_client.get(url, {'q': 'rodri'}).data) == 1
+        assert len(authenticated_client.get(url, {'q': 'nunez oscar'}).data) == 1
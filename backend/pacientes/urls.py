@@ -4,10 +4,17 @@ Configuración de URLs para la aplicación de pacientes.
 Define las rutas y vistas relacionadas con la gestión de pacientes:
 - Listado y creación de pacientes
 - Detalle, actualización y eliminación de pacientes específicos
+- Importación en bloque del censo
+- Búsqueda de pacientes
 """
 
 from django.urls import path
-from .views import PacienteListCreateView, PacienteDetailView
+from .views import (
+    PacienteListCreateView,
+    PacienteDetailView,
+    PacienteCensoView,
+    PacienteSearchView,
+)
 
 urlpatterns = [
     # Ruta para listar todos los pacientes y crear nuevos
@@ -19,4 +26,14 @@ urlpatterns = [
     path('<int:pk>/', 
          PacienteDetailView.as_view(), 
          name='paciente-detail'),  
+    
+    # Ruta para importar en bloque el censo de pacientes
+    path('bulk/', 
+         PacienteCensoView.as_view(), 
+         name='paciente-bulk'),
+    
+    # Ruta para buscar pacientes por nombre o cédula
+    path('search/', 
+         PacienteSearchView.as_view(), 
+         name='paciente-search'),
 ]
@@ -4,15 +4,22 @@ Vistas para la gestión de pacientes hospitalarios.
 Define las vistas basadas en clase para:
 - Listar y crear pacientes
 - Recuperar, actualizar y eliminar pacientes específicos
-Incluye registro de actividades mediante LogEntry.
+- Importar en bloque el censo de ingresos, traslados y altas
+- Buscar pacientes por nombre o cédula
+Incluye registro de actividades mediante log_action.
 """
 
-from rest_framework import generics
+from rest_framework import generics, views, status
+from rest_framework.response import Response
 from .models import Paciente
 from .serializers import PacienteSerializer
-from logs.models import LogEntry
+from .services import importar_censo, leer_csv
+from .busqueda import filtrar_pacientes
+from logs.services import log_action
+from servicios.services import detalles_cascada
+from backend.conditional import ConditionalGetMixin
 
-class PacienteListCreateView(generics.ListCreateAPIView):
+class PacienteListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     Vista para listar todos los pacientes activos y crear nuevos.
     
@@ -20,6 +27,7 @@ class PacienteListCreateView(generics.ListCreateAPIView):
     POST: Crea un nuevo paciente y registra la acción.
     """
     serializer_class = PacienteSerializer
+    conditional_relations = ('cama', 'cama__habitacion', 'cama__habitacion__servicio')
 
     def get_queryset(self):
         """
@@ -41,7 +49,7 @@ class PacienteListCreateView(generics.ListCreateAPIView):
             Response: Respuesta HTTP con los datos del paciente creado.
         """
         response = super().create(request, *args, **kwargs)
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name='Paciente',
@@ -56,7 +64,7 @@ class PacienteListCreateView(generics.ListCreateAPIView):
         )
         return response
 
-class PacienteDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PacienteDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para gestionar un paciente específico.
     
@@ -66,6 +74,7 @@ class PacienteDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Paciente.objects.all()
     serializer_class = PacienteSerializer
+    conditional_relations = ('cama', 'cama__habitacion', 'cama__habitacion__servicio')
 
     def perform_update(self, serializer):
         """
@@ -75,7 +84,7 @@ class PacienteDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer: Serializador con los datos validados del paciente.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
@@ -86,6 +95,7 @@ class PacienteDetailView(generics.RetrieveUpdateDestroyAPIView):
                 'dietas': [dieta.nombre for dieta in instance.dietas.all()],
                 'alergias': [alergia.nombre for alergia in instance.alergias.all()],
                 'activo': instance.activo,
+                **detalles_cascada(instance),
             }
         )
 
@@ -96,7 +106,7 @@ class PacienteDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             instance: Instancia del paciente a eliminar.
         """
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
@@ -104,3 +114,82 @@ class PacienteDetailView(generics.RetrieveUpdateDestroyAPIView):
             details={}
         )
         instance.delete()
+
+class PacienteCensoView(views.APIView):
+    """
+    Vista para importar en bloque el censo de pacientes.
+    
+    POST: Recibe una lista JSON de movimientos (o un archivo CSV en el campo
+    'archivo') con ingresos, traslados y altas, los valida todos y, si no
+    hay errores, los aplica en una sola transacción. Con ?dry_run=1 solo
+    valida.
+    """
+    def post(self, request):
+        """
+        Importa el censo recibido.
+        
+        Args:
+            request: Request HTTP con los movimientos del censo.
+            
+        Returns:
+            Response: Conteos de la importación, o los errores por fila.
+        """
+        if 'archivo' in request.FILES:
+            registros = leer_csv(request.FILES['archivo'])
+        elif isinstance(request.data, list):
+            registros = request.data
+        else:
+            registros = request.data.get('registros')
+
+        if not isinstance(registros, list):
+            return Response(
+                {"detail": "Se esperaba una lista de registros o un archivo CSV."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultado = importar_censo(
+            registros,
+            user=request.user,
+            dry_run=request.query_params.get('dry_run') in ('1', 'true')
+        )
+        if resultado['errores']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+class PacienteSearchView(generics.ListAPIView):
+    """
+    Vista para buscar pacientes por nombre o cédula.
+    
+    GET: Retorna los pacientes (activos e históricos) cuyo nombre contiene
+    palabras que empiezan por las buscadas en ?q=, sin distinguir
+    mayúsculas ni tildes, o cuya cédula empieza por ?q=. Admite ?activo=
+    (true/false) y ?limit= (20 por defecto, entre 1 y 100).
+    """
+    serializer_class = PacienteSerializer
+
+    def get_queryset(self):
+        """
+        Obtiene los pacientes que coinciden con la búsqueda.
+        
+        Returns:
+            QuerySet: Pacientes coincidentes, primero los activos.
+        """
+        params = self.request.query_params
+        texto = params.get('q', '').strip()
+        if not texto:
+            return Paciente.objects.none()
+
+        queryset = filtrar_pacientes(Paciente.objects.all(), texto)
+        if params.get('activo') in ('true', 'false'):
+            queryset = queryset.filter(activo=params['activo'] == 'true')
+
+        try:
+            limit = max(1, min(int(params.get('limit', 20)), 100))
+        except ValueError:
+            limit = 20
+
+        return queryset.select_related(
+            'cama__habitacion__servicio'
+        ).prefetch_related(
+            'dietas', 'alergias'
+        ).order_by('-activo', 'name', 'id')[:limit]
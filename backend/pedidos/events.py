@@ -0,0 +1,241 @@
+"""
+Difusión de eventos de pedidos en tiempo real.
+
+Define los intermediarios (brokers) que reparten los eventos de creación,
+actualización, cambio de estado y eliminación de pedidos a las pantallas
+suscritas mediante Server-Sent Events:
+- InProcessBroker: reparte los eventos dentro del proceso actual
+- RedisBroker: usa publicación/suscripción de Redis (o un servidor
+  compatible) para despliegues con varios workers
+
+Cada evento se registra además en la tabla PedidoChange, cuyo número de
+secuencia se incluye en el evento y permite a los clientes pedir solo
+los cambios posteriores (/api/pedidos/changes/?since=).
+
+El intermediario se elige con el setting PEDIDOS_EVENT_BROKER, que
+contiene la ruta de importación de la clase. Por defecto se usa
+InProcessBroker.
+"""
+
+import json
+import queue
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import PedidoChange
+
+
+class Subscription:
+    """
+    Suscripción de un cliente a los eventos de pedidos.
+
+    Atributos:
+        queue (Queue): Cola acotada con los eventos pendientes de enviar.
+    """
+
+    def __init__(self, broker, max_size=100):
+        """
+        Inicializa la suscripción.
+
+        Args:
+            broker: Intermediario que entrega los eventos.
+            max_size (int): Número máximo de eventos pendientes.
+        """
+        self.broker = broker
+        self.queue = queue.Queue(maxsize=max_size)
+
+    def put(self, event):
+        """
+        Encola un evento descartando el más antiguo si la cola está llena.
+
+        Un cliente lento pierde eventos antiguos en lugar de bloquear
+        a quien publica.
+
+        Args:
+            event (dict): Evento a entregar.
+        """
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """
+        Espera el siguiente evento.
+
+        Args:
+            timeout (float, opcional): Segundos máximos de espera.
+
+        Returns:
+            dict | None: Evento recibido o None si se agotó el tiempo.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Cancela la suscripción."""
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Intermediario de eventos en memoria para un único proceso.
+
+    Adecuado para desarrollo y despliegues con un solo worker. Con varios
+    workers cada proceso solo ve sus propios eventos; en ese caso debe
+    configurarse RedisBroker.
+    """
+
+    def __init__(self):
+        """Inicializa el intermediario sin suscriptores."""
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """
+        Registra un nuevo suscriptor.
+
+        Returns:
+            Subscription: Suscripción que recibirá los eventos publicados.
+        """
+        subscription = Subscription(self)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Elimina un suscriptor.
+
+        Args:
+            subscription (Subscription): Suscripción a eliminar.
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """
+        Entrega un evento a todos los suscriptores del proceso.
+
+        Args:
+            event (dict): Evento a publicar.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Intermediario de eventos respaldado por publicación/suscripción de Redis.
+
+    Cada proceso mantiene un hilo que escucha el canal y reparte los
+    mensajes a sus suscriptores locales, por lo que todos los workers
+    reciben los eventos publicados por cualquiera de ellos. Funciona con
+    cualquier servidor compatible con el protocolo de Redis.
+
+    Configuración en settings:
+        PEDIDOS_EVENT_REDIS_URL (str): URL de conexión.
+        PEDIDOS_EVENT_CHANNEL (str): Canal de publicación.
+    """
+
+    def __init__(self):
+        """
+        Conecta con el servidor e inicia el hilo de escucha.
+
+        Raises:
+            ImproperlyConfigured: Si el paquete redis no está instalado.
+        """
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured(
+                'RedisBroker requiere el paquete "redis".'
+            ) from exc
+
+        self.channel = getattr(settings, 'PEDIDOS_EVENT_CHANNEL', 'pedidos:eventos')
+        self._client = redis.Redis.from_url(
+            getattr(settings, 'PEDIDOS_EVENT_REDIS_URL', 'redis://localhost:6379/0')
+        )
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        """Reenvía a los suscriptores locales los mensajes del canal."""
+        for message in self._pubsub.listen():
+            try:
+                event = json.loads(message['data'])
+            except (TypeError, ValueError):
+                continue
+            super().publish(event)
+
+    def publish(self, event):
+        """
+        Publica un evento en el canal compartido.
+
+        Args:
+            event (dict): Evento a publicar.
+        """
+        self._client.publish(self.channel, json.dumps(event))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Obtiene el intermediario configurado, creándolo la primera vez.
+
+    Returns:
+        InProcessBroker: Instancia del intermediario de eventos.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(
+                    settings,
+                    'PEDIDOS_EVENT_BROKER',
+                    'pedidos.events.InProcessBroker'
+                ))
+                _broker = broker_class()
+    return _broker
+
+
+def publicar_evento(tipo, pedido):
+    """
+    Registra el cambio y publica el evento cuando se confirma la transacción actual.
+
+    Debe llamarse dentro del mismo bloque transaction.atomic() que el
+    cambio del pedido, como hacen las vistas de pedidos: así el registro en
+    PedidoChange solo persiste si el cambio se confirma.
+
+    Args:
+        tipo (str): Tipo de evento (created, updated, status, deleted).
+        pedido (Pedido): Pedido afectado.
+    """
+    change = PedidoChange.objects.create(pedido_id=pedido.id, tipo=tipo)
+    event = {
+        'tipo': tipo,
+        'seq': str(change.id),
+        'pedido_id': pedido.id,
+        'status': pedido.status,
+        'sectionStatus': pedido.sectionStatus,
+        'timestamp': timezone.now().isoformat(),
+    }
+    transaction.on_commit(lambda: get_broker().publish(event))
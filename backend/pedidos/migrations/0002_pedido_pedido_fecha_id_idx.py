@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0001_initial'),
+        ('pacientes', '0001_initial'),
+        ('pedidos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_pedido', 'id'], name='pedido_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0002_pedido_pedido_fecha_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
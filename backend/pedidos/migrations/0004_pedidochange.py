@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0003_pedido_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('pedido_id', models.IntegerField()),
+                ('tipo', models.CharField(choices=[('created', 'Creado'), ('updated', 'Actualizado'), ('status', 'Cambio de estado'), ('deleted', 'Eliminado')], max_length=20)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['pedido_id', 'id'], name='pedidochange_pedido_id_idx')],
+            },
+        ),
+    ]
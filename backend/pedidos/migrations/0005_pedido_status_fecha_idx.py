@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0003_menu_updated_at'),
+        ('pacientes', '0003_paciente_search_tokens'),
+        ('pedidos', '0004_pedidochange'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['status', 'fecha_pedido', 'id'], name='pedido_status_fecha_idx'),
+        ),
+    ]
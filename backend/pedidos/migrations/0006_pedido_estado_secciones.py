@@ -0,0 +1,74 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+SECCIONES_REQUERIDAS = (
+    'desayuno',
+    'almuerzo',
+    'cena',
+    'bebidas_calientes',
+    'bebidas_frias',
+    'snacks',
+)
+
+
+def calcular_estado(apps, schema_editor):
+    """
+    Calcula los campos derivados del estado de los pedidos existentes.
+
+    El cálculo se copia aquí en lugar de importar el modelo actual, que
+    puede no coincidir con el esquema de esta migración.
+    """
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    campos = ['sections_completed_count', 'fully_completed', 'pendiente']
+    lote = []
+    for pedido in Pedido.objects.only('id', 'status', 'sectionStatus').iterator(chunk_size=2000):
+        completadas = {
+            seccion.strip().lower().replace(' ', '_')
+            for seccion, estado in (pedido.sectionStatus or {}).items()
+            if estado == 'completado'
+        }
+        pedido.sections_completed_count = len(completadas)
+        pedido.fully_completed = completadas.issuperset(SECCIONES_REQUERIDAS)
+        pedido.pendiente = pedido.status != 'completado' or not pedido.sectionStatus
+        lote.append(pedido)
+        if len(lote) >= 2000:
+            Pedido.objects.bulk_update(lote, campos)
+            lote = []
+    Pedido.objects.bulk_update(lote, campos)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0003_menu_updated_at'),
+        ('pacientes', '0003_paciente_search_tokens'),
+        ('pedidos', '0005_pedido_status_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='fully_completed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='sections_completed_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='pendiente',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['pendiente', 'fecha_pedido', 'id'], name='pedido_pendiente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fully_completed', 'fecha_pedido'], name='pedido_completo_fecha_idx'),
+        ),
+        migrations.RunPython(calcular_estado, migrations.RunPython.noop),
+    ]
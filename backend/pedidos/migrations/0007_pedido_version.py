@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0006_pedido_estado_secciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def referenciar_versiones(apps, schema_editor):
+    """Asocia los pedidos existentes a la versión publicada de su menú y copia sus opciones."""
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    PedidoMenuOption = apps.get_model('pedidos', 'PedidoMenuOption')
+    MenuOption = apps.get_model('menus', 'MenuOption')
+    MenuVersion = apps.get_model('menus', 'MenuVersion')
+
+    for version_id, menu_id in MenuVersion.objects.values_list('id', 'menu_id'):
+        Pedido.objects.filter(menu_id=menu_id, menu_version__isnull=True).update(menu_version_id=version_id)
+
+    opcion = MenuOption.objects.filter(pk=OuterRef('menu_option_id'))
+    PedidoMenuOption.objects.update(
+        texto=Coalesce(Subquery(opcion.values('texto')[:1]), Value('')),
+        tipo=Coalesce(Subquery(opcion.values('tipo')[:1]), Value('')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0004_menuversion'),
+        ('pedidos', '0007_pedido_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='menu_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='pedidos', to='menus.menuversion'),
+        ),
+        migrations.AddField(
+            model_name='pedidomenuoption',
+            name='texto',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='pedidomenuoption',
+            name='tipo',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='pedido',
+            name='menu',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='menus.menu'),
+        ),
+        migrations.AlterField(
+            model_name='pedidomenuoption',
+            name='menu_option',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='menus.menuoption'),
+        ),
+        migrations.RunPython(referenciar_versiones, migrations.RunPython.noop),
+    ]
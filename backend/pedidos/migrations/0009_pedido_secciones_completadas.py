@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+def calcular_secciones_completadas(apps, schema_editor):
+    """
+    Calcula las claves de las secciones completadas de los pedidos existentes.
+
+    El cálculo se copia aquí en lugar de importar el modelo actual, que
+    puede no coincidir con el esquema de esta migración.
+    """
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    lote = []
+    for pedido in Pedido.objects.filter(sections_completed_count__gt=0).only(
+        'id', 'sectionStatus'
+    ).iterator(chunk_size=2000):
+        completadas = sorted({
+            seccion.strip().lower().replace(' ', '_')
+            for seccion, estado in (pedido.sectionStatus or {}).items()
+            if estado == 'completado'
+        })
+        pedido.secciones_completadas = f"|{'|'.join(completadas)}|"
+        lote.append(pedido)
+        if len(lote) >= 2000:
+            Pedido.objects.bulk_update(lote, ['secciones_completadas'])
+            lote = []
+    Pedido.objects.bulk_update(lote, ['secciones_completadas'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0008_menu_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='secciones_completadas',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(calcular_secciones_completadas, migrations.RunPython.noop),
+    ]
@@ -4,17 +4,218 @@ Módulo de modelos para la gestión de pedidos hospitalarios.
 Define los modelos principales para manejar los pedidos de comidas:
 - Pedido: Gestiona los pedidos de comidas de los pacientes
 - PedidoMenuOption: Maneja las opciones seleccionadas en cada pedido
+- PedidoChange: Registra la secuencia de cambios para la sincronización incremental
 
 Incluye validaciones para:
 - Estado del paciente
-- Estado de completitud del pedido
+- Estado de completitud del pedido, persistido en columnas indexadas
 - Relaciones entre pedidos y opciones de menú
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from pacientes.models import Paciente
-from menus.models import Menu, MenuOption
+from menus.models import Menu, MenuOption, MenuSection, MenuVersion
+
+SECCIONES_REQUERIDAS = (
+    'desayuno',
+    'almuerzo',
+    'cena',
+    'bebidas_calientes',
+    'bebidas_frias',
+    'snacks',
+)
+
+def clave_seccion(titulo):
+    """
+    Normaliza el título de una sección para compararlo con SECCIONES_REQUERIDAS.
+
+    El frontend guarda sectionStatus con los títulos de las secciones del
+    menú (por ejemplo, Desayuno o Bebidas_calientes).
+
+    Args:
+        titulo (str): Título o clave de la sección.
+
+    Returns:
+        str: Clave en minúsculas con guiones bajos en lugar de espacios.
+    """
+    return titulo.strip().lower().replace(' ', '_')
+
+class PedidoQuerySet(models.QuerySet):
+    """
+    QuerySet personalizado para el modelo Pedido.
+    
+    Agrupa las optimizaciones de consulta necesarias para serializar
+    pedidos con todas sus relaciones anidadas.
+    """
+
+    def con_relaciones(self, incluir_menu=True):
+        """
+        Carga por adelantado las relaciones usadas por PedidoSerializer.
+        
+        Resuelve con JOINs las relaciones uno a uno (paciente, cama, habitación,
+        servicio y menú) y con un número fijo de consultas adicionales las
+        relaciones múltiples, de modo que el número de consultas no depende
+        de la cantidad de pedidos serializados. El árbol de secciones y
+        opciones del menú no se precarga: se obtiene de la caché de menús.
+        
+        Args:
+            incluir_menu (bool): Si es False, omite el JOIN con el menú
+                para las proyecciones que no lo incluyen.
+                
+        Returns:
+            QuerySet: Pedidos con select_related y prefetch_related aplicados.
+        """
+        queryset = self.select_related(
+            'paciente',
+            'paciente__cama',
+            'paciente__cama__habitacion',
+            'paciente__cama__habitacion__servicio'
+        ).prefetch_related(
+            'paciente__dietas',
+            'paciente__alergias',
+            models.Prefetch(
+                'pedidomenuoption_set',
+                queryset=PedidoMenuOption.objects.select_related('menu_option')
+            ),
+        )
+        if incluir_menu:
+            queryset = queryset.select_related('menu')
+        return queryset
+
+    def pendientes(self):
+        """
+        Filtra los pedidos que aún no se han completado.
+        
+        Usa la columna indexada pendiente, derivada del estado y de
+        sectionStatus, en lugar de combinar ambas condiciones con OR.
+        
+        Returns:
+            QuerySet: Pedidos no completados o con sectionStatus vacío.
+        """
+        return self.filter(pendiente=True)
+
+    def titulos_secciones(self, pk):
+        """
+        Obtiene los títulos de las secciones del menú de un pedido.
+        
+        Usa la versión publicada del menú que referencia el pedido y, para
+        los pedidos sin versión, las secciones actuales del menú.
+        
+        Args:
+            pk (int): ID del pedido.
+            
+        Returns:
+            list: Títulos de las secciones.
+            
+        Raises:
+            Pedido.DoesNotExist: Si el pedido no existe.
+        """
+        pedido = self.select_related('menu_version').only(
+            'menu_id', 'menu_version__snapshot'
+        ).get(pk=pk)
+        if pedido.menu_version is not None:
+            return [section['titulo'] for section in pedido.menu_version.snapshot.get('sections', [])]
+        return list(MenuSection.objects.filter(menu_id=pedido.menu_id).values_list('titulo', flat=True))
+
+    def actualizar_con_version(self, pk, calcular_cambios, version=None, intentos=5):
+        """
+        Actualiza un pedido con compare-and-swap sobre su columna version.
+        
+        Lee el estado actual sin bloquear la fila, calcula los cambios a
+        partir de él y los escribe con un UPDATE condicionado a que la
+        versión no haya cambiado. Si otro usuario escribió entre la lectura
+        y la escritura, vuelve a intentarlo sobre el estado nuevo, salvo que
+        el cliente haya indicado la versión esperada.
+        
+        Los reintentos releen la fila con SELECT ... FOR UPDATE: dentro de
+        una transacción en REPEATABLE READ (MySQL) una lectura normal vería
+        la misma instantánea y la versión obsoleta, mientras que la lectura
+        con bloqueo obtiene la última versión confirmada y asegura que el
+        siguiente UPDATE no vuelva a fallar. Cada intento se ejecuta en su
+        propio bloque atómico, que mantiene el bloqueo hasta el UPDATE.
+        
+        Args:
+            pk (int): ID del pedido.
+            calcular_cambios (callable): Recibe el pedido actual y devuelve
+                un diccionario con los campos a escribir.
+            version (int, opcional): Versión esperada por el cliente.
+            intentos (int): Número máximo de intentos ante escrituras concurrentes.
+            
+        Returns:
+            Pedido | None: Instancia parcial con los campos escritos, o None
+                si la versión esperada no coincide con la actual.
+                
+        Raises:
+            Pedido.DoesNotExist: Si el pedido no existe.
+        """
+        for intento in range(intentos):
+            with transaction.atomic():
+                queryset = self if intento == 0 else self.select_for_update()
+                pedido = queryset.only(
+                    'id', 'status', 'sectionStatus', 'adicionales', 'version'
+                ).get(pk=pk)
+                if version is not None and pedido.version != version:
+                    return None
+
+                cambios = calcular_cambios(pedido)
+                if 'sectionStatus' in cambios:
+                    (
+                        cambios['sections_completed_count'],
+                        cambios['fully_completed'],
+                        cambios['secciones_completadas'],
+                    ) = self.model.calcular_estado_secciones(cambios['sectionStatus'])
+                cambios['pendiente'] = self.model.es_pendiente(
+                    cambios.get('status', pedido.status),
+                    cambios.get('sectionStatus', pedido.sectionStatus)
+                )
+                cambios['updated_at'] = timezone.now()
+                cambios['version'] = pedido.version + 1
+
+                if self.filter(pk=pk, version=pedido.version).update(**cambios):
+                    for campo, valor in cambios.items():
+                        setattr(pedido, campo, valor)
+                    return pedido
+            if version is not None:
+                return None
+        return None
+
+    def actualizar_seccion(self, pk, seccion, estado, pedido_status=None, version=None):
+        """
+        Cambia el estado de una única sección de un pedido.
+        
+        Escribe la sección junto con los campos derivados en una sola
+        sentencia UPDATE condicionada a la versión, sin bloquear la fila ni
+        tocar adicionales ni las opciones.
+        
+        Args:
+            pk (int): ID del pedido.
+            seccion (str): Clave de la sección en sectionStatus.
+            estado (str): Nuevo estado de la sección.
+            pedido_status (str, opcional): Nuevo estado del pedido. Si no se
+                indica, un pedido pendiente pasa a en_proceso al completar
+                una sección.
+            version (int, opcional): Versión esperada por el cliente.
+                
+        Returns:
+            Pedido | None: Instancia parcial con los campos actualizados, o
+                None si hay conflicto de versión.
+                
+        Raises:
+            Pedido.DoesNotExist: Si el pedido no existe.
+        """
+        def calcular_cambios(pedido):
+            section_status = {**pedido.sectionStatus, seccion: estado}
+            status = pedido_status
+            if status is None:
+                status = pedido.status
+                if status == 'pendiente' and estado == 'completado':
+                    status = 'en_proceso'
+            return {'sectionStatus': section_status, 'status': status}
+
+        return self.actualizar_con_version(pk, calcular_cambios, version=version)
 
 class Pedido(models.Model):
     """
@@ -26,12 +227,23 @@ class Pedido(models.Model):
     Atributos:
         paciente (Paciente): Paciente que realiza el pedido.
         menu (Menu): Menú del cual se realizan las selecciones.
+        menu_version (MenuVersion): Versión publicada del menú al crear el pedido.
         opciones (ManyToManyField): Opciones seleccionadas del menú.
         status (str): Estado actual del pedido (pendiente/en_proceso/completado).
         fecha_pedido (DateTime): Fecha y hora de creación del pedido.
         adicionales (JSONField): Información adicional del pedido en formato JSON.
         sectionStatus (JSONField): Estado de completitud de cada sección.
         observaciones (str): Notas adicionales sobre el pedido.
+        updated_at (DateTime): Fecha y hora de la última modificación.
+        version (int): Versión del pedido, incrementada en cada escritura.
+        sections_completed_count (int): Secciones marcadas como completadas,
+            derivado de sectionStatus.
+        fully_completed (bool): Si todas las secciones requeridas están
+            completadas, derivado de sectionStatus.
+        pendiente (bool): Si el pedido no está completado o su sectionStatus
+            está vacío, derivado del estado y de sectionStatus.
+        secciones_completadas (str): Claves normalizadas de las secciones
+            completadas, delimitadas por '|', derivado de sectionStatus.
     """
     STATUS_CHOICES = [
         ('pendiente', 'Pendiente'),
@@ -40,7 +252,14 @@ class Pedido(models.Model):
     ]
 
     paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE)
-    menu = models.ForeignKey(Menu, on_delete=models.CASCADE)
+    menu = models.ForeignKey(Menu, null=True, on_delete=models.SET_NULL)
+    menu_version = models.ForeignKey(
+        MenuVersion,
+        null=True,
+        blank=True,
+        related_name='pedidos',
+        on_delete=models.PROTECT
+    )
     opciones = models.ManyToManyField(
         MenuOption, 
         through='PedidoMenuOption', 
@@ -52,9 +271,23 @@ class Pedido(models.Model):
     adicionales = models.JSONField(default=dict, blank=True)
     sectionStatus = models.JSONField(default=dict, blank=True)
     observaciones = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
+    sections_completed_count = models.PositiveSmallIntegerField(default=0, editable=False)
+    fully_completed = models.BooleanField(default=False, editable=False)
+    pendiente = models.BooleanField(default=True, editable=False)
+    secciones_completadas = models.TextField(blank=True, default='', editable=False)
+
+    objects = PedidoQuerySet.as_manager()
 
     class Meta:
         ordering = ['-fecha_pedido']
+        indexes = [
+            models.Index(fields=['fecha_pedido', 'id'], name='pedido_fecha_id_idx'),
+            models.Index(fields=['status', 'fecha_pedido', 'id'], name='pedido_status_fecha_idx'),
+            models.Index(fields=['pendiente', 'fecha_pedido', 'id'], name='pedido_pendiente_fecha_idx'),
+            models.Index(fields=['fully_completed', 'fecha_pedido'], name='pedido_completo_fecha_idx'),
+        ]
 
     def __str__(self):
         """Representación en string del pedido."""
@@ -72,49 +305,148 @@ class Pedido(models.Model):
         if not self.paciente.activo:
             raise ValidationError('No se puede crear un pedido para un paciente inactivo.')
 
+    @staticmethod
+    def calcular_estado_secciones(section_status):
+        """
+        Calcula los campos derivados del estado de las secciones.
+        
+        Las claves se normalizan con clave_seccion, de modo que Desayuno y
+        desayuno cuentan como la misma sección. Las claves completadas se
+        guardan delimitadas por '|' (|almuerzo|desayuno|) para buscarlas
+        con LIKE desde las consultas de producción.
+        
+        Args:
+            section_status (dict): Estado de completitud de cada sección.
+            
+        Returns:
+            tuple: Número de secciones completadas, si todas las secciones
+                requeridas están completadas y las claves completadas.
+        """
+        completadas = {
+            clave_seccion(seccion)
+            for seccion, estado in (section_status or {}).items()
+            if estado == 'completado'
+        }
+        claves = f"|{'|'.join(sorted(completadas))}|" if completadas else ''
+        return len(completadas), completadas.issuperset(SECCIONES_REQUERIDAS), claves
+
+    @staticmethod
+    def es_pendiente(status, section_status):
+        """
+        Calcula la columna pendiente que usa PedidoQuerySet.pendientes.
+        
+        Args:
+            status (str): Estado del pedido.
+            section_status (dict): Estado de completitud de cada sección.
+            
+        Returns:
+            bool: True si el pedido no está completado o su sectionStatus
+                está vacío.
+        """
+        return status != 'completado' or not section_status
+
+    def save(self, *args, **kwargs):
+        """
+        Sobrescribe el método save para mantener los campos derivados.
+        
+        Recalcula sections_completed_count, fully_completed,
+        secciones_completadas y pendiente a partir de status y sectionStatus en cada escritura, incluidas las
+        que indican update_fields con alguno de ellos, e incrementa la
+        versión de los pedidos existentes.
+        """
+        self.sections_completed_count, self.fully_completed, self.secciones_completadas = (
+            self.calcular_estado_secciones(self.sectionStatus)
+        )
+        self.pendiente = self.es_pendiente(self.status, self.sectionStatus)
+        if self.pk is not None and not self._state.adding:
+            self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'version'}
+            if 'sectionStatus' in update_fields:
+                update_fields |= {'sections_completed_count', 'fully_completed', 'secciones_completadas'}
+            if update_fields & {'status', 'sectionStatus'}:
+                update_fields.add('pendiente')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     @property
     def is_fully_completed(self):
         """
         Verifica si todas las secciones del pedido están completadas.
         
         Returns:
-            bool: True si todas las secciones están marcadas como completadas,
-                 False en caso contrario.
+            bool: Valor persistido en la columna fully_completed.
         """
-        if not self.sectionStatus:
-            return False
-            
-        required_sections = [
-            'desayuno',
-            'almuerzo',
-            'cena',
-            'bebidas_calientes',
-            'bebidas_frias',
-            'snacks'
-        ]
-        
-        for section in required_sections:
-            if self.sectionStatus.get(section) != 'completado':
-                return False
-                
-        return True
+        return self.fully_completed
 
 class PedidoMenuOption(models.Model):
     """
     Modelo intermedio para relacionar pedidos con opciones de menú.
     
     Gestiona la relación many-to-many entre Pedido y MenuOption,
-    permitiendo marcar qué opciones fueron seleccionadas.
+    permitiendo marcar qué opciones fueron seleccionadas. Guarda una copia
+    del texto y el tipo de la opción, y la referencia a la opción no tiene
+    restricción en la base de datos, de modo que editar o eliminar opciones
+    del menú no altera el historial de pedidos.
     
     Atributos:
         pedido (Pedido): Pedido al que pertenece la selección.
-        menu_option (MenuOption): Opción de menú seleccionada.
+        menu_option (MenuOption): Opción de menú seleccionada. Puede no
+            existir si la opción se eliminó del menú.
         selected (bool): Indica si la opción fue seleccionada.
+        texto (str): Texto de la opción al crear el pedido.
+        tipo (str): Tipo de la opción al crear el pedido.
     """
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE)
-    menu_option = models.ForeignKey(MenuOption, on_delete=models.CASCADE)
+    menu_option = models.ForeignKey(
+        MenuOption,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
     selected = models.BooleanField(default=False)
+    texto = models.CharField(max_length=255, blank=True, default='')
+    tipo = models.CharField(max_length=50, blank=True, default='')
 
     def __str__(self):
         """Representación en string de la selección de menú."""
-        return f"{self.pedido.id} - {self.menu_option.texto}"
+        return f"{self.pedido_id} - {self.texto or self.menu_option_id}"
+
+
+class PedidoChange(models.Model):
+    """
+    Modelo que registra cada cambio realizado sobre un pedido.
+    
+    Su clave primaria es una secuencia creciente que sirve como token de
+    sincronización: los clientes solicitan los cambios posteriores al último
+    token recibido. No usa una clave foránea para que los registros de
+    eliminación se conserven después de borrar el pedido.
+    
+    Atributos:
+        id (BigAutoField): Número de secuencia del cambio.
+        pedido_id (int): ID del pedido modificado.
+        tipo (str): Tipo de cambio (created/updated/status/deleted).
+        timestamp (DateTime): Fecha y hora del cambio.
+    """
+    TIPO_CHOICES = [
+        ('created', 'Creado'),
+        ('updated', 'Actualizado'),
+        ('status', 'Cambio de estado'),
+        ('deleted', 'Eliminado'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    pedido_id = models.IntegerField()
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['pedido_id', 'id'], name='pedidochange_pedido_id_idx'),
+        ]
+
+    def __str__(self):
+        """Representación en string del cambio."""
+        return f"{self.id} - Pedido {self.pedido_id} - {self.tipo}"
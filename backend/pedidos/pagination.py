@@ -0,0 +1,28 @@
+"""
+Paginación para la aplicación de pedidos.
+
+Define la paginación por cursor sobre (fecha_pedido, id), respaldada por
+los índices compuestos del modelo Pedido.
+"""
+
+from backend.pagination import KeysetCursorPagination, OptionalCursorPagination
+
+
+class PedidoCursorPagination(OptionalCursorPagination):
+    """
+    Paginación por cursor para los listados de pedidos.
+
+    Ordena del pedido más reciente al más antiguo, usando el id como
+    desempate para pedidos creados en el mismo instante.
+    """
+    ordering = ('-fecha_pedido', '-id')
+
+
+class PedidoHistorialPagination(KeysetCursorPagination):
+    """
+    Paginación por cursor obligatoria para el historial de pedidos completados.
+
+    Junto con el filtro por estado usa el índice (status, fecha_pedido, id).
+    """
+    page_size = 20
+    ordering = ('-fecha_pedido', '-id')
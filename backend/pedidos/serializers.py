@@ -5,15 +5,66 @@ Define los serializadores para convertir los modelos de pedidos
 en representaciones JSON y viceversa, incluyendo:
 - PedidoMenuOption: Relación entre pedidos y opciones de menú
 - Pedido: Gestión completa de pedidos con sus relaciones
+- Sección de pedido: Cambio de estado de una única sección
+
+Las actualizaciones de pedidos usan control de concurrencia optimista
+sobre la columna version (cabecera If-Match o campo version).
 """
 
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from pedidos.models import Pedido, PedidoMenuOption
 from pacientes.models import Paciente
-from menus.models import Menu, MenuOption, MenuSection
+from menus.models import Menu, MenuOption, MenuSection, MenuVersion
+from menus.cache import menu_cache
+from menus.compatibilidad import es_compatible, mascaras_paciente
 from pacientes.serializers import PacienteSerializer
 from menus.serializers import MenuSerializer, MenuSectionSerializer, MenuOptionSerializer
 
+class PedidoVersionConflict(APIException):
+    """
+    Error 409 para actualizaciones con una versión de pedido desactualizada.
+    
+    La respuesta incluye el estado actual del pedido para que el cliente
+    pueda fusionar sus cambios y reintentar.
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'El pedido fue modificado por otro usuario.'
+    default_code = 'conflict'
+
+    def __init__(self, pedido_data):
+        super().__init__()
+        self.detail = {'detail': str(self.default_detail), 'pedido': pedido_data}
+
+
+def version_solicitada(request, version=None):
+    """
+    Obtiene la versión de pedido esperada por el cliente.
+    
+    Usa la cabecera If-Match (por ejemplo "3" o W/"3") si está presente y,
+    si no, la versión enviada en el cuerpo de la petición.
+    
+    Args:
+        request: Request HTTP.
+        version (int, opcional): Versión recibida en el cuerpo.
+        
+    Returns:
+        int | None: Versión esperada, o None si el cliente no la indicó.
+        
+    Raises:
+        ValidationError: Si la cabecera If-Match no contiene una versión válida.
+    """
+    if_match = request.headers.get('If-Match', '').strip() if request is not None else ''
+    if not if_match or if_match == '*':
+        return version
+    try:
+        return int(if_match.removeprefix('W/').strip('"'))
+    except ValueError:
+        raise serializers.ValidationError({'version': 'La cabecera If-Match no contiene una versión válida.'})
+
+
 class PedidoMenuOptionSerializer(serializers.ModelSerializer):
     """
     Serializador para la relación entre pedidos y opciones de menú.
@@ -21,12 +72,31 @@ class PedidoMenuOptionSerializer(serializers.ModelSerializer):
     Proporciona la representación de las opciones seleccionadas
     en cada pedido, incluyendo los detalles completos de cada opción.
     """
-    menu_option = MenuOptionSerializer()
+    menu_option = serializers.SerializerMethodField()
     
     class Meta:
         model = PedidoMenuOption
         fields = ['menu_option', 'selected']
 
+    def get_menu_option(self, obj):
+        """
+        Obtiene la opción seleccionada tal como estaba al crear el pedido.
+        
+        Usa la copia guardada en la selección y, para las selecciones
+        anteriores a ella, la opción actual del menú.
+        
+        Args:
+            obj (PedidoMenuOption): Selección a representar.
+            
+        Returns:
+            dict | None: ID, texto y tipo de la opción, o None si no existe.
+        """
+        if obj.texto:
+            return {'id': obj.menu_option_id, 'texto': obj.texto, 'tipo': obj.tipo}
+        if obj.menu_option is None:
+            return None
+        return MenuOptionSerializer(obj.menu_option).data
+
 class PedidoSerializer(serializers.ModelSerializer):
     """
     Serializador principal para el modelo Pedido.
@@ -46,7 +116,7 @@ class PedidoSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    menu = MenuSerializer(read_only=True)
+    menu = serializers.SerializerMethodField()
     menu_id = serializers.PrimaryKeyRelatedField(
         queryset=Menu.objects.all(),
         source='menu',
@@ -57,7 +127,8 @@ class PedidoSerializer(serializers.ModelSerializer):
         many=True, 
         read_only=True
     )
-    is_fully_completed = serializers.BooleanField(read_only=True)
+    is_fully_completed = serializers.BooleanField(source='fully_completed', read_only=True)
+    version = serializers.IntegerField(required=False, min_value=1)
 
     class Meta:
         model = Pedido
@@ -66,9 +137,65 @@ class PedidoSerializer(serializers.ModelSerializer):
             'menu', 'menu_id',
             'opciones', 'status', 'fecha_pedido', 
             'adicionales', 'sectionStatus',
-            'observaciones', 'is_fully_completed'
+            'observaciones', 'is_fully_completed', 'version'
         ]
 
+    def __init__(self, *args, **kwargs):
+        """
+        Inicializa el serializador permitiendo restringir los campos devueltos.
+        
+        Args:
+            fields (list, opcional): Nombres de los campos a incluir en la
+                representación. Los demás campos se descartan.
+        """
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def get_menu(self, obj):
+        """
+        Obtiene la representación del menú del pedido desde la caché de menús.
+        
+        Los pedidos con versión publicada usan la representación inmutable
+        de esa versión; los anteriores, la del menú actual.
+        
+        Args:
+            obj (Pedido): Pedido a serializar.
+            
+        Returns:
+            dict | None: Menú serializado, compartido entre todos los pedidos
+                de la misma versión, o None si el menú ya no existe.
+        """
+        if obj.menu_version_id:
+            return menu_cache.obtener_version(obj.menu_version_id)
+        if obj.menu is None:
+            return None
+        return menu_cache.obtener(obj.menu)
+
+    def to_representation(self, instance):
+        """
+        Convierte un pedido a su representación JSON.
+        
+        Si las opciones del pedido no vienen precargadas (por ejemplo, justo
+        después de crearlo o actualizarlo), las carga junto con su MenuOption
+        en una sola consulta.
+        
+        Args:
+            instance (Pedido): Pedido a representar.
+            
+        Returns:
+            dict: Representación JSON del pedido.
+        """
+        if ('opciones' in self.fields
+                and 'pedidomenuoption_set' not in getattr(instance, '_prefetched_objects_cache', {})):
+            prefetch_related_objects([instance], Prefetch(
+                'pedidomenuoption_set',
+                queryset=PedidoMenuOption.objects.select_related('menu_option')
+            ))
+        return super().to_representation(instance)
+
     def validate(self, data):
         """
         Valida los datos del pedido antes de la creación/actualización.
@@ -91,47 +218,105 @@ class PedidoSerializer(serializers.ModelSerializer):
             })
         return data
 
+    def _seleccion_opciones(self, opciones_data):
+        """
+        Resuelve las opciones enviadas en el pedido con una sola consulta.
+        
+        Descarta los identificadores repetidos (se conserva la primera
+        aparición) y los que no corresponden a una opción existente.
+        
+        Args:
+            opciones_data (list): Opciones recibidas con su id y estado selected.
+            
+        Returns:
+            dict: Diccionario {id_opcion: (MenuOption, selected)}.
+        """
+        seleccion = {}
+        for opcion_data in opciones_data:
+            try:
+                opcion_id = int(opcion_data.get('id'))
+            except (TypeError, ValueError):
+                continue
+            if opcion_id not in seleccion:
+                seleccion[opcion_id] = opcion_data.get('selected', False)
+
+        menu_options = MenuOption.objects.in_bulk(list(seleccion))
+        return {
+            opcion_id: (menu_options[opcion_id], selected)
+            for opcion_id, selected in seleccion.items()
+            if opcion_id in menu_options
+        }
+
+    def _validar_compatibilidad(self, paciente, seleccion):
+        """
+        Verifica que las opciones seleccionadas sean aptas para el paciente.
+        
+        Compara las máscaras precalculadas de las opciones, ya cargadas en
+        la selección, con las alergias y dietas del paciente, sin consultas
+        por opción.
+        
+        Args:
+            paciente (Paciente): Paciente del pedido.
+            seleccion (dict): Selección resuelta por _seleccion_opciones.
+            
+        Raises:
+            ValidationError: Si alguna opción seleccionada contiene un
+                alérgeno del paciente o es incompatible con sus dietas.
+        """
+        seleccionadas = [menu_option for menu_option, selected in seleccion.values() if selected]
+        if paciente is None or not seleccionadas:
+            return
+        alergias, dietas = mascaras_paciente(paciente.pk)
+        conflictos = [
+            menu_option.texto for menu_option in seleccionadas
+            if not es_compatible(menu_option.alergenos_bits, menu_option.dietas_bits, alergias, dietas)
+        ]
+        if conflictos:
+            raise serializers.ValidationError({
+                'opciones': 'Opciones incompatibles con las alergias o dietas del paciente: '
+                            + ', '.join(conflictos)
+            })
+
     def create(self, validated_data):
         """
         Crea un nuevo pedido con sus opciones relacionadas.
         
+        Las opciones se validan con una sola consulta, se comprueba su
+        compatibilidad con el paciente y se insertan con bulk_create dentro
+        de la misma transacción que el pedido.
+        
         Args:
             validated_data (dict): Datos validados del pedido.
             
         Returns:
             Pedido: Nueva instancia de pedido creada.
         """
+        validated_data.pop('version', None)
         opciones_data = self.initial_data.get('opciones', [])
         adicionales_data = validated_data.pop('adicionales', {})
         section_status_data = validated_data.pop('sectionStatus', {})
+        seleccion = self._seleccion_opciones(opciones_data)
+        self._validar_compatibilidad(validated_data['paciente'], seleccion)
 
-        pedido = Pedido.objects.create(
-            paciente=validated_data['paciente'],
-            menu=validated_data['menu'],
-            adicionales=adicionales_data,
-            sectionStatus=section_status_data,
-            observaciones=validated_data.get('observaciones', '')
-        )
-
-        # Usar un set para evitar duplicados
-        opciones_procesadas = set()
-        
-        for opcion_data in opciones_data:
-            try:
-                opcion_id = opcion_data['id']
-                # Si ya procesamos esta opción, la saltamos
-                if opcion_id in opciones_procesadas:
-                    continue
-                
-                menu_option = MenuOption.objects.get(id=opcion_id)
-                PedidoMenuOption.objects.create(
+        with transaction.atomic():
+            pedido = Pedido.objects.create(
+                paciente=validated_data['paciente'],
+                menu=validated_data['menu'],
+                menu_version=MenuVersion.objects.vigente(validated_data['menu']),
+                adicionales=adicionales_data,
+                sectionStatus=section_status_data,
+                observaciones=validated_data.get('observaciones', '')
+            )
+            PedidoMenuOption.objects.bulk_create([
+                PedidoMenuOption(
                     pedido=pedido,
                     menu_option=menu_option,
-                    selected=opcion_data.get('selected', False)
+                    selected=selected,
+                    texto=menu_option.texto,
+                    tipo=menu_option.tipo
                 )
-                opciones_procesadas.add(opcion_id)
-            except MenuOption.DoesNotExist:
-                continue
+                for menu_option, selected in seleccion.values()
+            ])
 
         return pedido
 
@@ -139,45 +324,143 @@ class PedidoSerializer(serializers.ModelSerializer):
         """
         Actualiza un pedido existente y sus opciones relacionadas.
         
+        Escribe el pedido con compare-and-swap sobre su versión, sin bloquear
+        la fila. Las claves enviadas en sectionStatus y adicionales se
+        fusionan con las guardadas en el momento de escribir, de modo que
+        las actualizaciones concurrentes de distintas secciones no se pisan.
+        Si el cliente indica la versión esperada (If-Match o campo version)
+        y no coincide con la actual, responde 409 con el estado actual.
+        
+        Si se envían opciones, compara la selección recibida con las filas
+        existentes y aplica solo las diferencias: elimina las opciones que
+        ya no están, actualiza el estado selected de las que cambiaron y
+        crea las nuevas, con un número fijo de consultas.
+        
         Args:
             instance (Pedido): Instancia del pedido a actualizar.
             validated_data (dict): Datos validados del pedido.
             
         Returns:
             Pedido: Instancia del pedido actualizada.
+            
+        Raises:
+            PedidoVersionConflict: Si la versión esperada no es la actual.
+            ValidationError: Si alguna opción seleccionada no es apta para el paciente.
         """
         if instance.paciente and not instance.paciente.activo:
             validated_data.pop('paciente', None)
         
+        version = version_solicitada(self.context.get('request'), validated_data.pop('version', None))
         opciones_data = self.initial_data.get('opciones', [])
-        adicionales_data = validated_data.pop('adicionales', instance.adicionales)
-        section_status_data = validated_data.pop('sectionStatus', instance.sectionStatus)
+        adicionales_data = validated_data.pop('adicionales', {})
+        section_status_data = validated_data.pop('sectionStatus', {})
+        if validated_data.get('menu') is not None and validated_data['menu'].pk != instance.menu_id:
+            validated_data['menu_version'] = MenuVersion.objects.vigente(validated_data['menu'])
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        seleccion = self._seleccion_opciones(opciones_data) if opciones_data else {}
+        self._validar_compatibilidad(validated_data.get('paciente', instance.paciente), seleccion)
 
-        instance.adicionales = adicionales_data
-        instance.sectionStatus = section_status_data
-        instance.save()
+        def calcular_cambios(actual):
+            return {
+                **validated_data,
+                'adicionales': {**actual.adicionales, **adicionales_data},
+                'sectionStatus': {**actual.sectionStatus, **section_status_data},
+            }
 
-        if opciones_data:
-            instance.pedidomenuoption_set.all().delete()
-            
-            # Usar un set para evitar duplicados
-            opciones_procesadas = set()
-            
-            for opcion_data in opciones_data:
-                opcion_id = opcion_data.get('id')
-                if opcion_id is not None and opcion_id not in opciones_procesadas:
-                    try:
-                        menu_option = MenuOption.objects.get(id=opcion_id)
-                        PedidoMenuOption.objects.create(
-                            pedido=instance,
-                            menu_option=menu_option,
-                            selected=opcion_data.get('selected', False)
-                        )
-                        opciones_procesadas.add(opcion_id)
-                    except MenuOption.DoesNotExist:
-                        continue
+        with transaction.atomic():
+            actualizado = Pedido.objects.actualizar_con_version(
+                instance.pk, calcular_cambios, version=version
+            )
+            if actualizado is None:
+                raise PedidoVersionConflict(
+                    PedidoSerializer(Pedido.objects.con_relaciones().get(pk=instance.pk)).data
+                )
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            for attr in ('adicionales', 'sectionStatus', 'sections_completed_count',
+                         'fully_completed', 'secciones_completadas', 'pendiente',
+                         'updated_at', 'version'):
+                setattr(instance, attr, getattr(actualizado, attr))
+
+            if opciones_data:
+                self._sincronizar_opciones(instance, seleccion)
 
         return instance
+
+    def _sincronizar_opciones(self, instance, seleccion):
+        """
+        Aplica la diferencia entre las opciones guardadas y la nueva selección.
+        
+        Args:
+            instance (Pedido): Pedido a actualizar.
+            seleccion (dict): Selección resuelta por _seleccion_opciones.
+        """
+        existentes = {}
+        eliminar = []
+        for fila in PedidoMenuOption.objects.filter(pedido=instance):
+            if fila.menu_option_id in seleccion and fila.menu_option_id not in existentes:
+                existentes[fila.menu_option_id] = fila
+            else:
+                eliminar.append(fila.id)
+
+        actualizar = []
+        for opcion_id, fila in existentes.items():
+            selected = seleccion[opcion_id][1]
+            if fila.selected != selected:
+                fila.selected = selected
+                actualizar.append(fila)
+
+        nuevas = [
+            PedidoMenuOption(
+                pedido=instance,
+                menu_option=menu_option,
+                selected=selected,
+                texto=menu_option.texto,
+                tipo=menu_option.tipo
+            )
+            for opcion_id, (menu_option, selected) in seleccion.items()
+            if opcion_id not in existentes
+        ]
+
+        if eliminar:
+            PedidoMenuOption.objects.filter(id__in=eliminar).delete()
+        if actualizar:
+            PedidoMenuOption.objects.bulk_update(actualizar, ['selected'])
+        if nuevas:
+            PedidoMenuOption.objects.bulk_create(nuevas)
+
+class PedidoResumenSerializer(PedidoSerializer):
+    """
+    Serializador de solo lectura con la proyección resumida de un pedido.
+    
+    Omite el árbol anidado del menú y envía únicamente su identificador,
+    lo que reduce el tamaño de los listados consultados periódicamente.
+    """
+    menu_id = serializers.PrimaryKeyRelatedField(source='menu', read_only=True)
+
+    class Meta(PedidoSerializer.Meta):
+        fields = [
+            'id', 'paciente', 'menu_id',
+            'opciones', 'status', 'fecha_pedido',
+            'adicionales', 'sectionStatus',
+            'observaciones', 'is_fully_completed', 'version'
+        ]
+
+class PedidoSeccionSerializer(serializers.Serializer):
+    """
+    Serializador para el cambio de estado de una sección de un pedido.
+    
+    Atributos:
+        status: Nuevo estado de la sección (completado por defecto).
+        pedido_status: Nuevo estado del pedido (opcional).
+        version: Versión esperada del pedido (opcional).
+    """
+    status = serializers.ChoiceField(
+        choices=['pendiente', 'completado'],
+        default='completado'
+    )
+    pedido_status = serializers.ChoiceField(
+        choices=Pedido.STATUS_CHOICES,
+        required=False
+    )
+    version = serializers.IntegerField(required=False, min_value=1)
@@ -0,0 +1,798 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.test import APIClient
+from rest_framework import status
+from authentication.models import CustomUser
+from servicios.models import Servicio
+from habitaciones.models import Habitacion
+from camas.models import Cama
+from dietas.models import Dieta, Alergia
+from pacientes.models import Paciente
+from menus.models import Menu, MenuSection, MenuOption, MenuVersion
+from menus.cache import menu_cache
+from authentication.cache import usuario_cache
+from pedidos.models import Pedido, PedidoMenuOption, PedidoChange, SECCIONES_REQUERIDAS
+from pedidos.events import get_broker
+from logs.models import LogEntry
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def test_user(db):
+    user = CustomUser.objects.create_user(
+        username='testuser',
+        email='testuser@example.com',
+        password='testpass',
+        name='Test User',
+        cedula='1234567890',
+        role='admin',
+        activo=True
+    )
+    return user
+
+@pytest.fixture
+def access_token(api_client, test_user):
+    url = reverse('login')
+    response = api_client.post(url, {
+        'username': 'testuser',
+        'password': 'testpass'
+    }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data['access']
+
+@pytest.fixture
+def authenticated_client(api_client, access_token):
+    api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + access_token)
+    return api_client
+
+@pytest.fixture
+def menu(db):
+    menu = Menu.objects.create(nombre='Menú del Día')
+    desayuno = MenuSection.objects.create(menu=menu, titulo='Desayuno')
+    MenuOption.objects.create(section=desayuno, texto='Fruta Fresca', tipo='entrada')
+    MenuOption.objects.create(section=desayuno, texto='Huevos Revueltos', tipo='huevos')
+    almuerzo = MenuSection.objects.create(menu=menu, titulo='Almuerzo')
+    MenuOption.objects.create(section=almuerzo, texto='Pollo a la Plancha', tipo='plato_principal')
+    return menu
+
+@pytest.fixture
+def paciente(db):
+    servicio = Servicio.objects.create(nombre='Medicina Interna')
+    habitacion = Habitacion.objects.create(nombre='101', servicio=servicio)
+    cama = Cama.objects.create(nombre='A', habitacion=habitacion)
+    paciente = Paciente.objects.create(cedula='1000', name='Ana Pérez', cama=cama)
+    paciente.dietas.set([Dieta.objects.create(nombre='Hiposódica')])
+    paciente.alergias.set([Alergia.objects.create(nombre='Maní')])
+    return paciente
+
+def crear_pedidos(paciente, menu, cantidad):
+    opciones = list(MenuOption.objects.filter(section__menu=menu))
+    pedidos = Pedido.objects.bulk_create(
+        Pedido(paciente=paciente, menu=menu) for _ in range(cantidad)
+    )
+    PedidoMenuOption.objects.bulk_create(
+        PedidoMenuOption(pedido=pedido, menu_option=opcion, selected=True, texto=opcion.texto, tipo=opcion.tipo)
+        for pedido in pedidos
+        for opcion in opciones
+    )
+    return pedidos
+
+def contar_consultas(client, url):
+    menu_cache.limpiar()
+    usuario_cache.limpiar()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    return len(context.captured_queries)
+
+class TestPedidoList:
+    @pytest.mark.django_db
+    def test_list_without_cursor_returns_full_list(self, authenticated_client, paciente, menu):
+        crear_pedidos(paciente, menu, 3)
+        response = authenticated_client.get(reverse('pedido-list-create'))
+        assert response.status_code == status.HTTP_200_OK
+        assert isinstance(response.data, list)
+        assert len(response.data) == 3
+
+    @pytest.mark.django_db
+    def test_cursor_pagination_walks_all_pages(self, authenticated_client, paciente, menu):
+        crear_pedidos(paciente, menu, 5)
+        url = reverse('pedido-list-create') + '?page_size=2'
+        ids = []
+        while url:
+            response = authenticated_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            ids.extend(pedido['id'] for pedido in response.data['results'])
+            url = response.data['next']
+        assert ids == list(Pedido.objects.order_by('-fecha_pedido', '-id').values_list('id', flat=True))
+
+    @pytest.mark.django_db
+    def test_summary_view_omits_nested_menu(self, authenticated_client, paciente, menu):
+        crear_pedidos(paciente, menu, 1)
+        response = authenticated_client.get(reverse('pedido-list-create') + '?view=summary')
+        assert response.status_code == status.HTTP_200_OK
+        pedido = response.data[0]
+        assert 'menu' not in pedido
+        assert pedido['menu_id'] == menu.id
+
+    @pytest.mark.django_db
+    def test_fields_projection(self, authenticated_client, paciente, menu):
+        crear_pedidos(paciente, menu, 1)
+        response = authenticated_client.get(reverse('pedido-list-create') + '?fields=id,status')
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data[0]) == {'id', 'status'}
+
+class TestPedidoCompletados:
+    @pytest.mark.django_db
+    def test_window_defaults_to_today_and_paginates(self, authenticated_client, paciente, menu):
+        pedidos = crear_pedidos(paciente, menu, 25)
+        Pedido.objects.filter(id__in=[p.id for p in pedidos]).update(status='completado')
+        antiguo = pedidos[0]
+        Pedido.objects.filter(id=antiguo.id).update(fecha_pedido=timezone.now() - timedelta(days=3))
+        url = reverse('pedido-completados')
+
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 20
+        segunda = authenticated_client.get(response.data['next'])
+        assert len(segunda.data['results']) == 4
+        assert segunda.data['next'] is None
+
+        inicio = (timezone.localdate() - timedelta(days=5)).isoformat()
+        response = authenticated_client.get(url, {'fecha_inicio': inicio, 'page_size': 100})
+        assert len(response.data['results']) == 25
+
+    @pytest.mark.django_db
+    def test_filters(self, authenticated_client, paciente, menu):
+        otro = Paciente.objects.create(cedula='2000', name='Óscar Núñez', cama=Cama.objects.create(
+            nombre='B', habitacion=Habitacion.objects.create(nombre='202', servicio=Servicio.objects.create(nombre='Cirugía'))
+        ))
+        pedidos = crear_pedidos(paciente, menu, 2) + crear_pedidos(otro, menu, 3)
+        Pedido.objects.filter(id__in=[p.id for p in pedidos]).update(status='completado')
+        url = reverse('pedido-completados')
+
+        contar = lambda params: len(authenticated_client.get(url, params).data['results'])
+        assert contar({'paciente': 'nunez'}) == 3
+        assert contar({'paciente': '1000'}) == 2
+        assert contar({'servicio': paciente.cama.habitacion.servicio_id}) == 2
+        assert contar({'habitacion': otro.cama.habitacion_id}) == 3
+        assert contar({'menu': menu.id}) == 5
+        assert contar({'paciente_activo': 'false'}) == 0
+
+    @pytest.mark.django_db
+    def test_invalid_window_returns_400(self, authenticated_client):
+        url = reverse('pedido-completados')
+        assert authenticated_client.get(url, {'fecha_inicio': 'ayer'}).status_code == status.HTTP_400_BAD_REQUEST
+        response = authenticated_client.get(url, {'fecha_inicio': '2024-02-02', 'fecha_fin': '2024-02-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_invalid_id_filters_return_400(self, authenticated_client):
+        url = reverse('pedido-completados')
+        for param in ('servicio', 'habitacion', 'menu'):
+            response = authenticated_client.get(url, {param: 'abc'})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert list(response.data) == [param]
+
+class TestPedidoQueryCount:
+    @pytest.mark.django_db
+    def test_list_query_count_is_constant(self, authenticated_client, paciente, menu):
+        url = reverse('pedido-list-create')
+        crear_pedidos(paciente, menu, 10)
+        consultas_pocos = contar_consultas(authenticated_client, url)
+        crear_pedidos(paciente, menu, 990)
+        consultas_muchos = contar_consultas(authenticated_client, url)
+        assert consultas_pocos == consultas_muchos
+
+    @pytest.mark.django_db
+    def test_completados_query_count_is_constant(self, authenticated_client, paciente, menu):
+        url = reverse('pedido-completados')
+        Pedido.objects.filter(id__in=[p.id for p in crear_pedidos(paciente, menu, 10)]).update(status='completado')
+        consultas_pocos = contar_consultas(authenticated_client, url)
+        Pedido.objects.filter(id__in=[p.id for p in crear_pedidos(paciente, menu, 990)]).update(status='completado')
+        consultas_muchos = contar_consultas(authenticated_client, url)
+        assert consultas_pocos == consultas_muchos
+
+    @pytest.mark.django_db
+    def test_detail_query_count_does_not_depend_on_options(self, authenticated_client, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        url = reverse('pedido-detail', args=[pedido.id])
+        consultas_pocos = contar_consultas(authenticated_client, url)
+        seccion = menu.sections.first()
+        MenuOption.objects.bulk_create(
+            MenuOption(section=seccion, texto=f'Opción {i}', tipo='entrada') for i in range(50)
+        )
+        PedidoMenuOption.objects.bulk_create(
+            PedidoMenuOption(pedido=pedido, menu_option=opcion, selected=True)
+            for opcion in MenuOption.objects.filter(texto__startswith='Opción')
+        )
+        consultas_muchos = contar_consultas(authenticated_client, url)
+        assert consultas_pocos == consultas_muchos
+
+class TestConditionalGet:
+    @pytest.mark.django_db
+    def test_list_answers_not_modified_until_something_changes(self, authenticated_client, paciente, menu):
+        crear_pedidos(paciente, menu, 3)
+        url = reverse('pedido-list-create')
+        response = authenticated_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not any('pedidos_pedidomenuoption' in q['sql'] for q in context.captured_queries)
+
+        paciente.name = 'Ana María Pérez'
+        paciente.save()
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    @pytest.mark.django_db
+    def test_detail_etag_ignores_other_orders(self, authenticated_client, paciente, menu):
+        pedidos = crear_pedidos(paciente, menu, 2)
+        detail_url = reverse('pedido-detail', args=[pedidos[0].id])
+        list_url = reverse('pedido-list-create')
+        detail_etag = authenticated_client.get(detail_url)['ETag']
+        list_etag = authenticated_client.get(list_url)['ETag']
+
+        Pedido.objects.filter(id=pedidos[1].id).delete()
+        assert authenticated_client.get(
+            detail_url, HTTP_IF_NONE_MATCH=detail_etag
+        ).status_code == status.HTTP_304_NOT_MODIFIED
+        assert authenticated_client.get(
+            list_url, HTTP_IF_NONE_MATCH=list_etag
+        ).status_code == status.HTTP_200_OK
+
+class TestPedidoStats:
+    @pytest.mark.django_db
+    def test_stats_counts(self, authenticated_client, paciente, menu):
+        pedidos = crear_pedidos(paciente, menu, 3)
+        pedidos[0].status, pedidos[0].sectionStatus = 'completado', {'Desayuno': 'completado'}
+        pedidos[0].save()
+        # Completado sin sectionStatus sigue pendiente, como en pendientes()
+        pedidos[1].status = 'completado'
+        pedidos[1].save()
+        response = authenticated_client.get(reverse('pedido-stats'))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            'pedidos_pendientes': 2,
+            'completados_hoy': 2,
+            'pacientes_activos': 1,
+        }
+
+class TestPedidoProduccion:
+    @pytest.mark.django_db
+    def test_counts_selected_options_of_pending_orders(self, authenticated_client, paciente, menu):
+        pedidos = crear_pedidos(paciente, menu, 4)
+        Pedido.objects.filter(id=pedidos[0].id).update(
+            status='completado', sectionStatus={'desayuno': 'completado'}, sections_completed_count=1,
+            pendiente=False
+        )
+        PedidoMenuOption.objects.filter(
+            pedido=pedidos[1], menu_option__texto='Fruta Fresca'
+        ).update(selected=False)
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(reverse('pedido-produccion'), {'seccion': 'desayuno'})
+        assert response.status_code == status.HTTP_200_OK
+        cantidades = {row['texto']: row['cantidad'] for row in response.data}
+        assert cantidades == {'Fruta Fresca': 2, 'Huevos Revueltos': 3}
+        assert response.data[0]['servicio_nombre'] == 'Medicina Interna'
+        assert response.data[0]['seccion'] == 'Desayuno'
+        produccion = [q for q in context.captured_queries if 'GROUP BY' in q['sql']]
+        assert len(produccion) == 1
+
+    @pytest.mark.django_db
+    def test_skips_completed_sections_of_pending_orders(self, authenticated_client, paciente, menu):
+        pedidos = crear_pedidos(paciente, menu, 2)
+        pedidos[0].status, pedidos[0].sectionStatus = 'en_proceso', {'Desayuno': 'completado'}
+        pedidos[0].save()
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.get(reverse('pedido-produccion'))
+        cantidades = {row['texto']: row['cantidad'] for row in response.data}
+        assert cantidades == {'Fruta Fresca': 1, 'Huevos Revueltos': 1, 'Pollo a la Plancha': 2}
+        assert len([q for q in context.captured_queries if 'pedidos_pedido' in q['sql']]) == 1
+
+    @pytest.mark.django_db
+    def test_completed_section_keys_match_normalised_titles(self, authenticated_client, paciente, menu):
+        bebidas = MenuSection.objects.create(menu=menu, titulo='Bebidas calientes')
+        MenuOption.objects.create(section=bebidas, texto='Café', tipo='bebida')
+        pedidos = crear_pedidos(paciente, menu, 2)
+        pedidos[0].status, pedidos[0].sectionStatus = 'en_proceso', {'Bebidas_calientes': 'completado'}
+        pedidos[0].save()
+
+        response = authenticated_client.get(reverse('pedido-produccion'), {'seccion': 'bebidas calientes'})
+        assert [(row['texto'], row['cantidad']) for row in response.data] == [('Café', 1)]
+
+    @pytest.mark.django_db
+    def test_rejects_invalid_filters(self, authenticated_client):
+        url = reverse('pedido-produccion')
+        for params in ({'servicio': 'abc'}, {'fecha_inicio': 'ayer'}, {'fecha_fin': '2024-02-30'}):
+            response = authenticated_client.get(url, params)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert list(response.data) == list(params)
+
+class TestPedidoChanges:
+    @pytest.mark.django_db
+    def test_returns_only_changes_since_token(self, settings, authenticated_client, paciente, menu):
+        settings.PEDIDOS_CHANGES_LAG = 0
+        url = reverse('pedido-changes')
+        token = authenticated_client.get(url).data['next']
+
+        crear = lambda: authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'opciones': [],
+        }, format='json').data['id']
+        primero, segundo = crear(), crear()
+
+        response = authenticated_client.get(url, {'since': token})
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(p['id'] for p in response.data['pedidos']) == sorted([primero, segundo])
+        assert response.data['deleted'] == []
+        token = response.data['next']
+
+        authenticated_client.patch(
+            reverse('pedido-status-update', args=[primero]), {'status': 'en_proceso'}, format='json'
+        )
+        authenticated_client.delete(reverse('pedido-detail', args=[segundo]))
+
+        response = authenticated_client.get(url, {'since': token})
+        assert [p['id'] for p in response.data['pedidos']] == [primero]
+        assert response.data['pedidos'][0]['status'] == 'en_proceso'
+        assert response.data['deleted'] == [segundo]
+
+        response = authenticated_client.get(url, {'since': response.data['next']})
+        assert response.data['pedidos'] == [] and response.data['deleted'] == []
+
+    @pytest.mark.django_db
+    def test_change_is_rolled_back_with_failed_write(self, monkeypatch, authenticated_client, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+
+        def fallar(self, *args, **kwargs):
+            raise RuntimeError('fallo al eliminar')
+        monkeypatch.setattr(Pedido, 'delete', fallar)
+        with pytest.raises(RuntimeError):
+            authenticated_client.delete(reverse('pedido-detail', args=[pedido.id]))
+        assert not PedidoChange.objects.filter(pedido_id=pedido.id).exists()
+
+    @pytest.mark.django_db
+    def test_token_does_not_pass_recent_changes(self, settings, authenticated_client, paciente, menu):
+        settings.PEDIDOS_CHANGES_LAG = 60
+        url = reverse('pedido-changes')
+        antiguo = crear_pedidos(paciente, menu, 1)[0]
+        PedidoChange.objects.create(
+            pedido_id=antiguo.id, tipo='created', timestamp=timezone.now() - timedelta(minutes=5)
+        )
+        token = authenticated_client.get(url).data['next']
+
+        # Un cambio reciente puede tener por delante IDs aún sin confirmar
+        reciente = crear_pedidos(paciente, menu, 1)[0]
+        PedidoChange.objects.create(pedido_id=reciente.id, tipo='created')
+        response = authenticated_client.get(url, {'since': token})
+        assert [p['id'] for p in response.data['pedidos']] == [reciente.id]
+        assert response.data['next'] == token
+
+        # Pasada la ventana, el token avanza
+        PedidoChange.objects.filter(pedido_id=reciente.id).update(timestamp=timezone.now() - timedelta(minutes=5))
+        response = authenticated_client.get(url, {'since': token})
+        assert int(response.data['next']) > int(token)
+
+    @pytest.mark.django_db
+    def test_invalid_token(self, authenticated_client):
+        response = authenticated_client.get(reverse('pedido-changes'), {'since': 'abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.fixture
+def ticket_impresion(access_token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + access_token)
+    return client.post(reverse('pedido-print-ticket')).data['ticket']
+
+class TestPedidoImpresion:
+    @pytest.mark.django_db
+    def test_renders_one_ticket_per_pending_section(self, api_client, ticket_impresion, paciente, menu):
+        pedidos = crear_pedidos(paciente, menu, 3)
+        Pedido.objects.filter(id=pedidos[0].id).update(sectionStatus={'Desayuno': 'completado'})
+        url = reverse('pedido-print')
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(url, {
+                'servicio': paciente.cama.habitacion.servicio_id,
+                'ticket': ticket_impresion,
+            })
+            html = b''.join(response.streaming_content).decode()
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/html')
+        assert html.count('class="printable-section"') == 5
+        assert 'Pollo a la Plancha' in html and 'Ana Pérez' in html
+        assert len(context.captured_queries) < 10
+
+        response = api_client.get(url, {'seccion': 'almuerzo', 'ticket': ticket_impresion})
+        html = b''.join(response.streaming_content).decode()
+        assert html.count('class="printable-section"') == 3
+        assert 'Huevos Revueltos' not in html
+
+    @pytest.mark.django_db
+    def test_prints_deleted_options_from_snapshot(self, api_client, ticket_impresion, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        Pedido.objects.filter(id=pedido.id).update(menu_version=MenuVersion.objects.vigente(menu))
+        MenuOption.objects.filter(texto='Huevos Revueltos').delete()
+
+        response = api_client.get(reverse('pedido-print'), {'seccion': 'desayuno', 'ticket': ticket_impresion})
+        html = b''.join(response.streaming_content).decode()
+        assert html.count('class="printable-section"') == 1
+        assert '<strong>Huevos:</strong> Huevos Revueltos' in html
+
+    @pytest.mark.django_db
+    def test_rejects_access_token_and_invalid_filters(self, api_client, access_token, ticket_impresion):
+        url = reverse('pedido-print')
+        assert api_client.get(url, {'token': access_token}).status_code == status.HTTP_401_UNAUTHORIZED
+        for params in ({'pedido': 'abc'}, {'servicio': 'x'}, {'fecha_inicio': 'ayer'}, {'fecha_fin': '2024-02-30'}):
+            response = api_client.get(url, {**params, 'ticket': ticket_impresion})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert not response.streaming
+
+        # Los tickets del flujo de eventos no sirven para imprimir
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + access_token)
+        ticket = client.post(reverse('pedido-events-ticket')).data['ticket']
+        assert api_client.get(url, {'ticket': ticket}).status_code == status.HTTP_401_UNAUTHORIZED
+
+class TestPedidoEvents:
+    @pytest.mark.django_db
+    def test_create_publishes_event(self, authenticated_client, paciente, menu, django_capture_on_commit_callbacks):
+        subscription = get_broker().subscribe()
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(reverse('pedido-list-create'), {
+                    'paciente_id': paciente.id,
+                    'menu_id': menu.id,
+                    'opciones': [],
+                }, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+            event = subscription.get(timeout=1)
+            assert event['tipo'] == 'created'
+            assert event['pedido_id'] == response.data['id']
+        finally:
+            subscription.close()
+
+    @pytest.mark.django_db
+    def test_event_stream_uses_short_lived_ticket(self, settings, authenticated_client, access_token):
+        anonimo = APIClient()
+        url = reverse('pedido-events')
+        assert anonimo.get(url + '?token=' + access_token).status_code == status.HTTP_401_UNAUTHORIZED
+
+        ticket = authenticated_client.post(reverse('pedido-events-ticket')).data['ticket']
+        response = anonimo.get(url, {'ticket': ticket}, HTTP_ACCEPT='text/event-stream')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/event-stream'
+        assert next(iter(response.streaming_content)).startswith(b'retry:')
+        response.close()
+
+        # El ticket no sirve para el resto de la API ni después de expirar
+        assert anonimo.get(reverse('pedido-list-create'), {'ticket': ticket}).status_code == status.HTTP_401_UNAUTHORIZED
+        settings.AUTH_TICKET_TTL = -1
+        assert anonimo.get(url, {'ticket': ticket}).status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_event_stream_closes_and_resumes(self, settings, authenticated_client, paciente, menu,
+                                             django_capture_on_commit_callbacks):
+        anonimo = APIClient()
+        settings.PEDIDOS_EVENTS_MAX_DURATION = 0
+        ticket = authenticated_client.post(reverse('pedido-events-ticket')).data['ticket']
+        url = reverse('pedido-events')
+        assert list(anonimo.get(url, {'ticket': ticket}).streaming_content) == [b'retry: 5000\n\n']
+
+        ultimo = PedidoChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(reverse('pedido-list-create'), {
+                'paciente_id': paciente.id,
+                'menu_id': menu.id,
+                'opciones': [],
+            }, format='json')
+        response = anonimo.get(url, {'ticket': ticket}, HTTP_LAST_EVENT_ID=str(ultimo))
+        assert b''.join(response.streaming_content).endswith(b'data: {"tipo": "resync"}\n\n')
+
+class TestPedidoWrites:
+    @pytest.mark.django_db
+    def test_create_with_options_uses_constant_queries(self, authenticated_client, paciente, menu):
+        seccion = menu.sections.first()
+        opciones = MenuOption.objects.bulk_create(
+            MenuOption(section=seccion, texto=f'Opción {i}', tipo='entrada') for i in range(40)
+        )
+        payload = {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'opciones': [{'id': opcion.id, 'selected': True} for opcion in opciones[:2]],
+        }
+        # La primera creación publica la versión del menú
+        authenticated_client.post(reverse('pedido-list-create'), payload, format='json')
+        with CaptureQueriesContext(connection) as pocas:
+            response = authenticated_client.post(reverse('pedido-list-create'), payload, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+        payload['opciones'] = [{'id': opcion.id, 'selected': True} for opcion in opciones]
+        payload['opciones'].append({'id': opciones[0].id, 'selected': False})
+        with CaptureQueriesContext(connection) as muchas:
+            response = authenticated_client.post(reverse('pedido-list-create'), payload, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert PedidoMenuOption.objects.filter(pedido_id=response.data['id']).count() == 40
+        assert len(pocas.captured_queries) == len(muchas.captured_queries)
+
+    @pytest.mark.django_db
+    def test_update_applies_option_diff(self, authenticated_client, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        fruta, huevos, pollo = MenuOption.objects.filter(section__menu=menu).order_by('id')
+        conservada = PedidoMenuOption.objects.get(pedido=pedido, menu_option=fruta)
+
+        response = authenticated_client.put(reverse('pedido-detail', args=[pedido.id]), {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'opciones': [
+                {'id': fruta.id, 'selected': True},
+                {'id': huevos.id, 'selected': False},
+            ],
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+        filas = {fila.menu_option_id: fila for fila in PedidoMenuOption.objects.filter(pedido=pedido)}
+        assert set(filas) == {fruta.id, huevos.id}
+        assert filas[fruta.id].id == conservada.id
+        assert filas[huevos.id].selected is False
+
+class TestPedidoEstadoSecciones:
+    @pytest.mark.django_db
+    def test_write_paths_maintain_derived_columns(self, authenticated_client, paciente, menu):
+        response = authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'sectionStatus': {'desayuno': 'completado', 'almuerzo': 'pendiente'},
+        }, format='json')
+        pedido = Pedido.objects.get(id=response.data['id'])
+        assert (pedido.sections_completed_count, pedido.fully_completed) == (1, False)
+
+        todas = {seccion: 'completado' for seccion in SECCIONES_REQUERIDAS}
+        response = authenticated_client.patch(
+            reverse('pedido-status-update', args=[pedido.id]),
+            {'status': 'completado', 'sectionStatus': todas},
+            format='json'
+        )
+        assert response.data['is_fully_completed'] is True
+        pedido.refresh_from_db()
+        assert (pedido.sections_completed_count, pedido.fully_completed) == (6, True)
+
+        pedido.sectionStatus = {}
+        pedido.save(update_fields=['sectionStatus'])
+        pedido.refresh_from_db()
+        assert (pedido.sections_completed_count, pedido.fully_completed) == (0, False)
+
+    @pytest.mark.django_db
+    def test_pending_filter_uses_derived_columns(self, paciente, menu):
+        pendiente, sin_secciones, completado, sin_completadas = crear_pedidos(paciente, menu, 4)
+        for pedido, status_, secciones in (
+            (sin_secciones, 'completado', {}),
+            (completado, 'completado', {'desayuno': 'completado'}),
+            # Como Q(sectionStatus={}), solo cuenta que sectionStatus esté vacío
+            (sin_completadas, 'completado', {'desayuno': 'pendiente'}),
+        ):
+            pedido.status, pedido.sectionStatus = status_, secciones
+            pedido.save()
+
+        with CaptureQueriesContext(connection) as context:
+            ids = set(Pedido.objects.pendientes().values_list('id', flat=True))
+        assert ids == {pendiente.id, sin_secciones.id}
+        assert '"pendiente"' in context.captured_queries[0]['sql']
+        assert ' OR ' not in context.captured_queries[0]['sql']
+
+    @pytest.mark.django_db
+    def test_section_keys_are_normalised(self, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        pedido.sectionStatus = {
+            seccion.capitalize(): 'completado' for seccion in SECCIONES_REQUERIDAS
+        }
+        pedido.sectionStatus['desayuno'] = 'completado'
+        pedido.save()
+        assert (pedido.sections_completed_count, pedido.fully_completed) == (6, True)
+
+        pedido.status = 'completado'
+        pedido.save(update_fields=['status'])
+        assert not Pedido.objects.pendientes().filter(id=pedido.id).exists()
+        Pedido.objects.actualizar_seccion(pedido.id, 'Cena', 'pendiente', pedido_status='en_proceso')
+        assert Pedido.objects.pendientes().filter(id=pedido.id).exists()
+
+class TestPedidoSeccionStatus:
+    @pytest.mark.django_db
+    def test_patch_updates_single_section(self, authenticated_client, paciente, menu, settings):
+        settings.AUDIT_LOG_ASYNC = False
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        Pedido.objects.filter(id=pedido.id).update(adicionales={'nota': 'sin sal'})
+        opciones_antes = list(PedidoMenuOption.objects.filter(pedido=pedido).values_list('id', flat=True))
+        url = reverse('pedido-section-status', args=[pedido.id, 'almuerzo'])
+
+        with CaptureQueriesContext(connection) as context:
+            response = authenticated_client.patch(url, {}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            'id': pedido.id,
+            'section': 'Almuerzo',
+            'section_status': 'completado',
+            'status': 'en_proceso',
+            'sections_completed_count': 1,
+            'is_fully_completed': False,
+            'version': 2,
+        }
+        updates = [q for q in context.captured_queries if q['sql'].startswith('UPDATE "pedidos_pedido"')]
+        assert len(updates) == 1
+
+        pedido.refresh_from_db()
+        assert pedido.sectionStatus == {'Almuerzo': 'completado'}
+        assert pedido.adicionales == {'nota': 'sin sal'}
+        assert list(PedidoMenuOption.objects.filter(pedido=pedido).values_list('id', flat=True)) == opciones_antes
+        assert LogEntry.objects.get(object_id=pedido.id).details == {'seccion': 'Almuerzo', 'status': 'completado'}
+
+        response = authenticated_client.patch(
+            reverse('pedido-section-status', args=[pedido.id, 'desayuno']),
+            {'pedido_status': 'completado'},
+            format='json'
+        )
+        assert response.data['status'] == 'completado'
+        assert response.data['sections_completed_count'] == 2
+        assert not Pedido.objects.pendientes().filter(id=pedido.id).exists()
+
+    @pytest.mark.django_db
+    def test_patch_errors(self, authenticated_client, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        url = reverse('pedido-section-status', args=[pedido.id, 'almuerzo'])
+        assert authenticated_client.patch(url, {'status': 'listo'}, format='json').status_code == 400
+        missing = reverse('pedido-section-status', args=[pedido.id + 100, 'almuerzo'])
+        assert authenticated_client.patch(missing, {}, format='json').status_code == 404
+
+    @pytest.mark.django_db
+    def test_rejects_sections_outside_order_menu(self, authenticated_client, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        url = reverse('pedido-section-status', args=[pedido.id, 'cena'])
+        response = authenticated_client.patch(url, {}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'section' in response.data
+
+        # Las secciones se toman de la versión publicada del menú del pedido
+        Pedido.objects.filter(id=pedido.id).update(menu_version=MenuVersion.objects.vigente(menu))
+        MenuSection.objects.create(menu=menu, titulo='Cena')
+        assert authenticated_client.patch(url, {}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        pedido.refresh_from_db()
+        assert pedido.sectionStatus == {}
+
+class TestPedidoVersion:
+    @pytest.mark.django_db
+    def test_stale_version_returns_409_with_current_state(self, authenticated_client, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        url = reverse('pedido-status-update', args=[pedido.id])
+
+        response = authenticated_client.patch(url, {'sectionStatus': {'desayuno': 'completado'}, 'version': 1}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['version'] == 2
+
+        response = authenticated_client.patch(
+            url, {'sectionStatus': {'almuerzo': 'completado'}}, format='json', HTTP_IF_MATCH='"1"'
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['pedido']['version'] == 2
+        assert response.data['pedido']['sectionStatus'] == {'desayuno': 'completado'}
+
+        seccion = reverse('pedido-section-status', args=[pedido.id, 'almuerzo'])
+        assert authenticated_client.patch(seccion, {'version': 1}, format='json').status_code == 409
+        assert authenticated_client.patch(url, {}, format='json', HTTP_IF_MATCH='abc').status_code == 400
+
+    @pytest.mark.django_db
+    def test_concurrent_write_is_retried_and_merged(self, paciente, menu):
+        pedido = crear_pedidos(paciente, menu, 1)[0]
+        llamadas = []
+
+        def calcular_cambios(actual):
+            if not llamadas:
+                # Otro auxiliar completa una sección entre la lectura y la escritura
+                Pedido.objects.actualizar_seccion(pedido.id, 'cena', 'completado')
+            llamadas.append(actual.version)
+            return {'sectionStatus': {**actual.sectionStatus, 'almuerzo': 'completado'}}
+
+        actualizado = Pedido.objects.actualizar_con_version(pedido.id, calcular_cambios)
+        assert llamadas == [1, 2]
+        assert actualizado.version == 3
+
+        pedido.refresh_from_db()
+        assert pedido.sectionStatus == {'cena': 'completado', 'almuerzo': 'completado'}
+        assert pedido.sections_completed_count == 2
+
+        llamadas.clear()
+        assert Pedido.objects.actualizar_con_version(pedido.id, calcular_cambios, version=3) is None
+
+class TestMenuVersion:
+    @pytest.mark.django_db
+    def test_orders_keep_published_menu_after_edits(self, authenticated_client, paciente, menu):
+        fruta = MenuOption.objects.get(texto='Fruta Fresca')
+        response = authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'opciones': [{'id': fruta.id, 'selected': True}],
+        }, format='json')
+        pedido = Pedido.objects.get(id=response.data['id'])
+        assert pedido.menu_version.numero == menu.version
+
+        # Se elimina la opción y se edita el menú
+        authenticated_client.put(reverse('menu-detail', args=[menu.id]), {
+            'nombre': 'Menú Editado',
+            'sections': [{'titulo': 'Desayuno', 'opciones': {'huevos': [{'texto': 'Huevos Fritos', 'tipo': 'huevos'}]}}],
+        }, format='json')
+        assert not MenuOption.objects.filter(id=fruta.id).exists()
+        assert PedidoMenuOption.objects.filter(pedido=pedido, menu_option_id=fruta.id).exists()
+
+        menu_cache.limpiar()
+        data = authenticated_client.get(reverse('pedido-detail', args=[pedido.id])).data
+        assert data['menu']['nombre'] == 'Menú del Día'
+        assert data['opciones'] == [{'menu_option': {'id': fruta.id, 'texto': 'Fruta Fresca', 'tipo': 'entrada'}, 'selected': True}]
+
+        response = authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id, 'menu_id': menu.id,
+        }, format='json')
+        assert response.data['menu']['nombre'] == 'Menú Editado'
+        assert MenuVersion.objects.filter(menu=menu).count() == 2
+
+    @pytest.mark.django_db
+    def test_deleting_menu_keeps_orders(self, authenticated_client, paciente, menu):
+        response = authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id, 'menu_id': menu.id,
+        }, format='json')
+        authenticated_client.delete(reverse('menu-detail', args=[menu.id]))
+        data = authenticated_client.get(reverse('pedido-detail', args=[response.data['id']])).data
+        assert data['menu']['nombre'] == 'Menú del Día'
+
+
+class TestPedidoCompatibilidad:
+    @pytest.mark.django_db
+    def test_rejects_options_incompatible_with_patient(self, authenticated_client, paciente, menu):
+        huevos = MenuOption.objects.get(texto='Huevos Revueltos')
+        huevos.alergenos = list(paciente.alergias.values_list('id', flat=True))
+        huevos.save()
+        pollo = MenuOption.objects.get(texto='Pollo a la Plancha')
+        pollo.dietas_excluidas = list(paciente.dietas.values_list('id', flat=True))
+        pollo.save()
+        fruta = MenuOption.objects.get(texto='Fruta Fresca')
+
+        response = authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'opciones': [
+                {'id': fruta.id, 'selected': True},
+                {'id': huevos.id, 'selected': True},
+                {'id': pollo.id, 'selected': True},
+            ],
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'Huevos Revueltos' in str(response.data['opciones'])
+        assert 'Pollo a la Plancha' in str(response.data['opciones'])
+        assert not Pedido.objects.exists()
+
+        # Las opciones no seleccionadas no se validan
+        response = authenticated_client.post(reverse('pedido-list-create'), {
+            'paciente_id': paciente.id,
+            'menu_id': menu.id,
+            'opciones': [{'id': fruta.id, 'selected': True}, {'id': huevos.id, 'selected': False}],
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = authenticated_client.patch(reverse('pedido-detail', args=[response.data['id']]), {
+            'opciones': [{'id': huevos.id, 'selected': True}],
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not PedidoMenuOption.objects.filter(menu_option=huevos, selected=True).exists()
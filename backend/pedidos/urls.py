@@ -4,8 +4,13 @@ Configuración de URLs para la aplicación de pedidos.
 Define las rutas y vistas relacionadas con la gestión de pedidos hospitalarios:
 - Listado y creación de pedidos
 - Detalle, actualización y eliminación de pedidos específicos
-- Actualización de estado de pedidos
+- Actualización de estado de pedidos y de sus secciones
 - Consulta de pedidos completados
+- Estadísticas del tablero de inicio
+- Resumen de producción para cocina
+- Sincronización incremental de cambios
+- Impresión de tickets por lotes
+- Flujo de eventos en tiempo real
 """
 
 from django.urls import path
@@ -13,7 +18,14 @@ from .views import (
     PedidoListCreateView, 
     PedidoDetailView, 
     PedidoStatusUpdateView, 
+    PedidoSeccionStatusView,
     PedidoCompletadosView, 
+    PedidoStatsView,
+    PedidoProduccionView,
+    PedidoChangesView,
+    PedidoImpresionView,
+    PedidoTicketView,
+    PedidoEventStreamView,
 )
 
 urlpatterns = [
@@ -32,8 +44,48 @@ urlpatterns = [
          PedidoStatusUpdateView.as_view(), 
          name='pedido-status-update'),
     
+    # Ruta para cambiar el estado de una sección de un pedido
+    path('<int:pk>/sections/<str:section>/', 
+         PedidoSeccionStatusView.as_view(), 
+         name='pedido-section-status'),
+    
     # Ruta para consultar pedidos completados
     path('completados/', 
          PedidoCompletadosView.as_view(), 
          name='pedido-completados'),
+    
+    # Ruta para consultar las estadísticas del tablero de inicio
+    path('stats/', 
+         PedidoStatsView.as_view(), 
+         name='pedido-stats'),
+    
+    # Ruta para el resumen de producción de cocina
+    path('produccion/', 
+         PedidoProduccionView.as_view(), 
+         name='pedido-produccion'),
+    
+    # Ruta para la sincronización incremental de pedidos
+    path('changes/', 
+         PedidoChangesView.as_view(), 
+         name='pedido-changes'),
+    
+    # Ruta para la impresión de tickets por lotes
+    path('print/', 
+         PedidoImpresionView.as_view(), 
+         name='pedido-print'),
+    
+    # Ruta para obtener el ticket de la ventana de impresión
+    path('print/ticket/', 
+         PedidoTicketView.as_view(vista=PedidoImpresionView), 
+         name='pedido-print-ticket'),
+    
+    # Ruta para el flujo de eventos de pedidos (Server-Sent Events)
+    path('events/', 
+         PedidoEventStreamView.as_view(), 
+         name='pedido-events'),
+    
+    # Ruta para obtener el ticket de conexión al flujo de eventos
+    path('events/ticket/', 
+         PedidoTicketView.as_view(vista=PedidoEventStreamView), 
+         name='pedido-events-ticket'),
 ]
\ No newline at end of file
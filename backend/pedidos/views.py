@@ -4,21 +4,55 @@ Vistas para la gestión de pedidos hospitalarios.
 Define las vistas que manejan las operaciones CRUD y funcionalidades específicas:
 - Listado y creación de pedidos
 - Detalle, actualización y eliminación de pedidos
-- Gestión de estados de pedidos
+- Gestión de estados de pedidos y de sus secciones
 - Consulta de pedidos completados
-- Impresión de pedidos
+- Estadísticas del tablero de inicio
+- Resumen de producción para cocina
+- Sincronización incremental de cambios
+- Flujo de eventos en tiempo real
+- Impresión de pedidos por lotes
 """
 
+import json
+import time
 from rest_framework import generics, views, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
+from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.renderers import BaseRenderer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Q, Count, F, Prefetch, Value
+from django.db.models.functions import Concat, Lower, Replace, Trim
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import datetime, timedelta
-from .models import Pedido
-from .serializers import PedidoSerializer
-from logs.models import LogEntry
+from .models import Pedido, PedidoMenuOption, PedidoChange, clave_seccion
+from .events import get_broker, publicar_evento
+from .pagination import PedidoCursorPagination, PedidoHistorialPagination
+from .serializers import (
+    PedidoSerializer,
+    PedidoResumenSerializer,
+    PedidoSeccionSerializer,
+    PedidoVersionConflict,
+    version_solicitada,
+)
+from pacientes.models import Paciente
+from pacientes.busqueda import filtrar_pacientes
+from menus.models import MenuOption, MenuVersion
+from authentication.authentication import TicketAuthentication
+from authentication.tokens import crear_ticket
+from logs.services import log_action
+from backend.conditional import ConditionalGetMixin
+from backend.params import parse_entero, parse_fecha
 
-class PedidoListCreateView(generics.ListCreateAPIView):
+# Nombres de los tipos de opción para los tickets de impresión
+TIPOS_OPCION = dict(MenuOption.TIPO_OPCION_CHOICES)
+
+class PedidoListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     Vista para listar todos los pedidos y crear nuevos.
     
@@ -26,27 +60,74 @@ class PedidoListCreateView(generics.ListCreateAPIView):
     - Estado del pedido
     - ID del paciente
     - Rango de fechas
+    
+    Admite además:
+    - Paginación por cursor sobre (fecha_pedido, id) con ?cursor= o ?page_size=
+    - Proyección resumida sin el menú anidado con ?view=summary
+    - Selección de campos con ?fields=id,status,...
+    - Peticiones condicionales con If-None-Match / If-Modified-Since
     """
     serializer_class = PedidoSerializer
+    conditional_relations = (
+        'paciente',
+        'paciente__cama',
+        'paciente__cama__habitacion',
+        'paciente__cama__habitacion__servicio',
+        'menu',
+    )
+    pagination_class = PedidoCursorPagination
+
+    def get_serializer_class(self):
+        """
+        Selecciona el serializador según la proyección solicitada.
+        
+        Returns:
+            Serializer: PedidoResumenSerializer si se pide ?view=summary en
+                una lectura, PedidoSerializer en cualquier otro caso.
+        """
+        if self.request.method == 'GET' and self.request.query_params.get('view') == 'summary':
+            return PedidoResumenSerializer
+        return PedidoSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Construye el serializador aplicando la selección de campos de ?fields=.
+        
+        Returns:
+            Serializer: Instancia del serializador con los campos solicitados.
+        """
+        fields = self.request.query_params.get('fields')
+        if self.request.method == 'GET' and fields:
+            kwargs['fields'] = [field.strip() for field in fields.split(',') if field.strip()]
+        return super().get_serializer(*args, **kwargs)
+
+    def _incluye_menu(self):
+        """
+        Indica si la respuesta incluirá el árbol anidado del menú.
+        
+        Returns:
+            bool: False si la proyección solicitada omite el menú.
+        """
+        if self.get_serializer_class() is PedidoResumenSerializer:
+            return False
+        fields = self.request.query_params.get('fields')
+        return not fields or 'menu' in [field.strip() for field in fields.split(',')]
 
     def get_queryset(self):
         """
         Obtiene el queryset de pedidos aplicando los filtros especificados.
         
         Returns:
-            QuerySet: Pedidos filtrados y optimizados con select_related.
+            QuerySet: Pedidos filtrados con sus relaciones precargadas.
         """
-        queryset = Pedido.objects.all()
+        queryset = Pedido.objects.con_relaciones(incluir_menu=self._incluye_menu())
         status = self.request.query_params.get('status', None)
         paciente_id = self.request.query_params.get('paciente_id', None)
         fecha_inicio = self.request.query_params.get('fecha_inicio', None)
         fecha_fin = self.request.query_params.get('fecha_fin', None)
 
         if status == 'pendiente':
-            queryset = queryset.filter(
-                Q(sectionStatus={}) |  
-                ~Q(status='completado')  
-            )
+            queryset = queryset.pendientes()
         elif status:
             queryset = queryset.filter(status=status)
         if paciente_id:
@@ -56,13 +137,7 @@ class PedidoListCreateView(generics.ListCreateAPIView):
         if fecha_fin:
             queryset = queryset.filter(fecha_pedido__lte=fecha_fin)
 
-        return queryset.select_related(
-            'paciente',
-            'menu',
-            'paciente__cama',
-            'paciente__cama__habitacion',
-            'paciente__cama__habitacion__servicio'
-        )
+        return queryset
 
     def perform_create(self, serializer):
         """
@@ -74,31 +149,40 @@ class PedidoListCreateView(generics.ListCreateAPIView):
         Returns:
             Pedido: Instancia del pedido creado.
         """
-        instance = serializer.save()
-        LogEntry.objects.create(
-            user=self.request.user,
-            action='CREATE',
-            model_name=instance.__class__.__name__,
-            object_id=instance.id,
-            details={
-                'paciente_id': instance.paciente.id,
-                'paciente_nombre': instance.paciente.name,
-                'menu_id': instance.menu.id,
-                'menu_nombre': instance.menu.nombre,
-                'status': instance.status,
-                'fecha_pedido': instance.fecha_pedido.isoformat()
-            }
-        )
+        with transaction.atomic():
+            instance = serializer.save()
+            log_action(
+                user=self.request.user,
+                action='CREATE',
+                model_name=instance.__class__.__name__,
+                object_id=instance.id,
+                details={
+                    'paciente_id': instance.paciente.id,
+                    'paciente_nombre': instance.paciente.name,
+                    'menu_id': instance.menu.id,
+                    'menu_nombre': instance.menu.nombre,
+                    'status': instance.status,
+                    'fecha_pedido': instance.fecha_pedido.isoformat()
+                }
+            )
+            publicar_evento('created', instance)
         return instance
 
-class PedidoDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PedidoDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para ver, actualizar y eliminar pedidos específicos.
     
     Incluye registro de acciones en el log del sistema.
     """
-    queryset = Pedido.objects.all()
+    queryset = Pedido.objects.con_relaciones()
     serializer_class = PedidoSerializer
+    conditional_relations = (
+        'paciente',
+        'paciente__cama',
+        'paciente__cama__habitacion',
+        'paciente__cama__habitacion__servicio',
+        'menu',
+    )
 
     def perform_update(self, serializer):
         """
@@ -107,19 +191,21 @@ class PedidoDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             serializer: Serializer validado con los datos actualizados.
         """
-        instance = serializer.save()
-        log_data = {
-            'status': serializer.validated_data.get('status'),
-            'sectionStatus': serializer.validated_data.get('sectionStatus'),
-        }
-        
-        LogEntry.objects.create(
-            user=self.request.user,
-            action='UPDATE',
-            model_name=instance.__class__.__name__,
-            object_id=instance.id,
-            details=log_data
-        )
+        with transaction.atomic():
+            instance = serializer.save()
+            log_data = {
+                'status': serializer.validated_data.get('status'),
+                'sectionStatus': serializer.validated_data.get('sectionStatus'),
+            }
+            
+            log_action(
+                user=self.request.user,
+                action='UPDATE',
+                model_name=instance.__class__.__name__,
+                object_id=instance.id,
+                details=log_data
+            )
+            publicar_evento('updated', instance)
 
     def perform_destroy(self, instance):
         """
@@ -128,39 +214,99 @@ class PedidoDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             instance: Instancia del pedido a eliminar.
         """
-        LogEntry.objects.create(
-            user=self.request.user,
-            action='DELETE',
-            model_name=instance.__class__.__name__,
-            object_id=instance.id,
-            details={}
-        )
-        instance.delete()
+        with transaction.atomic():
+            log_action(
+                user=self.request.user,
+                action='DELETE',
+                model_name=instance.__class__.__name__,
+                object_id=instance.id,
+                details={}
+            )
+            publicar_evento('deleted', instance)
+            instance.delete()
 
-class PedidoCompletadosView(views.APIView):
+class PedidoCompletadosView(generics.ListAPIView):
     """
-    Vista para consultar pedidos completados.
+    Vista para consultar el historial de pedidos completados.
     
-    Permite filtrar por paciente específico.
+    Siempre trabaja sobre una ventana de fechas (por defecto, el día actual)
+    y pagina por cursor sobre el índice (status, fecha_pedido, id), de modo
+    que el costo de cada página no depende de los años de historial.
+    
+    Filtros disponibles:
+    - fecha_inicio / fecha_fin: Días (YYYY-MM-DD) incluidos en la ventana
+    - servicio / habitacion / menu: IDs de servicio, habitación y menú
+    - paciente: Nombre o cédula del paciente, sin distinguir tildes
+    - paciente_activo: true/false según el estado del paciente
     """
-    def get(self, request):
+    serializer_class = PedidoSerializer
+    pagination_class = PedidoHistorialPagination
+
+    def get_ventana(self):
         """
-        Obtiene la lista de pedidos completados.
+        Obtiene la ventana de fechas solicitada.
         
-        Args:
-            request: Request HTTP con posibles parámetros de filtrado.
-            
         Returns:
-            Response: Lista serializada de pedidos completados.
+            tuple: Inicio (incluido) y fin (excluido) de la ventana.
+            
+        Raises:
+            ValidationError: Si alguna fecha no es válida o el rango está invertido.
+        """
+        hoy = timezone.localdate()
+        dias = []
+        for param in ('fecha_inicio', 'fecha_fin'):
+            valor = self.request.query_params.get(param)
+            try:
+                dia = parse_date(valor) if valor else hoy
+            except ValueError:
+                dia = None
+            if dia is None:
+                raise ValidationError({param: 'Fecha no válida, use el formato YYYY-MM-DD.'})
+            dias.append(dia)
+
+        if dias[0] > dias[1]:
+            raise ValidationError({'fecha_inicio': 'La fecha inicial es posterior a la final.'})
+
+        inicio = timezone.make_aware(datetime.combine(dias[0], datetime.min.time()))
+        fin = timezone.make_aware(datetime.combine(dias[1] + timedelta(days=1), datetime.min.time()))
+        return inicio, fin
+
+    def get_queryset(self):
         """
-        paciente_id = request.query_params.get('paciente', None)
-        pedidos_completados = Pedido.objects.filter(status='completado')
+        Obtiene los pedidos completados de la ventana con los filtros aplicados.
         
-        if paciente_id:
-            pedidos_completados = pedidos_completados.filter(paciente__id=paciente_id)
+        Returns:
+            QuerySet: Pedidos completados filtrados.
+            
+        Raises:
+            ValidationError: Si algún filtro de ID no es un número entero.
+        """
+        params = self.request.query_params
+        inicio, fin = self.get_ventana()
+        queryset = Pedido.objects.con_relaciones().filter(
+            status='completado',
+            fecha_pedido__gte=inicio,
+            fecha_pedido__lt=fin
+        )
 
-        serializer = PedidoSerializer(pedidos_completados, many=True)
-        return Response(serializer.data)
+        filtros = {
+            'servicio': 'paciente__cama__habitacion__servicio_id',
+            'habitacion': 'paciente__cama__habitacion_id',
+            'menu': 'menu_id',
+        }
+        for param, lookup in filtros.items():
+            value = params.get(param)
+            if value:
+                queryset = queryset.filter(**{lookup: parse_entero(param, value)})
+
+        if params.get('paciente_activo') in ('true', 'false'):
+            queryset = queryset.filter(paciente__activo=params['paciente_activo'] == 'true')
+
+        texto = params.get('paciente', '').strip()
+        if texto:
+            queryset = filtrar_pacientes(queryset, texto, ruta='paciente__')
+
+        return queryset
 
 class PedidoStatusUpdateView(generics.UpdateAPIView):
     """
@@ -168,7 +314,7 @@ class PedidoStatusUpdateView(generics.UpdateAPIView):
     
     Permite actualizaciones parciales del estado.
     """
-    queryset = Pedido.objects.all()
+    queryset = Pedido.objects.con_relaciones()
     serializer_class = PedidoSerializer
 
     def partial_update(self, request, *args, **kwargs):
@@ -185,6 +331,614 @@ class PedidoStatusUpdateView(generics.UpdateAPIView):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+
+        # Las relaciones precargadas pueden haber cambiado con la actualización
+        if getattr(instance, '_prefetched_objects_cache', None):
+            instance._prefetched_objects_cache = {}
+
         return Response(serializer.data)
 
+    def perform_update(self, serializer):
+        """
+        Actualiza el estado del pedido y notifica el cambio.
+
+        Args:
+            serializer: Serializer validado con los datos actualizados.
+        """
+        with transaction.atomic():
+            instance = serializer.save()
+            publicar_evento('status', instance)
+
+class PedidoSeccionStatusView(views.APIView):
+    """
+    Vista para cambiar el estado de una sección de un pedido.
+    
+    PATCH: Marca una sección (por ejemplo, almuerzo) como completada o
+    pendiente con una sola sentencia UPDATE condicionada a la versión del
+    pedido, sin reescribir adicionales ni las opciones, y responde solo con
+    el estado resultante. La sección debe ser una de las del menú del
+    pedido. Con If-Match o version responde 409 si el pedido cambió.
+    """
+    def patch(self, request, pk, section):
+        """
+        Actualiza el estado de la sección indicada.
+        
+        Args:
+            request: Request HTTP con status y, opcionalmente, pedido_status
+                y version.
+            pk (int): ID del pedido.
+            section (str): Título de la sección, sin distinguir mayúsculas.
+            
+        Returns:
+            Response: Estado de la sección, del pedido y campos derivados.
+            
+        Raises:
+            NotFound: Si el pedido no existe.
+            ValidationError: Si la sección no pertenece al menú del pedido.
+            PedidoVersionConflict: Si la versión esperada no es la actual.
+        """
+        serializer = PedidoSeccionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            titulos = Pedido.objects.titulos_secciones(pk)
+        except Pedido.DoesNotExist:
+            raise NotFound('Pedido no encontrado.')
+        # Se guarda con el título de la sección, que es la clave que usa el frontend
+        section = {titulo.lower(): titulo for titulo in titulos}.get(section.lower())
+        if section is None:
+            raise ValidationError({'section': 'La sección no pertenece al menú del pedido.'})
+        estado = serializer.validated_data['status']
+        version = version_solicitada(request, serializer.validated_data.get('version'))
+
+        with transaction.atomic():
+            try:
+                pedido = Pedido.objects.actualizar_seccion(
+                    pk, section, estado,
+                    pedido_status=serializer.validated_data.get('pedido_status'),
+                    version=version
+                )
+            except Pedido.DoesNotExist:
+                raise NotFound('Pedido no encontrado.')
+            if pedido is None:
+                raise PedidoVersionConflict(
+                    PedidoSerializer(Pedido.objects.con_relaciones().get(pk=pk)).data
+                )
+
+            log_action(
+                user=request.user,
+                action='UPDATE',
+                model_name='Pedido',
+                object_id=pedido.id,
+                details={'seccion': section, 'status': estado}
+            )
+            publicar_evento('status', pedido)
+
+        return Response({
+            'id': pedido.id,
+            'section': section,
+            'section_status': estado,
+            'status': pedido.status,
+            'sections_completed_count': pedido.sections_completed_count,
+            'is_fully_completed': pedido.fully_completed,
+            'version': pedido.version,
+        })
+
+class PedidoStatsView(views.APIView):
+    """
+    Vista con las estadísticas del tablero de inicio.
+    
+    Calcula en el servidor, mediante agregaciones COUNT, los indicadores
+    que antes se obtenían descargando todos los pedidos y pacientes.
+    Los pedidos pendientes se cuentan con la columna pendiente, el mismo
+    criterio de Pedido.objects.pendientes(). El resultado se guarda en caché durante unos segundos
+    (PEDIDOS_STATS_CACHE_TIMEOUT, 10 por defecto).
+    """
+    def get(self, request):
+        """
+        Obtiene las estadísticas del día.
+        
+        Args:
+            request: Request HTTP.
+            
+        Returns:
+            Response: Pedidos pendientes, pedidos completados hoy y pacientes activos.
+        """
+        hoy = timezone.localdate()
+        cache_key = f'pedidos:stats:{hoy.isoformat()}'
+        stats = cache.get(cache_key)
+
+        if stats is None:
+            inicio = timezone.make_aware(datetime.combine(hoy, datetime.min.time()))
+            fin = inicio + timedelta(days=1)
+            pedidos = Pedido.objects.aggregate(
+                pedidos_pendientes=Count('id', filter=Q(pendiente=True)),
+                completados_hoy=Count('id', filter=Q(
+                    status='completado',
+                    fecha_pedido__gte=inicio,
+                    fecha_pedido__lt=fin
+                )),
+            )
+            stats = {
+                **pedidos,
+                'pacientes_activos': Paciente.objects.filter(activo=True).count(),
+            }
+            cache.set(cache_key, stats, getattr(settings, 'PEDIDOS_STATS_CACHE_TIMEOUT', 10))
+
+        return Response(stats)
+
+class PedidoProduccionView(views.APIView):
+    """
+    Vista con el resumen de producción para cocina.
+    
+    Cuenta las opciones seleccionadas en los pedidos pendientes, agrupadas
+    por opción de menú, sección y servicio, con una única consulta GROUP BY.
+    Como en la impresión de tickets, no cuenta las secciones que el pedido
+    ya tiene completadas en sectionStatus.
+    
+    Filtros disponibles:
+    - fecha_inicio / fecha_fin: Rango sobre la fecha del pedido
+    - seccion: Título de la sección del menú (desayuno, almuerzo, etc.)
+    - servicio: ID del servicio
+    """
+    def get(self, request):
+        """
+        Obtiene las porciones a preparar.
+        
+        Args:
+            request: Request HTTP con posibles parámetros de filtrado.
+            
+        Returns:
+            Response: Lista de opciones con su sección, servicio y cantidad.
+            
+        Raises:
+            ValidationError: Si el servicio o alguna fecha no son válidos.
+        """
+        params = request.query_params
+        servicio = 'pedido__paciente__cama__habitacion__servicio'
+        pedidos = Pedido.objects.pendientes()
+        if params.get('fecha_inicio'):
+            inicio, _ = parse_fecha('fecha_inicio', params['fecha_inicio'])
+            pedidos = pedidos.filter(fecha_pedido__gte=inicio)
+        if params.get('fecha_fin'):
+            fin, es_dia = parse_fecha('fecha_fin', params['fecha_fin'], fin=True)
+            pedidos = pedidos.filter(**{'fecha_pedido__lt' if es_dia else 'fecha_pedido__lte': fin})
+
+        seleccionadas = PedidoMenuOption.objects.filter(selected=True, pedido__in=pedidos)
+        if params.get('seccion'):
+            seleccionadas = seleccionadas.filter(menu_option__section__titulo__iexact=params['seccion'])
+        if params.get('servicio'):
+            seleccionadas = seleccionadas.filter(**{
+                f'{servicio}_id': parse_entero('servicio', params['servicio'])
+            })
+        seleccionadas = self._sin_secciones_completadas(seleccionadas)
+
+        produccion = seleccionadas.values(
+            'menu_option_id',
+            'tipo',
+            'texto',
+            servicio_id=F(f'{servicio}_id'),
+            servicio_nombre=F(f'{servicio}__nombre'),
+            seccion=F('menu_option__section__titulo'),
+        ).annotate(
+            cantidad=Count('id')
+        ).order_by('servicio_nombre', 'seccion', 'tipo', 'texto')
+
+        return Response(list(produccion))
+
+    def _sin_secciones_completadas(self, seleccionadas):
+        """
+        Excluye las selecciones de las secciones ya completadas de cada pedido.
+        
+        El título de la sección se normaliza en SQL con la misma regla que
+        clave_seccion y se busca entre las claves completadas del pedido
+        (secciones_completadas), así que la exclusión es parte de la misma
+        consulta agregada.
+        
+        Args:
+            seleccionadas (QuerySet): Opciones seleccionadas de los pedidos.
+            
+        Returns:
+            QuerySet: Opciones seleccionadas sin las secciones completadas.
+        """
+        clave = Replace(Lower(Trim('menu_option__section__titulo')), Value(' '), Value('_'))
+        return seleccionadas.alias(
+            clave_seccion=Concat(Value('|'), clave, Value('|'))
+        ).exclude(pedido__secciones_completadas__contains=F('clave_seccion'))
+
+class PedidoChangesView(views.APIView):
+    """
+    Vista de sincronización incremental de pedidos.
+    
+    Devuelve los pedidos creados o modificados después del token indicado
+    en ?since= y los IDs de los pedidos eliminados, de modo que el costo de
+    cada actualización depende de lo que cambió y no del total de pedidos.
+    Sin ?since= solo devuelve el token actual, que el cliente debe obtener
+    antes de descargar el listado completo.
+    
+    Como máximo se procesan PEDIDOS_CHANGES_LIMIT cambios (500 por defecto)
+    por petición; has_more indica si quedan cambios pendientes.
+    
+    Los IDs de PedidoChange se asignan al insertar y no al confirmar la
+    transacción, por lo que un cambio con un ID menor puede hacerse visible
+    después de otro mayor. Para no saltarlo, el token nunca avanza más allá
+    de los cambios con menos de PEDIDOS_CHANGES_LAG segundos (10 por
+    defecto): esos cambios se devuelven, pero se repiten en la siguiente
+    consulta hasta quedar fuera de la ventana. Los clientes aplican los
+    cambios por ID de pedido, así que recibirlos dos veces no tiene efecto.
+    """
+    def horizonte(self):
+        """
+        Fecha a partir de la cual los cambios pueden tener huecos sin confirmar.
+        
+        Returns:
+            datetime: Momento actual menos PEDIDOS_CHANGES_LAG segundos.
+        """
+        return timezone.now() - timedelta(seconds=getattr(settings, 'PEDIDOS_CHANGES_LAG', 10))
+
+    def get(self, request):
+        """
+        Obtiene los cambios posteriores al token.
+        
+        Args:
+            request: Request HTTP con el parámetro since.
+            
+        Returns:
+            Response: Pedidos modificados, IDs eliminados, siguiente token
+                y si quedan más cambios.
+        """
+        since = request.query_params.get('since')
+        if since is None:
+            # Se recorre la clave primaria desde el final hasta el primer cambio estable
+            ultimo = PedidoChange.objects.filter(
+                timestamp__lte=self.horizonte()
+            ).order_by('-id').values_list('id', flat=True).first() or 0
+            return Response({'pedidos': [], 'deleted': [], 'next': str(ultimo), 'has_more': False})
+
+        try:
+            since = int(since)
+        except ValueError:
+            return Response(
+                {"detail": "El token de sincronización no es válido."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limit = getattr(settings, 'PEDIDOS_CHANGES_LIMIT', 500)
+        changes = list(
+            PedidoChange.objects.filter(id__gt=since)
+            .order_by('id')
+            .values_list('id', 'pedido_id', 'tipo', 'timestamp')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # El token avanza solo sobre el prefijo de cambios anteriores al horizonte
+        horizonte = self.horizonte()
+        siguiente = since
+        for change_id, _, _, timestamp in changes:
+            if timestamp > horizonte:
+                break
+            siguiente = change_id
+
+        # Solo importa el último cambio de cada pedido dentro del intervalo
+        ultimo_tipo = {}
+        for _, pedido_id, tipo, _ in changes:
+            ultimo_tipo[pedido_id] = tipo
+
+        pedidos = Pedido.objects.con_relaciones().filter(
+            id__in=[pedido_id for pedido_id, tipo in ultimo_tipo.items() if tipo != 'deleted']
+        )
+        data = PedidoSerializer(pedidos, many=True).data
+        encontrados = {pedido['id'] for pedido in data}
+
+        return Response({
+            'pedidos': data,
+            'deleted': [pedido_id for pedido_id in ultimo_tipo if pedido_id not in encontrados],
+            'next': str(siguiente),
+            # Si el token no avanzó, el cliente espera a la siguiente consulta
+            'has_more': has_more and siguiente != since,
+        })
+
+class PedidoImpresionView(views.APIView):
+    """
+    Vista de impresión por lotes de tickets de bandeja.
+    
+    Genera en el servidor un documento HTML con un ticket por cada sección
+    pendiente de los pedidos no completados, listo para la impresora de
+    80 mm. Los pedidos se leen con una única consulta con JOINs (más las
+    precargas por bloque y una consulta por versión de menú) y el documento
+    se envía en streaming a medida que se renderiza cada ticket.
+    
+    Filtros disponibles:
+    - servicio: ID del servicio
+    - seccion: Título de la sección del menú (desayuno, almuerzo, etc.)
+    - pedido: ID de un pedido concreto
+    - fecha_inicio / fecha_fin: Rango sobre la fecha del pedido
+    
+    Para poder abrirse en una ventana nueva del navegador se autentica con
+    un ticket de corta duración en ?ticket= (PedidoTicketView). Los filtros
+    se validan antes de empezar a enviar el documento.
+    """
+    authentication_classes = [TicketAuthentication]
+    ticket_alcance = 'pedidos.print'
+    chunk_size = 200
+
+    def get(self, request):
+        """
+        Genera el documento de impresión.
+        
+        Args:
+            request: Request HTTP con posibles parámetros de filtrado.
+            
+        Returns:
+            StreamingHttpResponse: Documento HTML con los tickets.
+            
+        Raises:
+            ValidationError: Si algún filtro no tiene un valor válido.
+        """
+        params = request.query_params
+        pedidos = Pedido.objects.pendientes().select_related(
+            'menu',
+            'paciente__cama__habitacion__servicio'
+        ).prefetch_related(
+            'paciente__dietas',
+            'paciente__alergias',
+            Prefetch(
+                'pedidomenuoption_set',
+                queryset=PedidoMenuOption.objects.filter(selected=True).select_related(
+                    'menu_option__section'
+                ).order_by('menu_option__section_id', 'menu_option_id'),
+                to_attr='seleccionadas'
+            ),
+        ).order_by(
+            'paciente__cama__habitacion__servicio__nombre',
+            'paciente__cama__habitacion__nombre',
+            'paciente__cama__nombre',
+            'id'
+        )
+        for param, lookup in (('servicio', 'paciente__cama__habitacion__servicio_id'), ('pedido', 'id')):
+            if params.get(param):
+                pedidos = pedidos.filter(**{lookup: parse_entero(param, params[param])})
+        if params.get('fecha_inicio'):
+            inicio, _ = parse_fecha('fecha_inicio', params['fecha_inicio'])
+            pedidos = pedidos.filter(fecha_pedido__gte=inicio)
+        if params.get('fecha_fin'):
+            fin, es_dia = parse_fecha('fecha_fin', params['fecha_fin'], fin=True)
+            pedidos = pedidos.filter(**{'fecha_pedido__lt' if es_dia else 'fecha_pedido__lte': fin})
+
+        return StreamingHttpResponse(
+            self._render(pedidos, params.get('seccion')),
+            content_type='text/html; charset=utf-8'
+        )
+
+    def _titulos_opciones(self, pedido, versiones):
+        """
+        Obtiene el título de sección de cada opción del menú de un pedido.
+        
+        Se toma de la versión publicada del menú que referencia el pedido,
+        de modo que las opciones eliminadas después se siguen imprimiendo en
+        su sección. Cada versión se lee una vez por documento.
+        
+        Args:
+            pedido (Pedido): Pedido a imprimir.
+            versiones (dict): Títulos ya calculados por ID de versión.
+            
+        Returns:
+            dict: Título de sección por ID de opción (vacío si el pedido no
+                tiene versión).
+        """
+        if pedido.menu_version_id is None:
+            return {}
+        if pedido.menu_version_id not in versiones:
+            snapshot = MenuVersion.objects.values_list('snapshot', flat=True).get(pk=pedido.menu_version_id)
+            versiones[pedido.menu_version_id] = {
+                opcion['id']: section['titulo']
+                for section in snapshot.get('sections', [])
+                for opciones in section.get('opciones', {}).values()
+                for opcion in opciones
+            }
+        return versiones[pedido.menu_version_id]
+
+    def _secciones(self, pedido, titulos, seccion=None):
+        """
+        Agrupa las opciones seleccionadas del pedido por sección.
+        
+        Las opciones se imprimen con el texto y el tipo guardados en el
+        pedido, y su sección se toma de la versión del menú del pedido o, en
+        los pedidos sin versión, de la opción actual. Omite las secciones ya
+        completadas y, si se indica, las que no corresponden a la sección
+        solicitada.
+        
+        Args:
+            pedido (Pedido): Pedido con sus opciones seleccionadas precargadas.
+            titulos (dict): Título de sección por ID de opción.
+            seccion (str, opcional): Título de la sección a imprimir.
+            
+        Returns:
+            dict: Opciones seleccionadas (texto y tipo) por título de sección.
+        """
+        completadas = {
+            clave_seccion(titulo)
+            for titulo, estado in pedido.sectionStatus.items()
+            if estado == 'completado'
+        }
+        secciones = {}
+        for seleccion in pedido.seleccionadas:
+            titulo = titulos.get(seleccion.menu_option_id)
+            if titulo is None and seleccion.menu_option is not None:
+                titulo = seleccion.menu_option.section.titulo
+            if titulo is None:
+                continue
+            if seccion and titulo.lower() != seccion.lower():
+                continue
+            if clave_seccion(titulo) in completadas:
+                continue
+            secciones.setdefault(titulo, []).append({
+                'texto': seleccion.texto,
+                'tipo': TIPOS_OPCION.get(seleccion.tipo, seleccion.tipo),
+            })
+        return secciones
+
+    def _render(self, pedidos, seccion=None):
+        """
+        Generador con los fragmentos HTML del documento.
+        
+        Las plantillas se compilan una sola vez por documento (y el cargador
+        en caché de Django las reutiliza entre peticiones).
+        
+        Args:
+            pedidos (QuerySet): Pedidos a imprimir.
+            seccion (str, opcional): Título de la sección a imprimir.
+            
+        Yields:
+            str: Encabezado, un ticket por sección de cada pedido y pie.
+        """
+        encabezado = get_template('pedidos/impresion/encabezado.html')
+        ticket = get_template('pedidos/impresion/ticket.html')
+        pie = get_template('pedidos/impresion/pie.html')
+        generado = timezone.localtime()
+        total = 0
+        versiones = {}
 
+        yield encabezado.render({'generado': generado})
+        for pedido in pedidos.iterator(chunk_size=self.chunk_size):
+            paciente = pedido.paciente
+            dietas = ', '.join(dieta.nombre for dieta in paciente.dietas.all())
+            alergias = ', '.join(alergia.nombre for alergia in paciente.alergias.all())
+            titulos = self._titulos_opciones(pedido, versiones)
+            for titulo, opciones in self._secciones(pedido, titulos, seccion).items():
+                total += 1
+                yield ticket.render({
+                    'pedido': pedido,
+                    'paciente': paciente,
+                    'habitacion': paciente.cama.habitacion,
+                    'dietas': dietas,
+                    'alergias': alergias,
+                    'seccion': titulo.replace('_', ' '),
+                    'opciones': opciones,
+                    'generado': generado,
+                })
+        yield pie.render({'total': total})
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Renderer que permite negociar el tipo text/event-stream.
+    
+    La respuesta del flujo se construye directamente, por lo que este
+    renderer solo existe para aceptar la cabecera Accept de EventSource.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+class PedidoTicketView(views.APIView):
+    """
+    Vista que emite el ticket para abrir una vista autenticada en la URL.
+    
+    POST: Con el token de acceso en la cabecera, devuelve un ticket de
+    AUTH_TICKET_TTL segundos que solo sirve para la vista indicada en el
+    atributo vista (el flujo de eventos o la impresión de tickets). Así el
+    token de acceso no viaja en la URL del EventSource ni de la ventana de
+    impresión.
+    
+    Atributos:
+        vista (APIView): Vista con TicketAuthentication y ticket_alcance.
+    """
+    vista = None
+
+    def post(self, request):
+        """
+        Emite un ticket para el usuario autenticado.
+        
+        Args:
+            request: Request HTTP autenticado.
+            
+        Returns:
+            Response: Ticket y segundos de validez.
+        """
+        return Response({
+            'ticket': crear_ticket(request.user, self.vista.ticket_alcance),
+            'expires_in': getattr(settings, 'AUTH_TICKET_TTL', 60),
+        })
+
+class PedidoEventStreamView(views.APIView):
+    """
+    Vista con el flujo de eventos de pedidos mediante Server-Sent Events.
+    
+    Emite un evento por cada pedido creado, actualizado, con cambio de
+    estado o eliminado, y un comentario periódico para mantener viva la
+    conexión. Como EventSource no permite enviar cabeceras, se autentica
+    con un ticket de corta duración en ?ticket= (PedidoTicketView).
+    
+    Cada conexión ocupa un hilo del servidor mientras está abierta: en WSGI
+    debe desplegarse con workers con hilos (por ejemplo, gunicorn con
+    worker gthread) dimensionados para el número de pantallas, o bajo ASGI.
+    Para no retener el hilo indefinidamente, la conexión se cierra tras
+    PEDIDOS_EVENTS_MAX_DURATION segundos (300 por defecto) y el cliente
+    vuelve a conectarse. Cada evento lleva como id su número de secuencia;
+    si al reconectar Last-Event-ID indica que se perdieron cambios, se
+    emite un evento resync para que el cliente sincronice.
+    """
+    authentication_classes = [TicketAuthentication]
+    renderer_classes = [EventStreamRenderer]
+    ticket_alcance = 'pedidos.events'
+    keepalive_interval = 15
+
+    def get(self, request):
+        """
+        Abre el flujo de eventos para el cliente.
+        
+        Args:
+            request: Request HTTP autenticado.
+            
+        Returns:
+            StreamingHttpResponse: Flujo text/event-stream.
+        """
+        response = StreamingHttpResponse(
+            self._stream(get_broker().subscribe(), self._cambios_perdidos(request)),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _cambios_perdidos(self, request):
+        """
+        Indica si hubo cambios después del último evento recibido por el cliente.
+        
+        Args:
+            request: Request HTTP con la cabecera Last-Event-ID al reconectar.
+            
+        Returns:
+            bool: True si hay cambios con un número de secuencia mayor.
+        """
+        ultimo = request.META.get('HTTP_LAST_EVENT_ID', '')
+        if not ultimo.isdigit():
+            return False
+        return PedidoChange.objects.filter(id__gt=int(ultimo)).exists()
+
+    def _stream(self, subscription, resync=False):
+        """
+        Generador con los mensajes del flujo.
+        
+        Args:
+            subscription (Subscription): Suscripción a los eventos de pedidos.
+            resync (bool): Si se debe pedir al cliente que sincronice.
+            
+        Yields:
+            str: Mensajes en formato Server-Sent Events.
+        """
+        fin = time.monotonic() + getattr(settings, 'PEDIDOS_EVENTS_MAX_DURATION', 300)
+        try:
+            yield 'retry: 5000\n\n'
+            if resync:
+                yield f'data: {json.dumps({"tipo": "resync"})}\n\n'
+            while (restante := fin - time.monotonic()) > 0:
+                event = subscription.get(timeout=min(self.keepalive_interval, restante))
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield f'id: {event["seq"]}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            subscription.close()
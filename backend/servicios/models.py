@@ -8,7 +8,7 @@ incluyendo la lógica de cascada para la desactivación de elementos relacionado
 - Pacientes asignados a esas camas
 """
 
-from django.db import models
+from django.db import models, transaction
 
 class Servicio(models.Model):
     """
@@ -20,9 +20,11 @@ class Servicio(models.Model):
     Atributos:
         nombre (str): Nombre identificativo del servicio.
         activo (bool): Estado del servicio (activo/inactivo).
+        updated_at (DateTime): Fecha y hora de la última modificación.
     """
     nombre = models.CharField(max_length=255)
     activo = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         """Representación en string del servicio."""
@@ -33,24 +35,21 @@ class Servicio(models.Model):
         Sobrescribe el método save para implementar la lógica de cascada.
         
         Cuando un servicio se desactiva, automáticamente desactiva todas
-        las habitaciones asociadas, sus camas y los pacientes asignados.
+        las habitaciones asociadas, sus camas y los pacientes asignados
+        mediante el servicio de cascada.
+        
+        Los conteos de la cascada quedan en self.cascada, sin registrarlos,
+        para que la vista los incluya en su registro de actividad.
         
         Args:
             *args: Argumentos posicionales para el método save.
             **kwargs: Argumentos de palabra clave para el método save.
         """
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-
-        if not is_new and not self.activo:
-            from habitaciones.models import Habitacion
-            from camas.models import Cama
-            from pacientes.models import Paciente
+        from .services import desactivar_en_cascada
 
-            habitaciones = self.habitacion_set.all()
-            habitaciones.update(activo=False)
-
-            camas = Cama.objects.filter(habitacion__in=habitaciones)
-            camas.update(activo=False)
-
-            Paciente.objects.filter(cama__in=camas).update(activo=False)
+        is_new = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.cascada = {}
+            if not is_new and not self.activo:
+                self.cascada = desactivar_en_cascada('servicio', [self.pk], registrar=False)
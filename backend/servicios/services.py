@@ -0,0 +1,165 @@
+"""
+Servicio de activación y desactivación en cascada de la estructura hospitalaria.
+
+Centraliza las reglas que relacionan los estados activo/inactivo de:
+- Servicios
+- Habitaciones de cada servicio
+- Camas de cada habitación
+- Pacientes asignados a esas camas
+
+La desactivación se aplica con una única sentencia UPDATE por nivel,
+filtrada mediante subconsultas, dentro de una transacción, y deja un solo
+registro en el log de actividades: el de la vista que guarda el elemento,
+con el resumen de detalles_cascada, o el de desactivar_en_cascada cuando
+se llama directamente. La validación de activación consulta
+en una sola consulta con JOINs el estado de todos los niveles superiores.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from logs.services import log_action
+
+
+def _niveles():
+    """
+    Define los niveles de la jerarquía, de mayor a menor.
+
+    Returns:
+        list: Tuplas (nombre, modelo, campo de la relación con el nivel superior).
+    """
+    from .models import Servicio
+    from habitaciones.models import Habitacion
+    from camas.models import Cama
+    from pacientes.models import Paciente
+
+    return [
+        ('servicio', Servicio, None),
+        ('habitacion', Habitacion, 'servicio'),
+        ('cama', Cama, 'habitacion'),
+        ('paciente', Paciente, 'cama'),
+    ]
+
+
+def _requisitos_activacion():
+    """
+    Define los niveles superiores que deben estar activos para activar cada nivel.
+
+    Returns:
+        dict: Por nivel, el modelo del padre directo y la lista de
+            (campo del estado, mensaje de error) que se valida sobre él.
+    """
+    from .models import Servicio
+    from habitaciones.models import Habitacion
+    from camas.models import Cama
+
+    return {
+        'habitacion': (Servicio, [
+            ('activo', 'No se puede activar una habitación si el servicio no está activo.'),
+        ]),
+        'cama': (Habitacion, [
+            ('activo', 'No se puede activar una cama si la habitación no está activa.'),
+        ]),
+        'paciente': (Cama, [
+            ('activo', 'No se puede activar un paciente porque la cama no está activa.'),
+            ('habitacion__activo', 'No se puede activar un paciente porque la habitación no está activa.'),
+            ('habitacion__servicio__activo', 'No se puede activar un paciente porque el servicio no está activo.'),
+        ]),
+    }
+
+
+def desactivar_en_cascada(nivel, ids, user=None, registrar=True):
+    """
+    Desactiva los elementos indicados y todos los que dependen de ellos.
+
+    Cada nivel inferior se desactiva con un único UPDATE cuyo filtro se
+    resuelve como subconsulta sobre el nivel indicado. Solo se modifican
+    los elementos que seguían activos, por lo que los conteos reflejan los
+    cambios reales.
+
+    Args:
+        nivel (str): Nivel de los elementos raíz (servicio, habitacion o cama).
+        ids (Iterable[int]): IDs de los elementos raíz.
+        user (User, opcional): Usuario que origina la desactivación.
+        registrar (bool): Si es False no escribe el registro de actividad,
+            para que quien llama lo incluya en el suyo.
+
+    Returns:
+        dict: Número de elementos desactivados por nivel.
+
+    Raises:
+        ValueError: Si el nivel no existe.
+    """
+    niveles = _niveles()
+    nombres = [nombre for nombre, _, _ in niveles]
+    if nivel not in nombres:
+        raise ValueError(f'Nivel de cascada desconocido: {nivel}')
+
+    ids = list(ids)
+    inicio = nombres.index(nivel)
+    ahora = timezone.now()
+    ruta = []
+    conteos = {}
+
+    with transaction.atomic():
+        for nombre, modelo, padre in niveles[inicio:]:
+            # Ruta de relaciones desde este nivel hasta el nivel raíz
+            if nombre != nivel:
+                ruta.insert(0, padre)
+            lookup = '__'.join(ruta + ['in']) if ruta else 'pk__in'
+            conteos[nombre] = modelo.objects.filter(
+                **{lookup: ids}, activo=True
+            ).update(activo=False, updated_at=ahora)
+
+        if registrar and any(conteos.values()):
+            log_action(
+                user=user,
+                action='UPDATE',
+                model_name=niveles[inicio][1].__name__,
+                object_id=ids[0] if len(ids) == 1 else None,
+                details={'cascada': 'desactivacion', 'ids': ids, 'desactivados': conteos}
+            )
+
+    return conteos
+
+
+def detalles_cascada(instancia):
+    """
+    Obtiene los detalles de la cascada que produjo el último save().
+
+    Args:
+        instancia: Servicio, habitación, cama o paciente recién guardado.
+
+    Returns:
+        dict: Resumen de la desactivación para el registro de actividad,
+            vacío si el guardado no desactivó nada.
+    """
+    conteos = getattr(instancia, 'cascada', None)
+    if not conteos or not any(conteos.values()):
+        return {}
+    return {'cascada': 'desactivacion', 'desactivados': conteos}
+
+
+def validar_activacion(nivel, padre_id):
+    """
+    Verifica que los niveles superiores permitan activar un elemento.
+
+    Consulta en una sola sentencia, con JOINs, el estado del padre directo
+    y de sus ancestros.
+
+    Args:
+        nivel (str): Nivel del elemento que se activa (habitacion, cama o paciente).
+        padre_id (int): ID del padre directo (servicio, habitación o cama).
+
+    Raises:
+        ValidationError: Si algún nivel superior está inactivo.
+    """
+    modelo, requisitos = _requisitos_activacion()[nivel]
+    estados = modelo.objects.filter(pk=padre_id).values_list(
+        *[campo for campo, _ in requisitos]
+    ).first()
+    if estados is None:
+        return
+    for (_, mensaje), activo in zip(requisitos, estados):
+        if not activo:
+            raise ValidationError(mensaje)
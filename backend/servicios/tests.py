@@ -0,0 +1,90 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from authentication.models import CustomUser
+from servicios.models import Servicio
+from servicios.services import desactivar_en_cascada, validar_activacion
+from habitaciones.models import Habitacion
+from camas.models import Cama
+from pacientes.models import Paciente
+from logs.models import LogEntry
+
+@pytest.fixture
+def estructura(db, settings):
+    settings.AUDIT_LOG_ASYNC = False
+    servicio = Servicio.objects.create(nombre='Cirugía')
+    otro = Servicio.objects.create(nombre='Pediatría')
+    camas = []
+    for numero in range(3):
+        habitacion = Habitacion.objects.create(nombre=f'2{numero}', servicio=servicio)
+        for letra in 'AB':
+            cama = Cama.objects.create(nombre=letra, habitacion=habitacion)
+            Paciente.objects.create(cedula=f'{numero}{letra}', name=f'Paciente {numero}{letra}', cama=cama)
+            camas.append(cama)
+    habitacion_otro = Habitacion.objects.create(nombre='30', servicio=otro)
+    Paciente.objects.create(
+        cedula='99', name='Otro',
+        cama=Cama.objects.create(nombre='A', habitacion=habitacion_otro)
+    )
+    return servicio, otro, camas
+
+class TestCascada:
+    @pytest.mark.django_db
+    def test_deactivates_every_level_with_one_update_each(self, estructura):
+        servicio, otro, _ = estructura
+        with CaptureQueriesContext(connection) as context:
+            conteos = desactivar_en_cascada('servicio', [servicio.id])
+        assert conteos == {'servicio': 1, 'habitacion': 3, 'cama': 6, 'paciente': 6}
+        assert len([q for q in context.captured_queries if q['sql'].startswith('UPDATE')]) == 4
+        assert not Paciente.objects.filter(cama__habitacion__servicio=servicio, activo=True).exists()
+        assert Paciente.objects.filter(cama__habitacion__servicio=otro, activo=True).count() == 1
+        assert LogEntry.objects.filter(model_name='Servicio', object_id=servicio.id).count() == 1
+
+    @pytest.mark.django_db
+    def test_save_of_inactive_service_cascades(self, estructura):
+        servicio, _, _ = estructura
+        servicio.activo = False
+        servicio.save()
+        assert not Cama.objects.filter(habitacion__servicio=servicio, activo=True).exists()
+        assert not Paciente.objects.filter(cama__habitacion__servicio=servicio, activo=True).exists()
+
+    @pytest.mark.django_db
+    def test_discharged_patient_deactivates_bed(self, estructura):
+        _, _, camas = estructura
+        paciente = Paciente.objects.get(cama=camas[0])
+        paciente.activo = False
+        paciente.save()
+        camas[0].refresh_from_db()
+        assert camas[0].activo is False
+
+    @pytest.mark.django_db
+    def test_activation_is_validated_in_one_query(self, estructura):
+        servicio, _, camas = estructura
+        Habitacion.objects.filter(servicio=servicio).update(activo=False)
+        with CaptureQueriesContext(connection) as context:
+            with pytest.raises(ValidationError, match='habitación no está activa'):
+                validar_activacion('paciente', camas[0].id)
+        assert len(context.captured_queries) == 1
+
+        cama = Cama(nombre='C', habitacion_id=camas[0].habitacion_id)
+        with pytest.raises(ValidationError):
+            cama.save()
+
+    @pytest.mark.django_db
+    def test_update_writes_one_log_with_user_and_cascade(self, estructura):
+        servicio, _, _ = estructura
+        user = CustomUser.objects.create_user(
+            username='admin', password='pass', email='admin@example.com', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        LogEntry.objects.all().delete()
+
+        response = client.patch(reverse('servicio-detail', args=[servicio.id]), {'activo': False}, format='json')
+        assert response.status_code == 200
+        log = LogEntry.objects.get()
+        assert (log.user, log.model_name, log.object_id) == (user, 'Servicio', servicio.id)
+        assert log.details['desactivados'] == {'servicio': 0, 'habitacion': 3, 'cama': 6, 'paciente': 6}
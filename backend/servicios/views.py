@@ -4,15 +4,17 @@ Vistas para la gestión de servicios hospitalarios.
 Define las vistas basadas en clase para:
 - Listar y crear servicios
 - Recuperar, actualizar y eliminar servicios específicos
-Incluye registro de actividades mediante LogEntry.
+Incluye registro de actividades mediante log_action.
 """
 
 from rest_framework import generics
 from .models import Servicio
 from .serializers import ServicioSerializer
-from logs.models import LogEntry  
+from .services import detalles_cascada
+from logs.services import log_action
+from backend.conditional import ConditionalGetMixin
 
-class ServicioListCreateView(generics.ListCreateAPIView):
+class ServicioListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     Vista para listar todos los servicios y crear nuevos.
     
@@ -33,7 +35,7 @@ class ServicioListCreateView(generics.ListCreateAPIView):
             serializer: Serializador con los datos validados del servicio.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='CREATE',
             model_name=instance.__class__.__name__,
@@ -41,7 +43,7 @@ class ServicioListCreateView(generics.ListCreateAPIView):
             details=serializer.validated_data
         )
 
-class ServicioDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ServicioDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para gestionar un servicio específico.
     
@@ -60,12 +62,12 @@ class ServicioDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer: Serializador con los datos validados del servicio.
         """
         instance = serializer.save()
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='UPDATE',
             model_name=instance.__class__.__name__,
             object_id=instance.id,
-            details=serializer.validated_data
+            details={**serializer.validated_data, **detalles_cascada(instance)}
         )
 
     def perform_destroy(self, instance):
@@ -75,7 +77,7 @@ class ServicioDetailView(generics.RetrieveUpdateDestroyAPIView):
         Args:
             instance: Instancia del servicio a eliminar.
         """
-        LogEntry.objects.create(
+        log_action(
             user=self.request.user,
             action='DELETE',
             model_name=instance.__class__.__name__,
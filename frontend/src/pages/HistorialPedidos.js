@@ -1,11 +1,12 @@
 /**
  * Página de Historial de Pedidos
  * 
- * Muestra un listado completo de los pedidos completados con:
- * - Filtros avanzados de búsqueda (texto, servicio, fecha, estado del paciente)
+ * Muestra un listado de los pedidos completados con:
+ * - Filtros avanzados de búsqueda (texto, servicio, fecha, estado del paciente),
+ *   aplicados en el servidor sobre una ventana de fechas (por defecto, hoy)
  * - Detalles de cada pedido organizados por secciones
  * - Estado de los pacientes (activo/dado de alta)
- * - Paginación de resultados
+ * - Paginación por cursor de resultados
  * 
  * Estructura del componente:
  * - Barra de filtros superior
@@ -28,11 +29,12 @@ import {
   Input,
   Select,
   DatePicker,
-  Pagination,
 } from "antd";
 import {
   ReloadOutlined,
   EyeOutlined,
+  LeftOutlined,
+  RightOutlined,
 } from "@ant-design/icons";
 import { getPedidosCompletados } from "../services/api";
 import "../styles/HistorialPedidos.scss";
@@ -53,12 +55,13 @@ const HistorialPedidos = () => {
   const [dateRange, setDateRange] = useState(null);
   const [pacienteStatus, setPacienteStatus] = useState("all");
   
-  // Estados para UI y paginación
+  // Estados para UI y paginación por cursor
   const [servicios, setServicios] = useState([]);
-  const [filteredPedidos, setFilteredPedidos] = useState([]);
   const [activeKey, setActiveKey] = useState([]);
   const [selectedSection, setSelectedSection] = useState(null);
-  const [currentPage, setCurrentPage] = useState(1);
+  const [cursor, setCursor] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [prevCursor, setPrevCursor] = useState(null);
   const pageSize = 10;
 
   /**
@@ -106,18 +109,43 @@ const HistorialPedidos = () => {
   };
 
   /**
-   * Carga los datos iniciales y actualiza el estado
+   * Extrae el cursor de una URL de paginación
+   * @param {string|null} url - URL de la página siguiente o anterior
+   * @returns {string|null} Cursor de la página
+   */
+  const extractCursor = (url) =>
+    url ? new URL(url).searchParams.get("cursor") : null;
+
+  /**
+   * Construye los parámetros de consulta a partir de los filtros activos
+   * @returns {Object} Parámetros para el endpoint de pedidos completados
+   */
+  const buildParams = () => {
+    const params = { page_size: pageSize };
+    if (cursor) params.cursor = cursor;
+    if (searchTerm.trim()) params.paciente = searchTerm.trim();
+    if (selectedServicio) params.servicio = selectedServicio;
+    if (dateRange) {
+      params.fecha_inicio = dateRange[0].format("YYYY-MM-DD");
+      params.fecha_fin = dateRange[1].format("YYYY-MM-DD");
+    }
+    if (pacienteStatus !== "all") {
+      params.paciente_activo = pacienteStatus === "active" ? "true" : "false";
+    }
+    return params;
+  };
+
+  /**
+   * Carga la página actual de pedidos con los filtros aplicados
    * @param {boolean} showMessage - Indica si se debe mostrar mensaje de éxito
    */
   const fetchData = async (showMessage = false) => {
     try {
       setRefreshing(true);
-      const [pedidosResponse, serviciosResponse] = await Promise.all([
-        getPedidosCompletados(),
-        api.get("/servicios/"),
-      ]);
-      setPedidos(pedidosResponse);
-      setServicios(serviciosResponse.data);
+      const response = await getPedidosCompletados(buildParams());
+      setPedidos(response.results);
+      setNextCursor(extractCursor(response.next));
+      setPrevCursor(extractCursor(response.previous));
       if (showMessage) {
         message.success("Datos actualizados correctamente");
       }
@@ -193,55 +221,23 @@ const HistorialPedidos = () => {
 
   // Efectos
   useEffect(() => {
-    fetchData(false);
+    api
+      .get("/servicios/")
+      .then((response) => setServicios(response.data))
+      .catch(() => message.error("Error al cargar los servicios"));
   }, []);
 
   useEffect(() => {
-    // Efecto para filtrar pedidos según criterios
-    const filtered = pedidos
-      .filter((pedido) => {
-        const matchesSearch =
-          searchTerm === "" ||
-          [
-            pedido.paciente.name,
-            pedido.paciente.cedula,
-            pedido.paciente.cama?.habitacion?.servicio?.nombre,
-            pedido.paciente.cama?.habitacion?.nombre,
-            pedido.paciente.cama?.nombre,
-          ].some(
-            (field) =>
-              field && field.toLowerCase().includes(searchTerm.toLowerCase())
-          );
+    // Reinicia la paginación cuando cambian los filtros
+    setCursor(null);
+  }, [searchTerm, selectedServicio, dateRange, pacienteStatus]);
 
-        const matchesServicio =
-          !selectedServicio ||
-          pedido.paciente.cama?.habitacion?.servicio?.id === selectedServicio;
-
-        const matchesDate =
-          !dateRange ||
-          (new Date(pedido.fecha_pedido) >= dateRange[0].startOf("day") &&
-            new Date(pedido.fecha_pedido) <= dateRange[1].endOf("day"));
-
-        const matchesStatus =
-          pacienteStatus === "all" ||
-          (pacienteStatus === "active" && pedido.paciente.activo) ||
-          (pacienteStatus === "inactive" && !pedido.paciente.activo);
-
-        return matchesSearch && matchesServicio && matchesDate && matchesStatus;
-      })
-      .sort((a, b) => new Date(b.fecha_pedido) - new Date(a.fecha_pedido));
-
-    setFilteredPedidos(filtered);
-  }, [pedidos, searchTerm, selectedServicio, dateRange, pacienteStatus]);
-
-  /**
-   * Calcula los pedidos a mostrar en la página actual
-   * @type {Array} Lista de pedidos paginados
-   */
-  const paginatedPedidos = filteredPedidos.slice(
-    (currentPage - 1) * pageSize,
-    currentPage * pageSize
-  );
+  useEffect(() => {
+    // Espera a que el usuario deje de escribir antes de consultar
+    const timeout = setTimeout(() => fetchData(false), 300);
+    return () => clearTimeout(timeout);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [cursor, searchTerm, selectedServicio, dateRange, pacienteStatus]);
 
   // Renderizado condicional para estado de carga
   if (loading) {
@@ -267,7 +263,7 @@ const HistorialPedidos = () => {
    *      - Cabecera con información básica
    *      - Detalles del pedido por secciones
    *      - Observaciones adicionales
-   * 4. Paginación
+   * 4. Paginación por cursor (anteriores/siguientes)
    */
   return (
     <div className="historial-pedidos">
@@ -327,7 +323,7 @@ const HistorialPedidos = () => {
       </div>
 
       {/* Contenido principal: Lista de pedidos o mensaje de no resultados */}
-      {filteredPedidos.length === 0 ? (
+      {pedidos.length === 0 ? (
         <div className="no-pedidos">
           No hay pedidos completados que coincidan con los filtros
         </div>
@@ -335,7 +331,7 @@ const HistorialPedidos = () => {
         <>
           {/* Lista colapsable de pedidos */}
           <Collapse activeKey={activeKey} onChange={setActiveKey}>
-            {paginatedPedidos.map((pedido) => (
+            {pedidos.map((pedido) => (
               <Panel
                 key={pedido.id}
                 header={
@@ -378,7 +374,7 @@ const HistorialPedidos = () => {
                 {/* Contenido del panel: Detalles del pedido */}
                 <Card className="pedido-card">
                   {/* Secciones del menú con opciones seleccionadas */}
-                  {pedido.menu.sections.map((section) => (
+                  {(pedido.menu?.sections || []).map((section) => (
                     <div key={section.id} className="section">
                       <div className="section-header">
                         <h4>{formatTitle(section.titulo)}</h4>
@@ -415,15 +411,21 @@ const HistorialPedidos = () => {
             ))}
           </Collapse>
           
-          {/* Control de paginación */}
+          {/* Control de paginación por cursor */}
           <div className="pagination-container">
-            <Pagination
-              current={currentPage}
-              total={filteredPedidos.length}
-              pageSize={pageSize}
-              onChange={setCurrentPage}
-              showSizeChanger={false}
-            />
+            <Button
+              icon={<LeftOutlined />}
+              disabled={!prevCursor}
+              onClick={() => setCursor(prevCursor)}
+            >
+              Anteriores
+            </Button>
+            <Button
+              disabled={!nextCursor}
+              onClick={() => setCursor(nextCursor)}
+            >
+              Siguientes <RightOutlined />
+            </Button>
           </div>
         </>
       )}
@@ -45,39 +45,16 @@ const Home = () => {
    * - Cuenta pedidos pendientes
    * - Cuenta pedidos completados hoy
    * - Cuenta pacientes activos
+   * Los conteos se calculan en el servidor
    */
   const fetchStats = async () => {
     try {
-      const [pedidosResponse, pacientesResponse] = await Promise.all([
-        api.get("/pedidos/"),
-        api.get("/pacientes/"),
-      ]);
-
-      const today = new Date();
-      today.setHours(0, 0, 0, 0);
-
-      // Cálculo de estadísticas
-      const pendientes = pedidosResponse.data.filter(
-        (pedido) => pedido.status !== "completado"
-      ).length;
-
-      const completadosHoy = pedidosResponse.data.filter((pedido) => {
-        const pedidoDate = new Date(pedido.fecha_pedido);
-        pedidoDate.setHours(0, 0, 0, 0);
-        return (
-          pedido.status === "completado" &&
-          pedidoDate.getTime() === today.getTime()
-        );
-      }).length;
-
-      const pacientesActivos = pacientesResponse.data.filter(
-        (paciente) => paciente.activo
-      ).length;
+      const response = await api.get("/pedidos/stats/");
 
       setStats({
-        pedidosPendientes: pendientes,
-        completadosHoy,
-        pacientesActivos,
+        pedidosPendientes: response.data.pedidos_pendientes,
+        completadosHoy: response.data.completados_hoy,
+        pacientesActivos: response.data.pacientes_activos,
       });
     } catch (error) {
       console.error("Error fetching stats:", error);
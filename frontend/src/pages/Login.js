@@ -99,6 +99,8 @@ const Login = () => {
       // Manejo de errores específicos
       if (error.response?.status === 400) {
         setError("Credenciales incorrectas. Por favor, verifique e intente nuevamente.");
+      } else if (error.response?.status === 429) {
+        setError("Demasiados intentos fallidos. Por favor, espere unos minutos e intente nuevamente.");
       } else if (error.response?.status === 500) {
         setError("Error del servidor. Por favor, inténtelo más tarde.");
       } else {
@@ -30,6 +30,7 @@ import {
   Row,
   Col,
   Card,
+  Select,
 } from "antd";
 import {
   PlusOutlined, // Icono para agregar
@@ -45,6 +46,8 @@ import {
   getMenus, // Obtener lista de menús
   deleteMenu, // Eliminar menú
   updateMenu, // Actualizar menú existente
+  getAlergias, // Catálogo de alergias
+  getDietas, // Catálogo de dietas
 } from "../services/api";
 import "../styles/MenuPage.scss";
 
@@ -73,6 +76,10 @@ function MenuPage() {
    * Estados para gestión de opciones
    */
   const [newOptionText, setNewOptionText] = useState("");
+  const [newOptionAlergenos, setNewOptionAlergenos] = useState([]);
+  const [newOptionDietas, setNewOptionDietas] = useState([]);
+  const [alergias, setAlergias] = useState([]);
+  const [dietas, setDietas] = useState([]);
   const [currentOptionType, setCurrentOptionType] = useState({});
 
   /**
@@ -235,6 +242,8 @@ function MenuPage() {
   const openOptionModal = (section, type) => {
     setCurrentOptionType({ section, type });
     setNewOptionText("");
+    setNewOptionAlergenos([]);
+    setNewOptionDietas([]);
     setIsOptionModalOpen(true);
   };
 
@@ -256,6 +265,8 @@ function MenuPage() {
       newOptions[currentOptionType.section][currentOptionType.type].push({
         texto: newOptionText,
         tipo: currentOptionType.type,
+        alergenos: newOptionAlergenos,
+        dietas_excluidas: newOptionDietas,
       });
       return newOptions;
     });
@@ -294,10 +305,20 @@ function MenuPage() {
       return;
     }
 
+    // Conserva los IDs de secciones y opciones existentes para que el
+    // servidor actualice solo lo que cambió
+    const sectionIds = (currentMenu?.sections || []).reduce((acc, section) => {
+      acc[section.titulo.toLowerCase().replace(" ", "_")] = section.id;
+      return acc;
+    }, {});
+
     const sections = Object.keys(options).map((key) => ({
+      ...(sectionIds[key] ? { id: sectionIds[key] } : {}),
       titulo: key.charAt(0).toUpperCase() + key.slice(1),
       opciones: Object.keys(options[key]).reduce((acc, tipo) => {
-        acc[tipo] = options[key][tipo].map(({ id, ...rest }) => rest);
+        acc[tipo] = options[key][tipo].map(({ id, ...rest }) =>
+          currentMenu && id ? { id, ...rest } : rest
+        );
         return acc;
       }, {}),
     }));
@@ -418,6 +439,16 @@ function MenuPage() {
 
   useEffect(() => {
     fetchMenus();
+    // Catálogos para etiquetar las opciones con alérgenos y dietas incompatibles
+    Promise.all([getAlergias(), getDietas()])
+      .then(([alergiasResponse, dietasResponse]) => {
+        setAlergias(alergiasResponse || []);
+        setDietas(dietasResponse || []);
+      })
+      .catch(() => {
+        setAlergias([]);
+        setDietas([]);
+      });
   }, []);
 
   /**
@@ -566,6 +597,34 @@ function MenuPage() {
               onChange={(e) => setNewOptionText(e.target.value)}
             />
           </Form.Item>
+          <Form.Item label="Alérgenos">
+            <Select
+              mode="multiple"
+              allowClear
+              value={newOptionAlergenos}
+              onChange={setNewOptionAlergenos}
+              placeholder="Seleccione los alérgenos de la opción"
+              optionFilterProp="label"
+              options={alergias.map((alergia) => ({
+                value: alergia.id,
+                label: alergia.nombre,
+              }))}
+            />
+          </Form.Item>
+          <Form.Item label="Dietas incompatibles">
+            <Select
+              mode="multiple"
+              allowClear
+              value={newOptionDietas}
+              onChange={setNewOptionDietas}
+              placeholder="Seleccione las dietas incompatibles"
+              optionFilterProp="label"
+              options={dietas.map((dieta) => ({
+                value: dieta.id,
+                label: dieta.nombre,
+              }))}
+            />
+          </Form.Item>
         </Form>
       </Modal>
 
@@ -9,7 +9,7 @@
  * @component
  */
 
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import {
   Button,
   Spin,
@@ -29,7 +29,13 @@ import {
   UpOutlined, // Icono de flecha arriba
   PrinterOutlined, // Icono de impresión
 } from "@ant-design/icons";
-import { getPedidos, updatePedido } from "../services/api";
+import {
+  getPedidos,
+  getPedidoChanges,
+  getPedidoEventTicket,
+  getPedidoPrintTicket,
+  updatePedidoSection,
+} from "../services/api";
 import "../styles/PedidosPendientes.scss";
 import api from "../axiosConfig";
 import PrintableSection from '../components/PrintableSection';
@@ -50,6 +56,10 @@ const PedidosPendientes = () => {
   const [servicios, setServicios] = useState([]); // Lista de servicios disponibles
   const [filteredPedidos, setFilteredPedidos] = useState([]); // Pedidos filtrados
 
+  // Token de sincronización incremental y cola de sincronizaciones en curso
+  const syncToken = useRef(null);
+  const syncQueue = useRef(Promise.resolve());
+
   /**
    * Obtiene los datos de pedidos y servicios del servidor
    * @param {boolean} showMessage - Indica si se debe mostrar mensaje de éxito
@@ -57,6 +67,8 @@ const PedidosPendientes = () => {
   const fetchData = async (showMessage = false) => {
     try {
       setRefreshing(true);
+      // El token se obtiene antes del listado para no perder cambios intermedios
+      const { next } = await getPedidoChanges();
       const [pedidosResponse, serviciosResponse] = await Promise.all([
         getPedidos(),
         api.get("/servicios/"),
@@ -69,6 +81,7 @@ const PedidosPendientes = () => {
 
       // Filtra servicios activos
       setServicios(serviciosResponse.data.filter((s) => s.activo));
+      syncToken.current = next;
 
       if (showMessage) {
         message.success("Datos actualizados correctamente");
@@ -82,12 +95,108 @@ const PedidosPendientes = () => {
   };
 
   /**
-   * Efecto para actualización automática cada 30 segundos
+   * Aplica al listado solo los pedidos creados, modificados o eliminados
+   * desde el último token de sincronización
+   */
+  const applyChanges = async () => {
+    if (syncToken.current === null) {
+      return fetchData(false);
+    }
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const changes = await getPedidoChanges(syncToken.current);
+        const removed = new Set(changes.deleted);
+        const updated = new Map(
+          changes.pedidos.map((pedido) => [pedido.id, pedido])
+        );
+
+        setPedidos((prev) => {
+          const known = new Set(prev.map((pedido) => pedido.id));
+          const added = changes.pedidos.filter(
+            (pedido) => !known.has(pedido.id)
+          );
+          return [
+            ...added,
+            ...prev
+              .filter((pedido) => !removed.has(pedido.id))
+              .map((pedido) => updated.get(pedido.id) || pedido),
+          ].filter((pedido) => pedido.status !== "completado");
+        });
+
+        syncToken.current = changes.next;
+        hasMore = changes.has_more;
+      }
+    } catch (error) {
+      await fetchData(false);
+    }
+  };
+
+  /**
+   * Encola una sincronización para que no se solapen las peticiones
+   */
+  const syncChanges = () => {
+    syncQueue.current = syncQueue.current.then(applyChanges);
+    return syncQueue.current;
+  };
+
+  /**
+   * Efecto para actualización automática
+   * Sincroniza los cambios cuando el servidor notifica un cambio en los pedidos.
+   * El servidor cierra el flujo cada pocos minutos y los tickets de conexión
+   * caducan, así que al cerrarse se pide un ticket nuevo y se vuelve a abrir.
+   * Mientras no hay flujo, sincroniza cada 30 segundos.
    */
   useEffect(() => {
     fetchData(false);
-    const interval = setInterval(() => fetchData(false), 30000);
-    return () => clearInterval(interval);
+
+    let interval = null;
+    let source = null;
+    let reconnect = null;
+    let closed = false;
+    const startPolling = () => {
+      if (!interval) {
+        interval = setInterval(syncChanges, 30000);
+      }
+    };
+
+    if (!window.EventSource) {
+      startPolling();
+      return () => clearInterval(interval);
+    }
+
+    const connect = async () => {
+      try {
+        const { ticket } = await getPedidoEventTicket();
+        if (closed) return;
+        source = new EventSource(
+          `${api.defaults.baseURL}/pedidos/events/?ticket=${encodeURIComponent(ticket)}`
+        );
+        source.onmessage = syncChanges;
+        source.onopen = () => {
+          clearInterval(interval);
+          interval = null;
+          // Recupera los cambios ocurridos mientras no había conexión
+          syncChanges();
+        };
+        source.onerror = () => {
+          source.close();
+          startPolling();
+          reconnect = setTimeout(connect, 5000);
+        };
+      } catch (error) {
+        startPolling();
+        reconnect = setTimeout(connect, 30000);
+      }
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      if (source) source.close();
+      clearTimeout(reconnect);
+      clearInterval(interval);
+    };
   }, []);
 
   /**
@@ -139,19 +248,6 @@ const PedidosPendientes = () => {
         (section) => updatedSections[section.titulo] === "completado"
       );
 
-      // Prepara datos actualizados del pedido
-      const updatedData = {
-        status: allSectionsCompleted ? "completado" : "en_proceso",
-        sectionStatus: updatedSections,
-        menu_id: pedido.menu?.id,
-        adicionales: pedido.adicionales || {},
-        observaciones: pedido.observaciones || "",
-      };
-
-      // Incluye ID del paciente solo si está activo
-      if (pedido.paciente?.activo) {
-        updatedData.paciente_id = pedido.paciente.id;
-      }
 
       if (allSectionsCompleted) {
         // Validación de fecha del pedido
@@ -207,17 +303,32 @@ const PedidosPendientes = () => {
             },
           },
           onOk: async () => {
-            await updatePedido(pedidoId, updatedData);
+            await updatePedidoSection(pedidoId, sectionTitle, {
+              status: "completado",
+              pedido_status: "completado",
+            });
             setPedidos((prev) => prev.filter((p) => p.id !== pedidoId));
             message.success("Pedido marcado como completado exitosamente");
             window.dispatchEvent(new CustomEvent("pedidoCompletado"));
           },
         });
       } else {
-        // Actualización parcial del pedido
-        await updatePedido(pedidoId, updatedData);
+        // Actualiza solo la sección indicada
+        const result = await updatePedidoSection(pedidoId, sectionTitle, {
+          status: "completado",
+          pedido_status: "en_proceso",
+        });
         setPedidos((prev) =>
-          prev.map((p) => (p.id === pedidoId ? { ...p, ...updatedData } : p))
+          prev.map((p) =>
+            p.id === pedidoId
+              ? {
+                  ...p,
+                  status: result.status,
+                  sectionStatus: updatedSections,
+                  is_fully_completed: result.is_fully_completed,
+                }
+              : p
+          )
         );
         message.success("Sección marcada como completada");
       }
@@ -485,6 +596,26 @@ const PedidosPendientes = () => {
     }, 500);
   };
 
+  /**
+   * Abre los tickets de todos los pedidos pendientes (o los del servicio
+   * seleccionado), generados en el servidor en un único documento
+   */
+  const handleBatchPrint = async () => {
+    // La ventana se abre antes de pedir el ticket para que el navegador no la bloquee
+    const printWindow = window.open("", "_blank");
+    try {
+      const { ticket } = await getPedidoPrintTicket();
+      const params = new URLSearchParams({ ticket });
+      if (selectedServicio) {
+        params.append("servicio", selectedServicio);
+      }
+      printWindow.location.href = `${api.defaults.baseURL}/pedidos/print/?${params}`;
+    } catch (error) {
+      printWindow.close();
+      message.error("No se pudieron generar los tickets de impresión");
+    }
+  };
+
   // Función auxiliar para formatear arrays de objetos (dietas o alergias)
   const formatArrayData = (data) => {
     if (!data) return 'No especificada';
@@ -549,6 +680,15 @@ const PedidosPendientes = () => {
             ))}
           </Select>
 
+          {/* Botón de impresión por lotes */}
+          <Button
+            icon={<PrinterOutlined />}
+            onClick={handleBatchPrint}
+            className="print-all-button"
+          >
+            Imprimir todos
+          </Button>
+
           {/* Botón de actualización */}
           <Button
             icon={<ReloadOutlined spin={refreshing} />}
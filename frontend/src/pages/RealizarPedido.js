@@ -23,7 +23,7 @@ import {
   Input,
   Alert,
 } from "antd";
-import { getPacientes, getMenus, createPedido } from "../services/api";
+import { getPacientes, getMenus, getMenu, createPedido } from "../services/api";
 import "../styles/RealizarPedido.scss";
 
 const { Option } = Select;
@@ -86,6 +86,26 @@ const RealizarPedido = () => {
     fetchData();
   }, []);
 
+  /**
+   * Efecto para mostrar solo las opciones aptas para el paciente
+   * Obtiene el menú seleccionado filtrado por las alergias y dietas del paciente
+   */
+  const selectedMenuId = selectedMenu?.id;
+  useEffect(() => {
+    if (!selectedPaciente || !selectedMenuId) return;
+    let cancelado = false;
+    getMenu(selectedMenuId, selectedPaciente)
+      .then((menu) => {
+        if (!cancelado) setSelectedMenu(menu);
+      })
+      .catch(() => {
+        if (!cancelado) message.error("Error al cargar las opciones del menú para el paciente");
+      });
+    return () => {
+      cancelado = true;
+    };
+  }, [selectedPaciente, selectedMenuId]);
+
   /**
    * Maneja el cambio de paciente seleccionado
    * @param {number} value - ID del paciente seleccionado
@@ -36,6 +36,12 @@ export const getMenus = async () => {
   return response.data;
 };
 
+export const getMenu = async (id, pacienteId) => {
+  const params = pacienteId ? { paciente: pacienteId } : {};
+  const response = await api.get(`/menus/${id}/`, { params });
+  return response.data;
+};
+
 export const createMenu = async (menuData) => {
   const response = await api.post("/menus/", menuData);
   return response.data;
@@ -114,6 +120,23 @@ export const getPedidos = async () => {
   return response.data;
 };
 
+export const getPedidoChanges = async (since) => {
+  const response = await api.get("/pedidos/changes/", {
+    params: since === undefined ? {} : { since },
+  });
+  return response.data;
+};
+
+export const getPedidoEventTicket = async () => {
+  const response = await api.post("/pedidos/events/ticket/");
+  return response.data;
+};
+
+export const getPedidoPrintTicket = async () => {
+  const response = await api.post("/pedidos/print/ticket/");
+  return response.data;
+};
+
 export const createPedido = async (pedidoData) => {
   const response = await api.post("/pedidos/", pedidoData);
   return response.data;
@@ -129,10 +152,13 @@ export const deletePedido = async (id) => {
   return response.data;
 };
 
-export const getPedidosCompletados = async (searchTerm = "") => {
-  const response = await api.get(
-    `/pedidos/completados/?paciente=${searchTerm}`
-  );
+export const updatePedidoSection = async (id, section, data = {}) => {
+  const response = await api.patch(`/pedidos/${id}/sections/${section}/`, data);
+  return response.data;
+};
+
+export const getPedidosCompletados = async (params = {}) => {
+  const response = await api.get("/pedidos/completados/", { params });
   return response.data;
 };
 